@@ -1,17 +1,32 @@
 import os
 import streamlit as st
 from dotenv import load_dotenv
-from typing import List
+from typing import Dict, List
 
-from components.sidebar import render_filter_settings 
+from components.sidebar import render_filter_settings, render_skill_filters
 from components.file_uploader import upload_files
 from components.results_display import (
     render_candidates_table,
     render_candidate_feedback,
+    render_timing_breakdown,
+)
+from src.resume_parser import (
+    parse_resumes_batch,
+    extract_names_from_resumes,
+    candidate_name_for_file,
+)
+from src.embeddings import JobResumeEmbedder, warm_up
+from src import instrumentation
+from src.embedding_cache import text_key
+from src import dedup
+from src.skill_index import SkillIndex, parse_skill_filter
+from config.settings import (
+    PAGE_TITLE,
+    PAGE_ICON,
+    INFERENCE_SERVER_URL,
+    INSTRUMENTATION_PROM_PATH,
+    DEDUP_ENABLED,
 )
-from src.resume_parser import parse_resume_sync, extract_name_from_resume
-from src.embeddings import JobResumeEmbedder
-from config.settings import PAGE_TITLE, PAGE_ICON
 
 load_dotenv()
 st.set_page_config(
@@ -202,6 +217,17 @@ st.markdown(
 st.title(PAGE_TITLE)
 
 
+@st.cache_resource(show_spinner="Loading embedding model...")
+def _warm_up_embedding_model():
+    """Load the shared embedding model once per server process; reruns reuse it."""
+    if INFERENCE_SERVER_URL:
+        return None  # the inference server holds the model
+    return warm_up()
+
+
+_warm_up_embedding_model()
+
+
 st.info(
     "1) Paste the job description. \n"
     "2) Upload resumes or paste resume texts. \n"
@@ -249,9 +275,12 @@ with paste_tab:
 st.header("Top Candidates", divider="gray")
 st.caption("Adjust filters and find the highest-scoring candidates for this role.")
 threshold, top_k = render_filter_settings()
+must_have, exclude_skills = render_skill_filters()
+required_skills, excluded_skills = parse_skill_filter(must_have, exclude_skills)
 
 run_disabled = not job_description or (not uploaded_files and not pasted_texts)
 find_clicked = st.button("Find Top Candidates", type="primary", disabled=run_disabled)
+show_timings = st.checkbox("Show timing breakdown", value=False)
 
 # Placeholder for the ranked table
 top_table_container = st.container()
@@ -261,57 +290,125 @@ st.header("Candidate Profile Feedback", divider="gray")
 st.caption("Read a brief explanation of how each recommended candidate matches the role.")
 feedback_container = st.container()
 
-if find_clicked:
-    with st.spinner("Processing resumes and generating rankings..."):
-        raw_texts: List[str] = []
-        names: List[str] = []
-
-        for path in uploaded_files:
-            text = parse_resume_sync(path)
-            raw_texts.append(text)
-
-            extracted = extract_name_from_resume(text or "")
-            candidate_name = (
-                extracted if extracted != "Name not found" else os.path.basename(path)
-            )
-            names.append(candidate_name)
-
-        # From pasted text entries
-        for idx, text in enumerate(pasted_texts):
-            raw_texts.append(text)
-
-            extracted = extract_name_from_resume(text or "")
-            candidate_name = (
-                extracted if extracted != "Name not found" else f"Pasted Resume {idx + 1}"
-            )
-            names.append(candidate_name)
-
-        # Filter out parsing errors or empty content
-        texts: List[str] = []
-        valid_names: List[str] = []
-        for n, t in zip(names, raw_texts):
-            t_norm = (t or "").strip()
-            if not t_norm:
-                st.warning(f"Skipping {n}: empty content")
+def _usable_text(name: str, text: str):
+    """Stripped resume text, or None (with a warning) for parse errors and empty content."""
+    t_norm = (text or "").strip()
+    if not t_norm:
+        st.warning(f"Skipping {name}: empty content")
+        return None
+    if t_norm.startswith("Error") or t_norm == "No content extracted":
+        st.warning(f"Skipping {name}: {t_norm[:120]}")
+        return None
+    return t_norm
+
+
+def _incoming_candidates(progress, skipped: List[str], duplicates: Dict[str, List[str]],
+                         unmatched_skills: List[str]):
+    """Yield one representative per group of near-duplicate resumes that passes the skill filter.
+
+    Filtered resumes are listed in ``skipped``; other copies of a representative
+    are listed under its ``text_key`` in ``duplicates``. Neither is embedded or explained.
+    Must-have skills that none of this run's resumes mention go to ``unmatched_skills``.
+    """
+    # Both pools hold only this run's resumes, so they stay small and nothing leaks between sessions
+    groups = dedup.DuplicateGroups(dedup.MinHashLSH())
+    skills = SkillIndex() if required_skills or excluded_skills else None
+    kept = set()
+    for candidate_name, text in _parsed_candidates(progress):
+        doc_id = text_key(text)
+        if DEDUP_ENABLED:
+            representative = groups.assign(doc_id, text)
+            if representative != doc_id or doc_id in kept:
+                duplicates.setdefault(representative, []).append(candidate_name)
                 continue
-            if t_norm.startswith("Error") or t_norm == "No content extracted":
-                st.warning(f"Skipping {n}: {t_norm[:120]}")
+            kept.add(doc_id)
+        if skills is not None:
+            if doc_id not in skills:
+                skills.add([text], [doc_id])
+            if not skills.doc_matches(doc_id, required_skills, excluded_skills):
+                skipped.append(candidate_name)
                 continue
-            texts.append(t_norm)
-            valid_names.append(n)
+        yield candidate_name, text
+    if skills is not None and len(skills):
+        unmatched_skills.extend(skills.unmatched(required_skills))
 
-        if not texts:
-            with top_table_container:
-                st.info("No valid parsed resumes to rank.")
-        else:
-            embedder = JobResumeEmbedder()
-            ranked = embedder.rank_candidates(job_description, texts, valid_names)
-            filtered = [(n, s, t) for n, s, t in ranked if s >= threshold][: top_k]
 
+def _parsed_candidates(progress):
+    """``(name, text)`` for pasted resumes, then uploads as each finishes parsing."""
+    pasted_names = extract_names_from_resumes(pasted_texts)
+    for idx, (text, extracted) in enumerate(zip(pasted_texts, pasted_names)):
+        candidate_name = (
+            extracted if extracted != "Name not found" else f"Pasted Resume {idx + 1}"
+        )
+        text = _usable_text(candidate_name, text)
+        if text:
+            yield candidate_name, text
+
+    for parsed, (path, text) in enumerate(parse_resumes_batch(uploaded_files), 1):
+        progress.progress(
+            parsed / len(uploaded_files),
+            text=f"Parsed {parsed} of {len(uploaded_files)} resumes",
+        )
+        extracted = candidate_name_for_file(path, text)
+        candidate_name = (
+            extracted if extracted != "Name not found" else os.path.basename(path)
+        )
+        text = _usable_text(candidate_name, text)
+        if text:
+            yield candidate_name, text
+
+
+def _rank_and_explain():
+    with st.spinner("Processing resumes and generating rankings..."):
+        progress = st.progress(0.0, text="Parsing resumes...") if uploaded_files else st.empty()
+        with top_table_container:
+            table_placeholder = st.empty()
+
+        # Re-render the table each time the running top-k changes
+        embedder = JobResumeEmbedder()
+        filtered = []
+        processed = 0
+        skipped: List[str] = []
+        duplicates: Dict[str, List[str]] = {}
+        unmatched_skills: List[str] = []
+        for filtered, processed in embedder.rank_candidates_stream(
+            job_description, _incoming_candidates(progress, skipped, duplicates, unmatched_skills),
+            top_k=int(top_k), threshold=threshold,
+        ):
+            with table_placeholder.container():
+                render_candidates_table(filtered, duplicates)
+        progress.empty()
+        if duplicates:
+            with table_placeholder.container():
+                render_candidates_table(filtered, duplicates)
+            with top_table_container:
+                copies = sum(len(names) for names in duplicates.values())
+                st.caption(f"{copies} near-duplicate resume(s) folded into {len(duplicates)} candidate(s).")
+        if skipped:
             with top_table_container:
-                render_candidates_table(filtered)
+                st.caption(f"{len(skipped)} resume(s) skipped by the skill filter: {', '.join(skipped)}")
+        if unmatched_skills:
+            with top_table_container:
+                st.warning(f"No uploaded resume mentions the must-have skill(s): {', '.join(unmatched_skills)}. "
+                           "Check the spelling of these skill filters.")
 
+        if not processed:
+            with table_placeholder.container():
+                st.info("No valid parsed resumes to rank.")
+        else:
             with feedback_container:
                 render_candidate_feedback(job_description, filtered, embedder)
 
+
+if find_clicked:
+    if show_timings:
+        with instrumentation.collect() as run:
+            _rank_and_explain()
+        st.subheader("Timing breakdown")
+        render_timing_breakdown(run)
+    else:
+        _rank_and_explain()
+    if INSTRUMENTATION_PROM_PATH:
+        instrumentation.write_prometheus(INSTRUMENTATION_PROM_PATH)
+
 st.caption("Built with JobBERT-v2 embeddings and GPT OSS 20B reasoning.") 
\ No newline at end of file
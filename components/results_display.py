@@ -1,8 +1,13 @@
 import streamlit as st
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+from src.embedding_cache import text_key
 
 
-def render_candidates_table(candidates: List[Tuple[str, float, str]]) -> None:
+def render_candidates_table(
+    candidates: List[Tuple[str, float, str]],
+    duplicates: Optional[Dict[str, List[str]]] = None,
+) -> None:
+    """Ranked table; ``duplicates`` maps a candidate's ``text_key`` to the names of the copies folded into it."""
     if not candidates:
         st.info("No candidates to display.")
         return
@@ -10,15 +15,35 @@ def render_candidates_table(candidates: List[Tuple[str, float, str]]) -> None:
     import pandas as pd
 
     table_rows = [
-        {"Rank": index + 1, "Name": name, "Similarity": float(score) * 100.0}
-        for index, (name, score, _resume_text) in enumerate(candidates)
+        {"Rank": index + 1, "Name": name, "Similarity": float(score) * 100.0,
+         "Duplicates": ", ".join((duplicates or {}).get(text_key(resume_text), []))}
+        for index, (name, score, resume_text) in enumerate(candidates)
     ]
-    df = pd.DataFrame(table_rows, columns=["Rank", "Name", "Similarity"])
+    columns = ["Rank", "Name", "Similarity"] + (["Duplicates"] if duplicates else [])
+    df = pd.DataFrame(table_rows, columns=columns)
 
     df["Similarity"] = df["Similarity"].map(lambda x: f"{x:.1f}%")
     st.dataframe(df, hide_index=True, use_container_width=True)
 
 
+def render_timing_breakdown(run) -> None:
+    """Per-stage time, counts and sizes recorded by ``src.instrumentation.collect`` for one run."""
+    rows = run.breakdown()
+    if not rows:
+        return
+
+    import pandas as pd
+
+    columns = ["span", "count", "seconds", "documents", "bytes", "chars", "prompt_tokens",
+               "completion_tokens", "cache_hits", "retries", "errors"]
+    df = pd.DataFrame(rows)
+    df = df[[column for column in columns if column in df.columns]].fillna(0)
+    df["share"] = (df["seconds"] / max(run.seconds, 1e-9)).map(lambda x: f"{x:.0%}")
+    df["seconds"] = df["seconds"].map(lambda x: f"{x:.2f}")
+    st.caption(f"Run took {run.seconds:.1f}s. Stages overlap, so shares can add up to more than 100%.")
+    st.dataframe(df, hide_index=True, use_container_width=True)
+
+
 def render_candidate_feedback(
     job_description: str,
     candidates: List[Tuple[str, float, str]],
@@ -28,14 +53,24 @@ def render_candidate_feedback(
         st.info("No candidates to explain.")
         return
 
+    # Lay out every expander first, then fill each one as its reasoning arrives
+    placeholders = []
     for rank, (name, score, resume_text) in enumerate(candidates, 1):
         score_percent = f"{float(score):.1%}"
         with st.expander(f"#{rank} {name} | Similarity: {score_percent}"):
-            with st.spinner("Generating reasoning..."):
-                reasoning = embedder.generate_fit_reasoning(
-                    job_description, resume_text, name
-                )
-            st.markdown(reasoning)
+            placeholder = st.empty()
+            placeholder.caption("Generating reasoning...")
+            placeholders.append(placeholder)
             with st.expander("View full resume text"):
                 st.text(resume_text)
-        st.divider()
\ No newline at end of file
+        st.divider()
+
+    for index, reasoning in embedder.stream_fit_reasoning(job_description, candidates):
+        placeholders[index].markdown(reasoning)
+
+    stats = embedder.compression_stats()
+    if stats["input_tokens"]:
+        st.caption(
+            f"Prompt compression: {stats['input_tokens']:,} → {stats['output_tokens']:,} tokens "
+            f"({stats['saved_ratio']:.0%} saved)"
+        )
@@ -24,4 +24,25 @@ def render_filter_settings():
         )
     
     st.caption("Adjust these settings to filter the ranked list of candidates.")
-    return threshold, top_k
\ No newline at end of file
+    return threshold, top_k
+
+def render_skill_filters():
+    """Renders the must-have / exclude skill inputs; returns their raw comma-separated text."""
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        must_have = st.text_input(
+            "Must-have skills",
+            placeholder="Python, SQL, AWS|GCP",
+            help="Comma-separated; every item is required. Use | for alternatives.",
+        )
+
+    with col2:
+        exclude = st.text_input(
+            "Exclude skills",
+            placeholder="PHP",
+            help="Comma-separated; resumes mentioning any of these are skipped.",
+        )
+
+    return must_have, exclude
@@ -1,12 +1,117 @@
+import os
+
 # Model settings
 EMBEDDING_MODEL = "TechWolf/JobBERT-v2"
+REASONING_MODEL = "openai/gpt-oss-20b"
+# Embedding inference backend: "torch", "onnx" or "onnx-int8" (dynamic int8 quantization).
+# ONNX exports are cached under ONNX_EXPORT_DIR and only used after passing a parity check.
+EMBEDDING_BACKEND = "torch"
+ONNX_EXPORT_DIR = os.path.join("data", "onnx_models")
+ONNX_QUANTIZATION_CONFIG = "avx2"  # arm64, avx2, avx512 or avx512_vnni
+ONNX_PARITY_MIN_COSINE = 0.99  # min cosine agreement with PyTorch embeddings
 SIMILARITY_THRESHOLD = 0.5
 TOP_CANDIDATES = 5
 
+# Encoding scheduler: length-bucketed batches sized by padded-token budget
+ENCODE_TOKEN_BUDGET = 16384  # batch size x longest sequence in the batch
+ENCODE_MAX_BATCH = 128
+ENCODE_WORKERS = 0  # CPU worker processes for large ingests; 0/1 = encode in-process
+ENCODE_POOL_MIN_DOCS = 2000  # smaller inputs are not worth the inter-process overhead
+BATCH_RANK_EMBED_BATCH = 256  # resumes named/embedded per step by the bulk ranking CLI
+STREAM_MICRO_BATCH = 16  # largest micro-batch when ranking resumes as they are parsed
+SCORE_BLOCK_MB = 64  # memory ceiling for one block of many-jobs x many-resumes scores
+
+# Shared inference server (python -m src.inference_server); set the URL to encode through it
+INFERENCE_SERVER_URL = os.getenv("INFERENCE_SERVER_URL")  # http://host:port or unix:///path.sock
+SERVER_MAX_BATCH = 64  # texts per coalesced model batch
+SERVER_MAX_WAIT_MS = 10  # how long the oldest request waits for others to join its batch
+SERVER_MAX_QUEUE = 4096  # queued texts before requests are rejected with 503
+SERVER_REQUEST_TIMEOUT = 120
+
+# Long-text chunking: score overlapping windows instead of truncating at the model's max length
+CHUNKING_ENABLED = False
+CHUNK_MAX_TOKENS = None  # None = model max sequence length
+CHUNK_OVERLAP = 16  # tokens shared by consecutive windows
+CHUNK_POOLING = "max"  # max, mean or topn
+CHUNK_TOP_N = 3  # chunks averaged by topn pooling
+
+# Embedding cache settings
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_DIR = os.path.join("data", "embeddings_cache")
+EMBEDDING_CACHE_MAX_MB = 256  # on-disk vector store size before LRU eviction
+EMBEDDING_CACHE_FLUSH_SECONDS = 30  # how often new entries are folded from the append log into index.json
+
+# Vector index (standing talent pool) settings
+VECTOR_INDEX_DIR = os.path.join("data", "vector_index")
+VECTOR_INDEX_N_LISTS = 256  # IVF cells
+VECTOR_INDEX_N_PROBE = 16  # cells scanned per query; higher = better recall, slower
+EMBEDDING_STORAGE_DTYPE = "float32"  # pool vectors: "float32", "float16" (1/2 memory) or "int8" (~1/4 memory)
+QUANTIZED_RESCORE = True  # re-score the quantized shortlist with float32 vectors from the embedding cache
+
+# BM25 lexical prefilter: shortlist the pool before dense ranking
+LEXICAL_INDEX_DIR = os.path.join("data", "lexical_index")
+BM25_K1 = 1.5
+BM25_B = 0.75
+PREFILTER_TOP_N = 500  # resumes passed from BM25 to the embedding model
+HYBRID_ALPHA = 0.8  # weight of the dense score in linear hybrid fusion
+
+# Must-have skill filtering (posting lists built once per parsed resume)
+SKILL_INDEX_DIR = os.path.join("data", "skill_index")
+
+# Near-duplicate resumes (MinHash + LSH): one representative per group is embedded and explained
+DEDUP_ENABLED = True
+DEDUP_INDEX_DIR = os.path.join("data", "dedup_index")
+DEDUP_NUM_PERM = 128
+DEDUP_BANDS = 16  # 8 rows per band: ~95% of 0.8-similar pairs collide, ~6% of 0.5-similar ones
+DEDUP_SHINGLE_SIZE = 3
+DEDUP_THRESHOLD = 0.8  # estimated Jaccard similarity of word shingles
+
+# Resume parsing settings
+PARSE_CONCURRENCY = 8  # simultaneous LlamaParse jobs
+PARSE_TIMEOUT = 120  # seconds per file attempt
+PARSE_RETRIES = 2
+LOCAL_EXTRACTION_ENABLED = True  # TXT, DOCX and text-layer PDFs skip LlamaParse
+PDF_MIN_CHARS_PER_PAGE = 200  # below this the PDF is treated as scanned
+PDF_MAX_FRAGMENT_RATIO = 0.6  # share of 1-2 word lines above which layout is too complex
+NAME_BATCH_SIZE = 256  # resume headers per spaCy nlp.pipe batch
+NAME_N_PROCESS = 1  # raise for large offline ingests
+
+# Parsed-text cache settings (keyed by SHA-256 of the uploaded file)
+PARSE_CACHE_ENABLED = True
+PARSE_CACHE_PATH = os.path.join("data", "parse_cache", "parsed.sqlite3")
+PARSE_CACHE_MAX_MB = 512
+PARSE_CACHE_VERSION = "1"  # bump when extraction output changes
+
+# Groq reasoning limits (match the account's quotas for REASONING_MODEL)
+GROQ_RPM = 30  # requests per minute
+GROQ_TPM = 8000  # tokens per minute
+REASONING_CONCURRENCY = 8
+REASONING_MAX_RETRIES = 4
+REASONING_MAX_BACKOFF = 60.0  # seconds; also caps a server's Retry-After
+REASONING_BATCH_ENABLED = False  # per-candidate requests stream into the UI fastest
+REASONING_BATCH_TOKEN_BUDGET = 6000  # prompt + completion tokens per batched request
+REASONING_BATCH_MAX_CANDIDATES = 10
+
+# Prompt compression before reasoning (tokens under REASONING_TOKENIZER)
+REASONING_TOKENIZER = "o200k_base"  # tiktoken encoding used by gpt-oss models
+REASONING_JOB_TOKEN_BUDGET = 600
+REASONING_RESUME_TOKEN_BUDGET = 900
+
+# Reasoning cache settings
+REASONING_CACHE_ENABLED = True
+REASONING_CACHE_PATH = os.path.join("data", "reasoning_cache", "reasoning.sqlite3")
+REASONING_CACHE_TTL_DAYS = 30
+REASONING_CACHE_MAX_MB = 64
+
+# Instrumentation: per-stage spans, Prometheus text metrics and a JSON span log
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "0") == "1"
+INSTRUMENTATION_LOG_PATH = os.path.join("data", "logs", "spans.jsonl")
+INSTRUMENTATION_PROM_PATH = None  # e.g. a node_exporter textfile path, rewritten after each app run
+
 # File upload settings
 MAX_FILE_SIZE = 10  # MB
 ALLOWED_EXTENSIONS = ['.pdf', '.txt', '.docx']
 
 # UI settings
 PAGE_TITLE = "Candidate Recommendation Engine"
-PAGE_ICON = "🎯" 
\ No newline at end of file
+PAGE_ICON = "🎯"
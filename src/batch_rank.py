@@ -0,0 +1,429 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import (
+    ALLOWED_EXTENSIONS,
+    BATCH_RANK_EMBED_BATCH,
+    DEDUP_ENABLED,
+    EMBEDDING_STORAGE_DTYPE,
+    PREFILTER_TOP_N,
+    QUANTIZED_RESCORE,
+    SIMILARITY_THRESHOLD,
+    TOP_CANDIDATES,
+)
+from src import dedup
+from src.lexical_index import BM25Index
+from src.quantization import QuantizedEmbeddings
+from src.skill_index import SkillIndex, load_or_create, parse_skill_filter
+from src.utils import ensure_dir
+
+OUTPUT_FORMATS = (".csv", ".parquet", ".jsonl")
+NAME_NOT_FOUND = "Name not found"
+
+
+class StageTimer:
+    """Items processed and seconds spent per pipeline stage."""
+
+    def __init__(self):
+        self.items: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+
+    def record(self, stage: str, items: int, seconds: float) -> None:
+        self.items[stage] = self.items.get(stage, 0) + items
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def report(self) -> List[Dict[str, float]]:
+        return [
+            {
+                "stage": stage,
+                "items": self.items[stage],
+                "seconds": self.seconds[stage],
+                "per_s": self.items[stage] / self.seconds[stage] if self.seconds[stage] else 0.0,
+            }
+            for stage in self.items
+        ]
+
+
+def find_resumes(directory: str) -> List[str]:
+    """Every resume file under ``directory`` with an allowed extension, in a stable order."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        for file_name in files:
+            if os.path.splitext(file_name)[1].lower() in ALLOWED_EXTENSIONS:
+                paths.append(os.path.join(root, file_name))
+    return sorted(paths)
+
+
+def load_jobs(source: str) -> List[Tuple[str, str]]:
+    """``(job_id, description)`` pairs from a directory of .txt/.md files, one text file or a JSONL file.
+
+    JSONL lines need ``id`` and ``description`` fields.
+    """
+    if os.path.isdir(source):
+        files = sorted(f for f in os.listdir(source) if f.lower().endswith((".txt", ".md")))
+        jobs = []
+        for file_name in files:
+            with open(os.path.join(source, file_name), "r", encoding="utf-8") as f:
+                jobs.append((os.path.splitext(file_name)[0], f.read()))
+        return jobs
+    if source.lower().endswith(".jsonl"):
+        with open(source, "r", encoding="utf-8") as f:
+            return [(str(row["id"]), row["description"]) for row in map(json.loads, filter(str.strip, f))]
+    with open(source, "r", encoding="utf-8") as f:
+        return [(os.path.splitext(os.path.basename(source))[0], f.read())]
+
+
+def _read_jsonl(path: str) -> List[dict]:
+    """Rows of a JSONL file; undecodable lines are skipped and a last line cut short by a crash is dropped."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        data = f.read()
+    complete = data.rfind(b"\n") + 1
+    if complete < len(data):
+        with open(path, "r+b") as f:
+            f.truncate(complete)
+    rows = []
+    for line in data[:complete].splitlines():
+        try:
+            rows.append(json.loads(line))
+        except ValueError:
+            continue
+    return rows
+
+
+def _append_jsonl(path: str, rows: List[dict]) -> None:
+    if not rows:
+        return
+    with open(path, "ab+") as f:
+        # Start on a fresh line if a crash left the last record without its newline
+        torn = False
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+        lines = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        f.write((("\n" if torn else "") + lines).encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class Checkpoint:
+    """Progress of one batch run, kept in ``<out>.work/``.
+
+    ``resumes.jsonl`` holds every parsed and named resume, ``results.jsonl``
+    the ranked rows, ``state.json`` the run settings plus finished jobs,
+    ``skills/`` the skill index and ``dedup/`` the MinHash pool.
+    """
+
+    def __init__(self, out_path: str, settings: dict, restart: bool = False):
+        self.dir = out_path + ".work"
+        ensure_dir(self.dir)
+        self.resumes_path = os.path.join(self.dir, "resumes.jsonl")
+        self.results_path = os.path.join(self.dir, "results.jsonl")
+        self.state_path = os.path.join(self.dir, "state.json")
+        self.skills_dir = os.path.join(self.dir, "skills")
+        self.dedup_dir = os.path.join(self.dir, "dedup")
+        state = self._load_state()
+        if restart or state.get("settings") != settings:
+            if state and not restart:
+                print(f"[batch] Settings changed since the last run; starting over in {self.dir}")
+            for path in (self.resumes_path, self.results_path, self.state_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            shutil.rmtree(self.skills_dir, ignore_errors=True)
+            shutil.rmtree(self.dedup_dir, ignore_errors=True)
+            state = {}
+        self.settings = settings
+        self.done_jobs = set(state.get("done_jobs", []))
+
+    def _load_state(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError:
+            return {}
+
+    def _save_state(self) -> None:
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"settings": self.settings, "done_jobs": sorted(self.done_jobs)}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def resumes(self) -> List[dict]:
+        return _read_jsonl(self.resumes_path)
+
+    def add_resumes(self, rows: List[dict]) -> None:
+        _append_jsonl(self.resumes_path, rows)
+
+    def finish_job(self, job_id: str, rows: List[dict]) -> None:
+        _append_jsonl(self.results_path, rows)
+        self.done_jobs.add(job_id)
+        self._save_state()
+
+    def results(self) -> List[dict]:
+        # Rows of a job whose completion was never recorded are redone on resume
+        return [row for row in _read_jsonl(self.results_path) if row["job_id"] in self.done_jobs]
+
+
+def _usable_text(text: Optional[str]) -> Optional[str]:
+    text = (text or "").strip()
+    if not text or text.startswith("Error") or text == "No content extracted":
+        return None
+    return text
+
+
+def ingest_resumes(paths: List[str], checkpoint: Checkpoint, embedder, timer: StageTimer,
+                   batch_size: int = BATCH_RANK_EMBED_BATCH, embed: bool = True,
+                   skills: Optional[SkillIndex] = None, skill_filter=((), ()),
+                   groups: Optional[dedup.DuplicateGroups] = None) -> List[dict]:
+    """Parse, name and embed every resume not already in the checkpoint.
+
+    Parsing continues in the background while each batch of parsed resumes
+    is named and embedded, so the stages overlap. With ``embed=False``
+    (BM25 prefilter) resumes are only encoded once shortlisted. With a
+    ``skills`` index, each resume's skills are indexed and only resumes
+    passing ``skill_filter`` (required groups, excluded terms) are embedded.
+    With ``groups``, near-duplicates of an earlier resume get ``duplicate_of``
+    and are neither indexed nor embedded.
+    """
+    from src.resume_parser import candidate_names_for_files, parse_resumes_batch
+
+    done = checkpoint.resumes()
+    known = {row["path"] for row in done}
+    if groups is not None:
+        # Restore the grouping of resumes ingested before a restart
+        for row in done:
+            if "text" in row:
+                groups.assign(row["path"], row["text"], representative=row.get("duplicate_of", row["path"]))
+    todo = [path for path in paths if path not in known]
+    if todo:
+        print(f"[batch] Parsing {len(todo)} resumes ({len(known)} already done)")
+
+    def flush(batch: List[Tuple[str, str]]) -> None:
+        start_time = time.perf_counter()
+        names = candidate_names_for_files([path for path, _ in batch], [text for _, text in batch])
+        timer.record("names", len(batch), time.perf_counter() - start_time)
+        rows = []
+        for (path, raw), name in zip(batch, names):
+            text = _usable_text(raw)
+            if text is None:
+                rows.append({"path": path, "skipped": (raw or "empty content")[:120]})
+                continue
+            name = name if name != NAME_NOT_FOUND else os.path.basename(path)
+            rows.append({"path": path, "name": name, "text": text})
+        if groups is not None:
+            start_time = time.perf_counter()
+            for row in rows:
+                if "text" in row:
+                    representative = groups.assign(row["path"], row["text"])
+                    if representative != row["path"]:
+                        row["duplicate_of"] = representative
+            timer.record("dedup", len(rows), time.perf_counter() - start_time)
+        unique = [row for row in rows if "text" in row and "duplicate_of" not in row]
+        texts = [row["text"] for row in unique]
+        if skills is not None and texts:
+            start_time = time.perf_counter()
+            ids = skills.add(texts, [row["path"] for row in unique])
+            texts = [text for text, keep in zip(texts, skills.matches(ids, *skill_filter)) if keep]
+            timer.record("skills", len(ids), time.perf_counter() - start_time)
+        if embed:
+            start_time = time.perf_counter()
+            if texts:
+                embedder.batch_resume_embeddings(texts)  # warms the embedding cache for ranking
+            timer.record("embed", len(texts), time.perf_counter() - start_time)
+        checkpoint.add_resumes(rows)
+
+    batch: List[Tuple[str, str]] = []
+    ingested = len(known)
+    parsed = iter(parse_resumes_batch(todo)) if todo else iter(())
+    while True:
+        start_time = time.perf_counter()
+        item = next(parsed, None)
+        if item is None:
+            break
+        timer.record("parse", 1, time.perf_counter() - start_time)
+        batch.append(item)
+        if len(batch) >= batch_size:
+            flush(batch)
+            ingested += len(batch)
+            batch = []
+            print(f"[batch] Ingested {ingested}/{len(paths)} resumes", flush=True)
+    if batch:
+        flush(batch)
+
+    if skills is not None:
+        # Resumes checkpointed before a crash may be missing from the saved index
+        missing = [row for row in checkpoint.resumes()
+                   if "text" in row and "duplicate_of" not in row and row["path"] not in skills]
+        if missing:
+            skills.add([row["text"] for row in missing], [row["path"] for row in missing])
+        skills.save(checkpoint.skills_dir)
+    if groups is not None:
+        groups.index.save(checkpoint.dedup_dir)
+    if embedder.cache is not None:
+        embedder.cache.save()
+    return checkpoint.resumes()
+
+
+def rank_jobs(jobs: List[Tuple[str, str]], resumes: List[dict], checkpoint: Checkpoint, embedder,
+              timer: StageTimer, top_k: int, threshold: Optional[float], reasoning: bool,
+              prefilter: Optional[int] = None, skills: Optional[SkillIndex] = None,
+              skill_filter=((), ())) -> None:
+    """Rank the resume pool against each job not finished yet, optionally explaining the top-k.
+
+    With ``prefilter`` only each job's BM25 shortlist of that size is embedded
+    and ranked; with ``skills`` the pool is first masked by ``skill_filter``.
+    Near-duplicates are left out and listed with their representative's rows.
+    """
+    pool = [row for row in resumes if "text" in row and "duplicate_of" not in row]
+    copies: Dict[str, List[str]] = {}
+    for row in resumes:
+        if "duplicate_of" in row:
+            copies.setdefault(row["duplicate_of"], []).append(row["path"])
+    if skills is not None:
+        unmatched = skills.unmatched(skill_filter[0], doc_ids=[row["path"] for row in pool])
+        if unmatched:
+            print(f"[batch] Warning: no resume mentions the must-have skill(s) {', '.join(unmatched)}; "
+                  "check the spelling")
+        keep = skills.matches([row["path"] for row in pool], *skill_filter)
+        pool = [row for row, matched in zip(pool, keep) if matched]
+        print(f"[batch] {len(pool)} resumes meet the skill filter")
+    texts = [row["text"] for row in pool]
+    store = lexical = rescore_fn = None
+    if prefilter:
+        start_time = time.perf_counter()
+        lexical = BM25Index()
+        lexical.add(texts, [row["name"] for row in pool], doc_ids=[row["path"] for row in pool])
+        timer.record("bm25_index", len(texts), time.perf_counter() - start_time)
+    elif not embedder.chunked and texts:
+        # Cache hits after ingest, kept as EMBEDDING_STORAGE_DTYPE block by block
+        store = QuantizedEmbeddings.from_blocks(
+            (embedder.batch_resume_embeddings(texts[i:i + BATCH_RANK_EMBED_BATCH])
+             for i in range(0, len(texts), BATCH_RANK_EMBED_BATCH)),
+            EMBEDDING_STORAGE_DTYPE,
+        )
+        if QUANTIZED_RESCORE and store.mode != "float32":
+            rescore_fn = lambda rows: embedder.batch_resume_embeddings([texts[r] for r in rows])
+
+    for job_id, description in jobs:
+        if job_id in checkpoint.done_jobs:
+            continue
+        start_time = time.perf_counter()
+        if lexical is not None:
+            shortlist, _ = lexical.search_indices(description, top_n=prefilter)
+            indices, scores = embedder.rank_indices(description, [texts[i] for i in shortlist],
+                                                    top_k=top_k, threshold=threshold)
+            indices = shortlist[indices]
+        elif store is None:
+            indices, scores = embedder.rank_indices(description, texts, top_k=top_k, threshold=threshold)
+        else:
+            job_embedding = embedder.generate_job_embedding(description)
+            indices, scores = store.rank(job_embedding, top_k=top_k, threshold=threshold, rescore_fn=rescore_fn)
+        timer.record("rank", 1, time.perf_counter() - start_time)
+
+        rows = [
+            {"job_id": job_id, "rank": rank, "candidate": pool[i]["name"], "path": pool[i]["path"],
+             "score": float(score)}
+            for rank, (i, score) in enumerate(zip(indices, scores), 1)
+        ]
+        for row in rows:
+            if row["path"] in copies:
+                row["duplicates"] = ";".join(copies[row["path"]])
+        if reasoning and rows:
+            start_time = time.perf_counter()
+            ranked = [(pool[i]["name"], float(score), pool[i]["text"]) for i, score in zip(indices, scores)]
+            for index, text in embedder.stream_fit_reasoning(description, ranked):
+                rows[index]["reasoning"] = text
+            timer.record("reasoning", len(rows), time.perf_counter() - start_time)
+        checkpoint.finish_job(job_id, rows)
+        print(f"[batch] Ranked job {job_id} ({len(checkpoint.done_jobs)}/{len(jobs)})", flush=True)
+
+
+def write_results(rows: List[dict], out_path: str) -> None:
+    """Write rows as CSV, Parquet (needs pyarrow) or JSONL, chosen by the file extension."""
+    extension = os.path.splitext(out_path)[1].lower()
+    if extension == ".jsonl":
+        tmp_path = out_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+        os.replace(tmp_path, out_path)
+        return
+    import pandas as pd
+
+    optional = [column for column in ("duplicates", "reasoning") if any(column in row for row in rows)]
+    df = pd.DataFrame(rows, columns=["job_id", "rank", "candidate", "path", "score"] + optional)
+    if extension == ".parquet":
+        df.to_parquet(out_path, index=False)
+    else:
+        df.to_csv(out_path, index=False)
+
+
+def print_throughput(timer: StageTimer) -> None:
+    print(f"\n{'stage':<10} {'items':>8} {'seconds':>9} {'items/s':>9}")
+    for row in timer.report():
+        print(f"{row['stage']:<10} {row['items']:>8} {row['seconds']:>9.2f} {row['per_s']:>9.1f}")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Rank every resume in a directory against each job, resuming from ``<out>.work/`` after a crash."""
+    parser = argparse.ArgumentParser(description="Rank a directory of resumes against a batch of job descriptions")
+    parser.add_argument("--resumes", required=True, help="Directory of resume files")
+    parser.add_argument("--jobs", required=True, help="Directory of .txt/.md job descriptions, a text file or a JSONL file")
+    parser.add_argument("--out", required=True, help="Output file (.csv, .parquet or .jsonl)")
+    parser.add_argument("--top-k", type=int, default=TOP_CANDIDATES)
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument("--reasoning", action="store_true", help="Explain each job's top-k with the reasoning model")
+    parser.add_argument("--prefilter", type=int, nargs="?", const=PREFILTER_TOP_N, default=None,
+                        help=f"Embed only each job's BM25 shortlist of this size (default {PREFILTER_TOP_N})")
+    parser.add_argument("--must-have", default="", help='Required skills, e.g. "Python, SQL, AWS|GCP"')
+    parser.add_argument("--exclude", default="", help="Skip resumes mentioning any of these comma-separated skills")
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="Rank near-duplicate resumes separately instead of one per group")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start over")
+    args = parser.parse_args(argv)
+
+    if os.path.splitext(args.out)[1].lower() not in OUTPUT_FORMATS:
+        parser.error(f"--out must end with one of {', '.join(OUTPUT_FORMATS)}")
+
+    from src.embeddings import JobResumeEmbedder
+
+    paths = find_resumes(args.resumes)
+    jobs = load_jobs(args.jobs)
+    settings = {"top_k": args.top_k, "threshold": args.threshold, "reasoning": args.reasoning,
+                "prefilter": args.prefilter, "must_have": args.must_have, "exclude": args.exclude,
+                "dedup": DEDUP_ENABLED and not args.keep_duplicates}
+    checkpoint = Checkpoint(args.out, settings, restart=args.restart)
+    timer = StageTimer()
+    start_time = time.perf_counter()
+    skill_filter = parse_skill_filter(args.must_have, args.exclude)
+    skills = load_or_create(checkpoint.skills_dir) if any(skill_filter) else None
+    groups = dedup.DuplicateGroups(dedup.load_or_create(checkpoint.dedup_dir)) if settings["dedup"] else None
+
+    embedder = JobResumeEmbedder()
+    resumes = ingest_resumes(paths, checkpoint, embedder, timer, embed=not args.prefilter,
+                             skills=skills, skill_filter=skill_filter, groups=groups)
+    skipped = [row for row in resumes if "skipped" in row]
+    for row in skipped:
+        print(f"[batch] Skipped {row['path']}: {row['skipped']}")
+    copies = [row for row in resumes if "duplicate_of" in row]
+    if copies:
+        print(f"[batch] Folded {len(copies)} near-duplicate resumes into "
+              f"{len({row['duplicate_of'] for row in copies})} representatives")
+    rank_jobs(jobs, resumes, checkpoint, embedder, timer, args.top_k, args.threshold, args.reasoning,
+              args.prefilter, skills, skill_filter)
+
+    rows = checkpoint.results()
+    write_results(rows, args.out)
+    print(f"[batch] Wrote {len(rows)} rows for {len(jobs)} jobs and {len(resumes) - len(skipped)} resumes "
+          f"to {args.out} in {time.perf_counter() - start_time:.1f}s")
+    print_throughput(timer)
+
+
+if __name__ == "__main__":
+    main()
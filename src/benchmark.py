@@ -0,0 +1,316 @@
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from config.settings import NAME_BATCH_SIZE
+
+BENCHMARK_DIR = os.path.join("data", "benchmarks")
+
+FIRST_NAMES = ("Ava", "Liam", "Maya", "Noah", "Priya", "Omar", "Sofia", "Chen", "Elena", "Kwame",
+               "Hana", "Diego", "Fatima", "Lucas", "Aisha", "Mateo", "Yuki", "Ivan", "Zara", "Ravi")
+LAST_NAMES = ("Patel", "Garcia", "Kim", "Okafor", "Novak", "Silva", "Cohen", "Nguyen", "Müller",
+              "Haddad", "Rossi", "Tanaka", "Johnson", "Kowalski", "Mensah", "Ortiz", "Singh", "Larsen")
+ROLES = {
+    "Data Scientist": ("python", "sql", "machine learning", "statistics", "a/b testing", "pandas",
+                       "scikit-learn", "forecasting", "tableau", "spark"),
+    "Backend Engineer": ("java", "go", "python", "postgresql", "kafka", "kubernetes", "docker",
+                         "rest apis", "microservices", "aws"),
+    "Frontend Developer": ("javascript", "typescript", "react", "css", "accessibility", "webpack",
+                           "graphql", "jest", "design systems", "figma"),
+    "Registered Nurse": ("patient care", "icu", "bls", "acls", "medication administration", "epic",
+                         "triage", "wound care", "charting", "telemetry"),
+    "Financial Analyst": ("excel", "financial modeling", "forecasting", "sql", "budgeting", "valuation",
+                          "power bi", "variance analysis", "gaap", "sap"),
+}
+VERBS = ("Led", "Built", "Designed", "Improved", "Managed", "Automated", "Delivered", "Analyzed")
+FILLER = ("cross-functional teams", "stakeholders", "quarterly targets", "customer outcomes",
+          "production systems", "reporting workflows", "operational costs", "service quality")
+
+
+def synthetic_resumes(count: int, seed: int = 0) -> List[str]:
+    """Resume-like texts with a name header, sections and a mix of short and multi-page lengths."""
+    rng = random.Random(seed)
+    roles = list(ROLES)
+    texts = []
+    for _ in range(count):
+        role = rng.choice(roles)
+        skills = ROLES[role]
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        bullets = rng.choice([3, 6, 12, 40])
+        lines = [name, f"{role} | {name.split()[0].lower()}@example.com", "", "SUMMARY",
+                 f"{role} with {rng.randint(1, 15)} years of experience in {', '.join(rng.sample(skills, 3))}.",
+                 "", "EXPERIENCE"]
+        for _ in range(bullets):
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(skills)} work with {rng.choice(FILLER)}, "
+                         f"improving {rng.choice(FILLER)} by {rng.randint(5, 60)}%.")
+        lines += ["", "SKILLS", ", ".join(rng.sample(skills, rng.randint(4, len(skills))))]
+        texts.append("\n".join(lines))
+    return texts
+
+
+def synthetic_jobs(count: int, seed: int = 0) -> List[str]:
+    """Job-description-like texts for the same roles as ``synthetic_resumes``."""
+    rng = random.Random(seed + 1)
+    roles = list(ROLES)
+    jobs = []
+    for _ in range(count):
+        role = rng.choice(roles)
+        skills = ROLES[role]
+        requirements = "\n".join(f"- Experience with {skill}" for skill in rng.sample(skills, 5))
+        jobs.append(f"{role}\nWe are hiring a {role.lower()} to work with {rng.choice(FILLER)}.\n"
+                    f"Requirements:\n{requirements}")
+    return jobs
+
+
+def latency_summary(stage: str, unit: str, items: int, seconds: float, latencies: Sequence[float]) -> Dict[str, object]:
+    """Throughput plus p50/p95/p99 of per-``unit`` latencies (seconds in, milliseconds out)."""
+    latencies_ms = np.asarray(latencies, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if latencies_ms.size else (0.0, 0.0, 0.0)
+    return {
+        "stage": stage,
+        "unit": unit,
+        "items": items,
+        "seconds": seconds,
+        "throughput": items / seconds if seconds else 0.0,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+def _time_calls(batches: Iterable, fn: Callable) -> tuple:
+    latencies = []
+    start_time = time.perf_counter()
+    for batch in batches:
+        call_start = time.perf_counter()
+        fn(batch)
+        latencies.append(time.perf_counter() - call_start)
+    return time.perf_counter() - start_time, latencies
+
+
+def _time_stream(stream: Iterable) -> tuple:
+    """Seconds until each item of ``stream`` arrived, measured from the start."""
+    latencies = []
+    start_time = time.perf_counter()
+    for _ in stream:
+        latencies.append(time.perf_counter() - start_time)
+    return time.perf_counter() - start_time, latencies
+
+
+def _batches(items: Sequence, size: int) -> List[Sequence]:
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def bench_parse(texts: Sequence[str], latency_ms: float, error_rate: float, concurrency: int) -> Dict[str, object]:
+    """Concurrent parsing through ``FakeLlamaParse``; latency is time until each file's text arrives."""
+    from src.fakes import FakeLlamaParse
+    from src.parse_cache import ParseCache
+    from src.resume_parser import parse_resumes_batch
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, text in enumerate(texts):
+            path = os.path.join(tmp, f"resume_{i}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            paths.append(path)
+        # Start from an empty parse cache so every file reaches the parser
+        cache = ParseCache(os.path.join(tmp, "parse_cache.sqlite"))
+        parser = FakeLlamaParse(latency_ms=latency_ms, jitter_ms=latency_ms * 0.4, error_rate=error_rate)
+        seconds, latencies = _time_stream(parse_resumes_batch(
+            paths, parser=parser, concurrency=concurrency, retry_delay=0.05, use_local=False, cache=cache))
+    return latency_summary("parse", "file", len(paths), seconds, latencies)
+
+
+def bench_names(texts: Sequence[str], batch_size: int = NAME_BATCH_SIZE) -> Dict[str, object]:
+    from src.resume_parser import extract_names_from_resumes
+
+    seconds, latencies = _time_calls(_batches(texts, batch_size), extract_names_from_resumes)
+    return latency_summary("names", f"batch of {batch_size}", len(texts), seconds, latencies)
+
+
+def bench_embed(embedder, texts: Sequence[str], batch_size: int) -> tuple:
+    """Uncached encoding in batches of ``batch_size``; also returns the embeddings for ranking."""
+    chunks = []
+    seconds, latencies = _time_calls(_batches(texts, batch_size), lambda batch: chunks.append(embedder._encode(batch)))
+    return latency_summary("embed", f"batch of {batch_size}", len(texts), seconds, latencies), np.vstack(chunks)
+
+
+def bench_rank(job_embeddings, resume_embeddings, top_k: int) -> Dict[str, object]:
+    from src.ranking import rank_embeddings
+
+    seconds, latencies = _time_calls(job_embeddings, lambda job: rank_embeddings(job, resume_embeddings, top_k=top_k))
+    return latency_summary("rank", f"query over {len(resume_embeddings)}", len(job_embeddings), seconds, latencies)
+
+
+def bench_reasoning(job: str, candidates: Sequence[tuple], latency_ms: float, error_rate: float,
+                    rpm: float, tpm: float, batched: bool) -> Dict[str, object]:
+    """Reasoning against ``FakeGroqServer``; latency is time until each explanation arrives."""
+    from src.fakes import FakeGroqServer
+
+    from src.reasoning import RateLimiter, make_async_client, stream_fit_reasoning
+
+    fake = FakeGroqServer(latency_ms=latency_ms, jitter_ms=latency_ms * 0.4, error_rate=error_rate).start()
+    try:
+        # Only used inside the stream's own event loop
+        async_client = make_async_client(api_key="fake-key", base_url=fake.url)
+        seconds, latencies = _time_stream(stream_fit_reasoning(
+            job, list(candidates), async_client=async_client, limiter=RateLimiter(rpm, tpm), use_cache=False,
+            retry_delay=0.1, batched=batched))
+    finally:
+        fake.stop()
+    stage = "reasoning_batched" if batched else "reasoning"
+    result = latency_summary(stage, "candidate", len(candidates), seconds, latencies)
+    result["requests"] = fake.requests
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare_reports(current: Dict[str, object], baseline: Dict[str, object], tolerance: float = 0.1) -> List[Dict[str, object]]:
+    """Per-stage throughput and p95 changes against ``baseline``; flags moves worse than ``tolerance``."""
+    before = {stage["stage"]: stage for stage in baseline["stages"] if "skipped" not in stage}
+    rows = []
+    for stage in current["stages"]:
+        old = before.get(stage["stage"])
+        if old is None or "skipped" in stage:
+            continue
+        throughput = stage["throughput"] / old["throughput"] - 1 if old["throughput"] else 0.0
+        p95 = stage["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        rows.append({
+            "stage": stage["stage"],
+            "throughput_change": throughput,
+            "p95_change": p95,
+            "regression": throughput < -tolerance or p95 > tolerance,
+        })
+    return rows
+
+
+def print_report(report: Dict[str, object]) -> None:
+    print(f"{'stage':<18} {'unit':<18} {'items':>7} {'items/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage in report["stages"]:
+        if "skipped" in stage:
+            print(f"{stage['stage']:<18} skipped: {stage['skipped']}")
+            continue
+        print(f"{stage['stage']:<18} {stage['unit']:<18} {stage['items']:>7} {stage['throughput']:>9.1f} "
+              f"{stage['p50_ms']:>9.1f} {stage['p95_ms']:>9.1f} {stage['p99_ms']:>9.1f}")
+
+
+def run_benchmarks(args) -> Dict[str, object]:
+    resumes = synthetic_resumes(args.resumes, seed=args.seed)
+    jobs = synthetic_jobs(args.jobs, seed=args.seed)
+    stages = []
+
+    def run(stage: str, fn: Callable):
+        try:
+            return fn()
+        except Exception as e:
+            stages.append({"stage": stage, "skipped": f"{type(e).__name__}: {e}"})
+            return None
+
+    if "parse" in args.stages:
+        result = run("parse", lambda: bench_parse(resumes[:args.parse_docs], args.parse_latency_ms,
+                                                  args.error_rate, args.parse_concurrency))
+        stages += [result] if result else []
+    if "names" in args.stages:
+        result = run("names", lambda: bench_names(resumes))
+        stages += [result] if result else []
+
+    resume_embeddings = job_embeddings = None
+    if "embed" in args.stages or "rank" in args.stages:
+        def embed():
+            from src.embeddings import JobResumeEmbedder
+
+            embedder = JobResumeEmbedder(use_cache=False)
+            result, vectors = bench_embed(embedder, resumes, args.embed_batch)
+            return result, vectors, embedder._encode(jobs)
+        embedded = run("embed", embed)
+        if embedded:
+            result, resume_embeddings, job_embeddings = embedded
+            if "embed" in args.stages:
+                stages.append(result)
+    if "rank" in args.stages:
+        if resume_embeddings is None:
+            # No model here: ranking cost does not depend on what the vectors mean
+            from src.vector_index import _synthetic_embeddings
+
+            rng = np.random.default_rng(args.seed)
+            resume_embeddings = _synthetic_embeddings(len(resumes), 768, n_topics=50, rng=rng)
+            job_embeddings = _synthetic_embeddings(len(jobs), 768, n_topics=50, rng=rng)
+        stages.append(bench_rank(job_embeddings, resume_embeddings, args.top_k))
+
+    if "reasoning" in args.stages:
+        candidates = [(f"Candidate {i + 1}", text) for i, text in enumerate(resumes[:args.reason_docs])]
+        for batched in (False, True):
+            result = run("reasoning", lambda: bench_reasoning(jobs[0], candidates, args.groq_latency_ms,
+                                                              args.error_rate, args.groq_rpm, args.groq_tpm, batched))
+            stages += [result] if result else []
+
+    return {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+        "stages": stages,
+    }
+
+
+def main():
+    """Run the offline benchmark suite, save a JSON baseline and optionally diff it against another."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmarks with offline fakes")
+    parser.add_argument("--resumes", type=int, default=1000, help="Synthetic resumes (10 to 100k)")
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--stages", nargs="+", default=["parse", "names", "embed", "rank", "reasoning"],
+                        choices=["parse", "names", "embed", "rank", "reasoning"])
+    parser.add_argument("--parse-docs", type=int, default=200, help="Resumes sent through the fake parser")
+    parser.add_argument("--parse-latency-ms", type=float, default=500.0)
+    parser.add_argument("--parse-concurrency", type=int, default=8)
+    parser.add_argument("--embed-batch", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--reason-docs", type=int, default=20, help="Candidates sent to the fake Groq API")
+    parser.add_argument("--groq-latency-ms", type=float, default=800.0)
+    parser.add_argument("--groq-rpm", type=float, default=600.0, help="Rate limit applied to the fake")
+    parser.add_argument("--groq-tpm", type=float, default=1_000_000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Failure rate of both fakes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Baseline JSON path (default data/benchmarks/<commit>.json)")
+    parser.add_argument("--compare", help="Baseline JSON to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change flagged as a regression")
+    args = parser.parse_args()
+    args.parse_docs = min(args.parse_docs, args.resumes)
+    args.reason_docs = min(args.reason_docs, args.resumes)
+
+    report = run_benchmarks(args)
+    print_report(report)
+
+    out = args.out or os.path.join(BENCHMARK_DIR, f"{report['commit'] or 'latest'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved baseline to {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nvs {args.compare} (commit {baseline.get('commit')}):")
+        print(f"{'stage':<18} {'items/s':>9} {'p95':>9}")
+        for row in compare_reports(report, baseline, args.tolerance):
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['stage']:<18} {row['throughput_change']:>+9.1%} {row['p95_change']:>+9.1%}{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+from typing import List, Optional
+
+import numpy as np
+
+POOLING_MODES = ("max", "mean", "topn")
+
+
+def chunk_text(text: str, tokenizer=None, max_tokens: int = 128, overlap: int = 16) -> List[str]:
+    """Split ``text`` into overlapping windows of at most ``max_tokens`` tokens.
+
+    Windows are cut on the tokenizer's character offsets so each chunk is a
+    slice of the original text. Without a fast tokenizer, words stand in for
+    tokens. Always returns at least one chunk.
+    """
+    if not text or not text.strip():
+        return [text or ""]
+    step = max(1, max_tokens - overlap)
+
+    spans = None
+    if tokenizer is not None:
+        try:
+            encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+            spans = encoded["offset_mapping"]
+        except Exception:
+            spans = None  # slow tokenizers have no offsets
+    if spans is None:
+        words = text.split()
+        if len(words) <= max_tokens:
+            return [text]
+        return [" ".join(words[start:start + max_tokens]) for start in range(0, len(words) - overlap, step)]
+
+    if len(spans) <= max_tokens:
+        return [text]
+    chunks = []
+    for start in range(0, len(spans) - overlap, step):
+        window = spans[start:start + max_tokens]
+        chunks.append(text[window[0][0]:window[-1][1]])
+    return chunks
+
+
+def chunk_offsets(chunks_per_doc: List[List[str]]) -> np.ndarray:
+    """Start index of each document's chunks in the flattened chunk list (plus the total)."""
+    return np.concatenate([[0], np.cumsum([len(chunks) for chunks in chunks_per_doc])]).astype(np.int64)
+
+
+def pool_chunk_scores(chunk_scores, offsets, mode: str = "max", top_n: Optional[int] = 3) -> np.ndarray:
+    """Reduce per-chunk similarities to one score per document.
+
+    ``mode`` is ``max``, ``mean`` or ``topn`` (mean of the best ``top_n`` chunks).
+    Every document must have at least one chunk.
+    """
+    chunk_scores = np.asarray(chunk_scores, dtype=np.float32)
+    starts = np.asarray(offsets[:-1])
+    counts = np.diff(offsets)
+    if starts.shape[0] == 0:
+        return np.empty(0, dtype=np.float32)
+    if mode == "max":
+        return np.maximum.reduceat(chunk_scores, starts)
+    if mode == "mean":
+        return np.add.reduceat(chunk_scores, starts) / counts
+    if mode == "topn":
+        pooled = np.empty(starts.shape[0], dtype=np.float32)
+        for doc, (start, count) in enumerate(zip(starts, counts)):
+            doc_scores = chunk_scores[start:start + count]
+            n = min(top_n or 1, count)
+            pooled[doc] = np.partition(doc_scores, count - n)[count - n:].mean()
+        return pooled
+    raise ValueError(f"Unknown pooling mode '{mode}'; expected one of {POOLING_MODES}")
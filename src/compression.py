@@ -0,0 +1,217 @@
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import (
+    REASONING_JOB_TOKEN_BUDGET,
+    REASONING_RESUME_TOKEN_BUDGET,
+    REASONING_TOKENIZER,
+)
+from src.ranking import normalize_rows
+
+try:
+    import tiktoken  # type: ignore
+except Exception:  # pragma: no cover
+    tiktoken = None  # fall back to a word-piece estimate
+
+try:
+    from nltk.corpus import stopwords as nltk_stopwords  # type: ignore
+except Exception:
+    nltk_stopwords = None  # Fallback if NLTK isn't installed or data missing
+
+# A compact fallback English stopword list to avoid hard dependency on NLTK
+DEFAULT_STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "while", "with", "without", "to", "from",
+    "of", "in", "on", "for", "as", "by", "at", "is", "are", "was", "were", "be", "been",
+    "being", "this", "that", "these", "those", "it", "its", "into", "over", "under", "about",
+    "above", "below", "up", "down", "out", "off", "than", "then", "so", "such", "not", "no",
+    "can", "could", "should", "would", "may", "might", "must", "will", "just", "do", "does",
+    "did", "doing", "have", "has", "had", "having", "i", "you", "he", "she", "we", "they",
+    "me", "him", "her", "us", "them", "my", "your", "his", "her", "our", "their", "mine",
+    "yours", "ours", "theirs"
+}
+
+
+def _load_stopwords() -> frozenset:
+    if nltk_stopwords is not None:
+        try:
+            return frozenset(nltk_stopwords.words('english'))
+        except Exception:
+            # Missing corpus; keep fallback
+            pass
+    return frozenset(DEFAULT_STOPWORDS)
+
+
+STOPWORDS = _load_stopwords()  # built once per process
+
+_SEGMENT_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+_HEADER = re.compile(r"^\s*(#{1,6}\s|[A-Z][A-Z &/]{2,}:?\s*$)")
+_WORD_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def remove_stopwords(text: str) -> str:
+    """Remove stopwords using the precompiled NLTK (or fallback) set."""
+    if not text:
+        return text
+    return " ".join(word for word in text.split() if word.lower() not in STOPWORDS)
+
+
+_ENCODING = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count under the reasoning model's tokenizer (tiktoken), or a word-piece estimate."""
+    global _ENCODING
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _ENCODING is None:
+            try:
+                _ENCODING = tiktoken.get_encoding(REASONING_TOKENIZER)
+            except Exception:
+                _ENCODING = False
+        if _ENCODING:
+            return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(_WORD_PIECES.findall(text))
+
+
+def split_segments(text: str) -> List[Tuple[str, bool]]:
+    """Split a resume into ``(segment, is_header)`` pieces: headers, bullets and sentences."""
+    segments = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if _HEADER.match(line):
+            segments.append((line, True))
+            continue
+        segments.extend((piece, False) for piece in _SEGMENT_SPLIT.split(line) if piece.strip())
+    return segments
+
+
+def truncate_to_budget(text: str, budget: int) -> str:
+    """Keep leading words of ``text`` until ``budget`` tokens."""
+    if count_tokens(text) <= budget:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:mid])) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return " ".join(words[:low])
+
+
+def compress_resume(
+    resume_text: str,
+    job_embedding,
+    encode_fn: Callable[[List[str]], np.ndarray],
+    budget: int = REASONING_RESUME_TOKEN_BUDGET,
+) -> str:
+    """Keep the resume sentences most similar to the job, in original order, within ``budget`` tokens.
+
+    Section headers are kept when any sentence under them is kept. A sentence
+    larger than the remaining budget (e.g. unpunctuated PDF text) is cut to fit.
+    """
+    stripped = remove_stopwords(resume_text)
+    if count_tokens(stripped) <= budget:
+        return stripped
+
+    segments = split_segments(resume_text)
+    body = [i for i, (_, is_header) in enumerate(segments) if not is_header]
+    if not body:
+        return truncate_to_budget(stripped, budget)
+    vectors = normalize_rows(encode_fn([segments[i][0] for i in body]))
+    scores = vectors @ normalize_rows(job_embedding)[0]
+
+    header_of = {}
+    current = None
+    for i, (_, is_header) in enumerate(segments):
+        if is_header:
+            current = i
+        else:
+            header_of[i] = current
+
+    cleaned = [remove_stopwords(segment) for segment, _ in segments]
+    costs = [count_tokens(segment) + 1 for segment in cleaned]
+    kept, seen, used = set(), set(), 0
+    for rank in np.argsort(-scores, kind="stable"):
+        i = body[rank]
+        if cleaned[i] in seen:
+            continue  # repeated boilerplate lines add tokens but no information
+        header = header_of[i]
+        header_cost = costs[header] if header is not None and header not in kept else 0
+        seen.add(cleaned[i])
+        if used + header_cost + costs[i] > budget:
+            remaining = budget - used - header_cost - 1
+            if remaining <= 0:
+                continue
+            cleaned[i] = truncate_to_budget(cleaned[i], remaining)
+            if not cleaned[i]:
+                continue
+        kept.add(i)
+        if header is not None:
+            kept.add(header)
+        used += header_cost + count_tokens(cleaned[i]) + 1
+    if not kept:
+        return truncate_to_budget(stripped, budget)
+    return "\n".join(cleaned[i] for i in sorted(kept))
+
+
+class PromptCompressor:
+    """Shrinks job/resume text to hard token budgets before LLM calls and tallies the savings."""
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        job_budget: int = REASONING_JOB_TOKEN_BUDGET,
+        resume_budget: int = REASONING_RESUME_TOKEN_BUDGET,
+    ):
+        self.encode_fn = encode_fn
+        self.job_budget = job_budget
+        self.resume_budget = resume_budget
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.requests = 0
+        self.last: Optional[Dict[str, int]] = None
+        self._job_embedding = (None, None)  # (job text, embedding), reused across resumes
+
+    def _embed_job(self, job_description: str):
+        text, embedding = self._job_embedding
+        if text != job_description:
+            embedding = self.encode_fn([job_description])[0]
+            self._job_embedding = (job_description, embedding)
+        return embedding
+
+    def compress(self, job_description: str, resume_text: str, job_embedding=None) -> Tuple[str, str]:
+        """Return the compressed ``(job_description, resume_text)`` pair.
+
+        The job embedding is only computed when the resume is over budget.
+        """
+        job_out = truncate_to_budget(remove_stopwords(job_description), self.job_budget)
+        stripped = remove_stopwords(resume_text)
+        if count_tokens(stripped) <= self.resume_budget:
+            resume_out = stripped
+        else:
+            if job_embedding is None:
+                job_embedding = self._embed_job(job_description)
+            resume_out = compress_resume(resume_text, job_embedding, self.encode_fn, self.resume_budget)
+
+        tokens_in = count_tokens(job_description) + count_tokens(resume_text)
+        tokens_out = count_tokens(job_out) + count_tokens(resume_out)
+        self.input_tokens += tokens_in
+        self.output_tokens += tokens_out
+        self.requests += 1
+        self.last = {"input_tokens": tokens_in, "output_tokens": tokens_out}
+        return job_out, resume_out
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "saved_ratio": 1 - self.output_tokens / self.input_tokens if self.input_tokens else 0.0,
+        }
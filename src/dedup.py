@@ -0,0 +1,185 @@
+import json
+import os
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import (
+    DEDUP_BANDS,
+    DEDUP_INDEX_DIR,
+    DEDUP_NUM_PERM,
+    DEDUP_SHINGLE_SIZE,
+    DEDUP_THRESHOLD,
+)
+from src.lexical_index import tokenize
+from src.utils import ensure_dir
+
+META_FILE = "meta.json"
+ARRAYS_FILE = "arrays.npz"
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+def shingles(text: str, size: int = DEDUP_SHINGLE_SIZE) -> List[str]:
+    """Word ``size``-grams over normalized tokens, so PDF/DOCX/pasted copies of a resume agree."""
+    tokens = tokenize(text)
+    if len(tokens) <= size:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+class MinHashLSH:
+    """MinHash signatures of parsed resumes with banded LSH buckets.
+
+    A signature has ``num_perm`` minimum hashes; it is cut into ``bands``
+    bands and resumes sharing any band land in the same bucket, so a lookup
+    only compares against bucket-mates instead of the whole pool. Pairs whose
+    estimated Jaccard similarity reaches ``threshold`` are near-duplicates.
+    """
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, bands: int = DEDUP_BANDS,
+                 threshold: float = DEDUP_THRESHOLD, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.threshold = threshold
+        self.seed = seed
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 61, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 61, size=num_perm, dtype=np.uint64)
+        self._signatures: List[np.ndarray] = []
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+        self.doc_ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._row_of
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles(text)], dtype=np.uint64)
+        if not hashes.size:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        # Universal hashing (a*x + b mod p); uint64 products wrap, which keeps them well mixed
+        permuted = ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME) & _MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows_per_band:(i + 1) * self.rows_per_band].tobytes()
+                for i in range(self.bands)]
+
+    def add(self, doc_id: str, text: Optional[str] = None, signature: Optional[np.ndarray] = None) -> np.ndarray:
+        """Index one resume (no-op for a known ``doc_id``); returns its signature."""
+        row = self._row_of.get(doc_id)
+        if row is not None:
+            return self._signatures[row]
+        if signature is None:
+            signature = self.signature(text)
+        row = len(self.doc_ids)
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].append(row)
+        self._signatures.append(signature)
+        self.doc_ids.append(doc_id)
+        self._row_of[doc_id] = row
+        return signature
+
+    def query(self, signature: np.ndarray, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """``(doc_id, estimated Jaccard)`` of indexed near-duplicates, most similar first."""
+        threshold = self.threshold if threshold is None else threshold
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(key, ()))
+        matches = []
+        for row in candidates:
+            similarity = float(np.mean(self._signatures[row] == signature))
+            if similarity >= threshold:
+                matches.append((self.doc_ids[row], similarity))
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+    def save(self, path: str = DEDUP_INDEX_DIR) -> None:
+        ensure_dir(path)
+        signatures = np.stack(self._signatures) if self._signatures else np.empty((0, self.num_perm), np.uint32)
+        tmp_arrays = os.path.join(path, "arrays.tmp.npz")
+        np.savez(tmp_arrays, signatures=signatures)
+        os.replace(tmp_arrays, os.path.join(path, ARRAYS_FILE))
+        meta = {"num_perm": self.num_perm, "bands": self.bands, "threshold": self.threshold,
+                "seed": self.seed, "doc_ids": self.doc_ids}
+        tmp_meta = os.path.join(path, META_FILE + ".tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, os.path.join(path, META_FILE))
+
+    @classmethod
+    def load(cls, path: str = DEDUP_INDEX_DIR) -> "MinHashLSH":
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(os.path.join(path, ARRAYS_FILE)) as arrays:
+            signatures = arrays["signatures"]
+        index = cls(num_perm=meta["num_perm"], bands=meta["bands"], threshold=meta["threshold"], seed=meta["seed"])
+        for doc_id, signature in zip(meta["doc_ids"], signatures):
+            index.add(doc_id, signature=signature)
+        return index
+
+
+def load_or_create(path: str = DEDUP_INDEX_DIR) -> MinHashLSH:
+    """The saved pool at ``path`` if it matches the current settings, or an empty one."""
+    if os.path.exists(os.path.join(path, META_FILE)):
+        try:
+            index = MinHashLSH.load(path)
+            if (index.num_perm, index.bands) == (DEDUP_NUM_PERM, DEDUP_BANDS):
+                index.threshold = DEDUP_THRESHOLD
+                return index
+            print(f"[dedup] MinHash settings changed; rebuilding the pool at {path}")
+        except Exception as e:
+            print(f"[dedup] Ignoring unreadable pool at {path}: {e}")
+    return MinHashLSH()
+
+
+class DuplicateGroups:
+    """Groups the resumes of one run around the first copy seen (its representative).
+
+    Lookups go through the (persisted) ``MinHashLSH`` pool, but only resumes
+    assigned in this run can become representatives.
+    """
+
+    def __init__(self, index: MinHashLSH):
+        self.index = index
+        self.representative: Dict[str, str] = {}
+        self.members: Dict[str, List[str]] = defaultdict(list)
+
+    def assign(self, doc_id: str, text: str, representative: Optional[str] = None) -> str:
+        """Representative of ``doc_id`` (itself unless a near-duplicate was assigned earlier).
+
+        Pass ``representative`` to restore a grouping decided in an earlier run.
+        """
+        if doc_id in self.representative:
+            return self.representative[doc_id]
+        signature = self.index.add(doc_id, text)
+        if representative is None:
+            representative = doc_id
+            for match_id, _similarity in self.index.query(signature):
+                if match_id != doc_id and match_id in self.representative:
+                    representative = self.representative[match_id]
+                    break
+        self.representative[doc_id] = representative
+        self.members[representative].append(doc_id)
+        return representative
+
+    def duplicates(self, representative: str) -> List[str]:
+        """The other members of ``representative``'s group."""
+        return [doc_id for doc_id in self.members.get(representative, ()) if doc_id != representative]
+
+    def groups(self) -> Dict[str, List[str]]:
+        """Representative -> duplicates, for groups with more than one member."""
+        return {rep: self.duplicates(rep) for rep, members in self.members.items() if len(members) > 1}
+
+
+def collision_probability(similarity: float, bands: int = DEDUP_BANDS, num_perm: int = DEDUP_NUM_PERM) -> float:
+    """Chance that two resumes with Jaccard ``similarity`` share at least one LSH bucket."""
+    return 1 - (1 - similarity ** (num_perm // bands)) ** bands
@@ -0,0 +1,292 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.settings import (
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_FLUSH_SECONDS,
+    EMBEDDING_CACHE_MAX_MB,
+    EMBEDDING_MODEL,
+)
+from src.instrumentation import span
+from src.utils import ensure_dir
+
+INDEX_FILE = "index.json"
+LOG_FILE = "index.log"
+VECTORS_FILE = "vectors.f32"
+
+
+def model_slug(model_name: str) -> str:
+    return model_name.replace("/", "__")
+
+
+def text_key(text: str, model_name: str = EMBEDDING_MODEL) -> str:
+    """Content address for a text under a given embedding model."""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk, content-addressed store of embedding vectors.
+
+    Vectors live in a single float32 file opened as a numpy memmap; a small
+    JSON index maps each text hash to its row. Rows are reused in
+    least-recently-used order once the store reaches ``max_mb``. New entries
+    are appended to ``index.log`` as they are written and folded into the
+    JSON index by ``save`` (at most every ``flush_seconds`` via
+    ``save_if_due``, and at exit), so a write never rewrites the whole index.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = EMBEDDING_CACHE_DIR,
+        model_name: str = EMBEDDING_MODEL,
+        max_mb: float = EMBEDDING_CACHE_MAX_MB,
+        flush_seconds: float = EMBEDDING_CACHE_FLUSH_SECONDS,
+    ):
+        self.model_name = model_name
+        self.dir = os.path.join(cache_dir, model_slug(model_name))
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0  # time spent encoding misses
+        self.encoded = 0
+        self._lock = threading.Lock()
+        self._dim: Optional[int] = None
+        self._rows = 0
+        self._slots: "OrderedDict[str, int]" = OrderedDict()  # key -> row, LRU first
+        self._free: List[int] = []
+        self._vectors: Optional[np.memmap] = None
+        self.flush_seconds = flush_seconds
+        self._dirty = False
+        self._last_save = time.time()
+        self._load()
+        atexit.register(self.save)
+
+    # -- persistence -------------------------------------------------
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.dir, INDEX_FILE)
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.dir, VECTORS_FILE)
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.dir, LOG_FILE)
+
+    def _replay_log(self) -> None:
+        """Apply ``key\trow`` entries written since the last ``save``; a torn last line is ignored."""
+        if not os.path.exists(self._log_path):
+            return
+        key_of = {row: key for key, row in self._slots.items()}
+        with open(self._log_path, "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                key, _, row = line.rstrip("\n").partition("\t")
+                if not row.isdigit() or int(row) >= self._rows:
+                    continue
+                row = int(row)
+                stale = key_of.get(row)
+                if stale is not None and stale != key:
+                    self._slots.pop(stale, None)
+                self._slots.pop(key, None)
+                self._slots[key] = row
+                key_of[row] = key
+        self._dirty = True
+
+    def _load(self) -> None:
+        if not os.path.exists(self._index_path) or not os.path.exists(self._vectors_path):
+            return
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self._dim = int(meta["dim"])
+            # The vector file may have grown after the index was last written
+            self._rows = max(int(meta["rows"]), os.path.getsize(self._vectors_path) // (self._dim * 4))
+            self._slots = OrderedDict((k, int(v)) for k, v in meta["slots"])
+            self._replay_log()
+            used = set(self._slots.values())
+            self._free = [r for r in range(self._rows) if r not in used]
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r+", shape=(self._rows, self._dim)
+            )
+        except Exception:
+            # Corrupt or incompatible cache; start over
+            self._dim, self._rows = None, 0
+            self._slots, self._free, self._vectors = OrderedDict(), [], None
+
+    def save(self) -> None:
+        """Flush vectors, write the index atomically and truncate the append log."""
+        with self._lock:
+            if self._dim is None or (not self._dirty and os.path.exists(self._index_path)):
+                return
+            if self._vectors is not None:
+                self._vectors.flush()
+            ensure_dir(self.dir)
+            tmp_path = self._index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"model": self.model_name, "dim": self._dim, "rows": self._rows,
+                     "slots": list(self._slots.items())},
+                    f,
+                )
+            os.replace(tmp_path, self._index_path)
+            if os.path.exists(self._log_path):
+                os.remove(self._log_path)
+            self._dirty = False
+            self._last_save = time.time()
+
+    def save_if_due(self) -> None:
+        """``save`` once ``flush_seconds`` have passed since the last one (or no index exists yet)."""
+        if self._dirty and (time.time() - self._last_save >= self.flush_seconds
+                            or not os.path.exists(self._index_path)):
+            self.save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vectors = None
+            for path in (self._index_path, self._vectors_path, self._log_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._dim, self._rows = None, 0
+            self._slots, self._free = OrderedDict(), []
+            self._dirty = False
+
+    # -- storage -----------------------------------------------------
+
+    @property
+    def capacity(self) -> int:
+        if not self._dim:
+            return 0
+        return max(1, self.max_bytes // (self._dim * 4))
+
+    def _grow(self, needed: int) -> None:
+        """Extend the vector file so it holds at least ``needed`` more rows."""
+        new_rows = min(self.capacity, max(self._rows * 2, self._rows + needed, 64))
+        if new_rows <= self._rows:
+            return
+        ensure_dir(self.dir)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._vectors = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_rows * self._dim * 4)
+        self._free.extend(range(self._rows, new_rows))
+        self._rows = new_rows
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+", shape=(self._rows, self._dim)
+        )
+
+    def _take_row(self) -> int:
+        if not self._free:
+            self._grow(1)
+        if self._free:
+            return self._free.pop()
+        # Full: evict the least recently used entry and reuse its row
+        _, row = self._slots.popitem(last=False)
+        return row
+
+    # -- public API --------------------------------------------------
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Return cached vectors (or None for misses) in the order of ``texts``."""
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for text in texts:
+                key = text_key(text, self.model_name)
+                row = self._slots.get(key)
+                if row is None or self._vectors is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                self._slots.move_to_end(key)
+                self.hits += 1
+                results.append(np.array(self._vectors[row]))
+        return results
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: List[str], vectors) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        with self._lock:
+            if self._dim is None:
+                self._dim = int(vectors.shape[1])
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match cache dimension {self._dim}"
+                )
+            entries = []
+            for text, vector in zip(texts, vectors):
+                key = text_key(text, self.model_name)
+                row = self._slots.pop(key, None)
+                if row is None:
+                    row = self._take_row()
+                self._vectors[row] = vector
+                self._slots[key] = row
+                entries.append(f"{key}\t{row}\n")
+            with open(self._log_path, "a", encoding="utf-8") as f:
+                f.write("".join(entries))
+            self._dirty = True
+
+    def put(self, text: str, vector) -> None:
+        self.put_many([text], vector)
+
+    def record_encode_time(self, seconds: float, count: int) -> None:
+        self.encode_seconds += seconds
+        self.encoded += count
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters plus an estimate of the encode time the hits saved."""
+        lookups = self.hits + self.misses
+        per_doc = self.encode_seconds / self.encoded if self.encoded else 0.0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._slots),
+            "capacity": self.capacity,
+            "encode_seconds": self.encode_seconds,
+            "estimated_seconds_saved": self.hits * per_doc,
+        }
+
+
+def encode_with_cache(cache: Optional[EmbeddingCache], encode_fn, texts: List[str]) -> np.ndarray:
+    """Encode ``texts`` through ``cache``, batching all misses into one ``encode_fn`` call."""
+    if not texts:
+        # Width is the cached dimension when known; nothing is encoded just to learn it
+        return np.empty((0, cache._dim if cache is not None and cache._dim else 0), dtype=np.float32)
+    if cache is None:
+        return np.asarray(encode_fn(texts))
+    with span("embedding_cache", documents=len(texts)) as sp:
+        cached = cache.get_many(texts)
+        miss_idx = [i for i, vec in enumerate(cached) if vec is None]
+        sp.set(cache_hits=len(texts) - len(miss_idx), cache_misses=len(miss_idx))
+    if miss_idx:
+        # Encode each distinct missing text once
+        unique_texts = list(dict.fromkeys(texts[i] for i in miss_idx))
+        start_time = time.time()
+        encoded = np.asarray(encode_fn(unique_texts), dtype=np.float32)
+        cache.record_encode_time(time.time() - start_time, len(unique_texts))
+        cache.put_many(unique_texts, encoded)
+        cache.save_if_due()
+        by_text = dict(zip(unique_texts, encoded))
+        for i in miss_idx:
+            cached[i] = by_text[texts[i]]
+    return np.vstack(cached).astype(np.float32, copy=False)
@@ -2,51 +2,202 @@ from sentence_transformers import SentenceTransformer
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 import time
+import threading
 from huggingface_hub import login
 import os
 from dotenv import load_dotenv
-from config.settings import EMBEDDING_MODEL
-from src.reasoning import generate_comprehensive_fit_reasoning
+from config.settings import (
+    EMBEDDING_MODEL,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_BACKEND,
+    STREAM_MICRO_BATCH,
+    SCORE_BLOCK_MB,
+    INFERENCE_SERVER_URL,
+    PREFILTER_TOP_N,
+    QUANTIZED_RESCORE,
+    HYBRID_ALPHA,
+    CHUNKING_ENABLED,
+    CHUNK_MAX_TOKENS,
+    CHUNK_OVERLAP,
+    CHUNK_POOLING,
+    CHUNK_TOP_N,
+)
+from src.embedding_cache import EmbeddingCache, encode_with_cache
+from src.inference_backend import BACKENDS, load_onnx_model
+from src.inference_server import InferenceClient
+from src.lexical_index import fuse_scores
+from src.instrumentation import span
+from src.ranking import RunningTopK, blocked_top_k, cosine_scores, normalize_rows, rank_embeddings, select_top_k
+from src.encoding_scheduler import encode_scheduled
+from src.chunking import chunk_offsets, chunk_text, pool_chunk_scores
+from src.compression import PromptCompressor, remove_stopwords
+from src.reasoning import generate_comprehensive_fit_reasoning, stream_fit_reasoning
 from src.utils import get_env_var
 
+load_dotenv()
+
 try:
-    from nltk.corpus import stopwords as nltk_stopwords  # type: ignore
-except Exception:
-    nltk_stopwords = None  # Fallback if NLTK isn't installed or data missing
-
-# A compact fallback English stopword list to avoid hard dependency on NLTK
-DEFAULT_STOPWORDS = {
-    "a", "an", "the", "and", "or", "but", "if", "while", "with", "without", "to", "from",
-    "of", "in", "on", "for", "as", "by", "at", "is", "are", "was", "were", "be", "been",
-    "being", "this", "that", "these", "those", "it", "its", "into", "over", "under", "about",
-    "above", "below", "up", "down", "out", "off", "than", "then", "so", "such", "not", "no",
-    "can", "could", "should", "would", "may", "might", "must", "will", "just", "do", "does",
-    "did", "doing", "have", "has", "had", "having", "i", "you", "he", "she", "we", "they",
-    "me", "him", "her", "us", "them", "my", "your", "his", "her", "our", "their", "mine",
-    "yours", "ours", "theirs"
-}
+    import resource  # type: ignore
+except Exception:  # pragma: no cover
+    resource = None  # Not available on Windows
+
+# Process-wide model registry so every session and rerun shares one copy of the weights
+_MODELS = {}
+_MODEL_STATS = {}
+_CACHES = {}
+_REGISTRY_LOCK = threading.RLock()  # re-entrant: ONNX loading needs the PyTorch reference
+_HF_LOGGED_IN = False
+
+
+def _rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _hf_login_once():
+    global _HF_LOGGED_IN
+    if _HF_LOGGED_IN:
+        return
+    hf_token = get_env_var("HFReadToken")
+    if hf_token:
+        try:
+            login(token=hf_token)
+        except Exception:
+            pass
+    _HF_LOGGED_IN = True
+
+
+def embedding_model_id(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND):
+    """Identifier for cached vectors; non-PyTorch backends get their own cache."""
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def _load_model(model_name, backend):
+    if backend == "torch":
+        return SentenceTransformer(model_name), "torch"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'; expected one of {BACKENDS}")
+    model = load_onnx_model(model_name, backend, reference_loader=lambda: get_model(model_name, "torch"))
+    if model is None:
+        return get_model(model_name, "torch"), "torch"
+    return model, backend
+
+
+def get_model(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND):
+    """Return the shared SentenceTransformer for ``model_name``, loading it on first use.
+
+    ``backend`` selects PyTorch or a cached ONNX export (see ``src/inference_backend.py``);
+    an ONNX backend that fails its parity check falls back to PyTorch.
+    """
+    key = (model_name, backend)
+    model = _MODELS.get(key)
+    if model is not None:
+        return model
+    with _REGISTRY_LOCK:
+        model = _MODELS.get(key)
+        if model is not None:
+            return model
+        _hf_login_once()
+        rss_before = _rss_mb()
+        start_time = time.time()
+        with span("model_load", model=model_name, backend=backend):
+            model, resolved = _load_model(model_name, backend)
+        load_seconds = time.time() - start_time
+        rss_after = _rss_mb()
+        try:
+            param_mb = sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024) or None
+        except Exception:
+            param_mb = None
+        _MODEL_STATS.setdefault(key, {
+            "backend": resolved,
+            "load_seconds": load_seconds,
+            "parameter_mb": param_mb,
+            "rss_delta_mb": (rss_after - rss_before) if rss_before is not None else None,
+        })
+        print(f"[embeddings] Loaded {model_name} ({resolved}) in {load_seconds:.2f}s"
+              + (f" ({param_mb:.0f} MB of weights)" if param_mb is not None else ""))
+        _MODELS[key] = model
+        return model
+
+
+def resolved_backend(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND):
+    """Backend actually serving ``backend`` requests (after any parity fallback)."""
+    get_model(model_name, backend)
+    return _MODEL_STATS[(model_name, backend)]["backend"]
+
+
+def get_embedding_cache(model_id=EMBEDDING_MODEL):
+    """Return the shared on-disk embedding cache for ``model_id``."""
+    with _REGISTRY_LOCK:
+        cache = _CACHES.get(model_id)
+        if cache is None:
+            cache = EmbeddingCache(model_name=model_id)
+            _CACHES[model_id] = cache
+        return cache
+
+
+def warm_up(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND):
+    """Load the model and run one encode so the first ranking request pays no startup cost."""
+    model = get_model(model_name, backend)
+    model.encode(["warm up"], convert_to_tensor=False, show_progress_bar=False)
+    return model_stats(model_name, backend)
+
+
+def model_stats(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND):
+    """Backend, load time and memory footprint of a registered model, or None if not loaded yet."""
+    return _MODEL_STATS.get((model_name, backend))
 
-load_dotenv()
 
 class JobResumeEmbedder:
-    def __init__(self):
-        """Initialize the embedding model and optionally login to Hugging Face Hub."""
-        hf_token = get_env_var("HFReadToken")
-        if hf_token:
-            try:
-                login(token=hf_token)
-            except Exception as e:
-                pass
+    def __init__(self, cache=None, use_cache=EMBEDDING_CACHE_ENABLED, chunked=CHUNKING_ENABLED,
+                 pooling=CHUNK_POOLING, top_n=CHUNK_TOP_N, server_url=INFERENCE_SERVER_URL):
+        """Attach to the shared embedding model, loading it (and logging in to
+        Hugging Face Hub) only the first time in this process.
+
+        Embeddings go through the shared ``EmbeddingCache`` unless ``use_cache``
+        is False; pass ``cache`` to use a different store. With ``chunked``,
+        ranking scores every window of long texts and pools them with
+        ``pooling`` (max, mean or topn over the best ``top_n`` chunks).
+
+        With ``server_url`` (``INFERENCE_SERVER_URL``), no model is loaded here:
+        texts are encoded by the shared inference server, which also owns the
+        embedding cache.
+        """
+        self.chunked = chunked
+        self.pooling = pooling
+        self.top_n = top_n
+        self.client = None
+        if server_url:
+            self.client = InferenceClient(server_url)
+            info = self.client.info()
+            self.model = None
+            self.backend = info["backend"]
+            self.max_seq_length = info["max_seq_length"]
         else:
-            pass
-        self.model = SentenceTransformer(EMBEDDING_MODEL)
+            self.model = get_model(EMBEDDING_MODEL, EMBEDDING_BACKEND)
+            self.backend = resolved_backend(EMBEDDING_MODEL, EMBEDDING_BACKEND)
+            self.max_seq_length = self.model.get_max_seq_length()
+            if cache is None and use_cache:
+                cache = get_embedding_cache(embedding_model_id(EMBEDDING_MODEL, self.backend))
+        self.cache = cache
+        self._compressor = None
+
+    def _encode(self, texts):
+        with span("encode", documents=len(texts), backend=self.backend) as sp:
+            if sp:
+                sp.set(chars=sum(len(text) for text in texts), remote=self.client is not None)
+            if self.client is not None:
+                return self.client.encode(texts)
+            # Length-bucketed batches; large ingests go to the CPU worker pool
+            return encode_scheduled(self.model, texts)
 
-    
     def generate_embedding(self, text):
         """Generate embedding for a single text (job description or resume)."""
         if not text or not text.strip():
             raise ValueError("Text cannot be empty")
-        return self.model.encode(text, convert_to_tensor=False)
+        return encode_with_cache(self.cache, self._encode, [text])[0]
     
     def generate_job_embedding(self, job_description):
         return self.generate_embedding(job_description)
@@ -61,59 +212,231 @@ class JobResumeEmbedder:
         return similarity
     
     def batch_resume_embeddings(self, resume_texts):
-        start_time = time.time()
-        embeddings = self.model.encode(resume_texts, convert_to_tensor=False, show_progress_bar=True)
-        end_time = time.time()
-        return embeddings
+        """Embed resumes, encoding only the texts missing from the cache in one batch."""
+        return encode_with_cache(self.cache, self._encode, list(resume_texts))
+
+    def cache_stats(self):
+        """Hit/miss counters of the embedding cache, or None when caching is off."""
+        return self.cache.stats() if self.cache is not None else None
     
-    def rank_candidates(self, job_description, resume_texts, candidate_names=None):
-        job_embedding = self.generate_job_embedding(job_description)
-        resume_embeddings = self.batch_resume_embeddings(resume_texts)
-        similarities = []
-        for resume_embedding in resume_embeddings:
-            similarity = self.calculate_similarity(job_embedding, resume_embedding)
-            similarities.append(similarity)
+    def chunk_texts(self, texts):
+        """Split each text into overlapping windows that fit the model's max sequence length."""
+        tokenizer = getattr(self.model, "tokenizer", None)
+        # Leave room for the [CLS]/[SEP] special tokens
+        max_tokens = CHUNK_MAX_TOKENS or max(8, self.max_seq_length - 2)
+        return [chunk_text(text, tokenizer, max_tokens, CHUNK_OVERLAP) for text in texts]
+
+    def chunk_embeddings(self, texts):
+        """Embed every chunk of every text in one batched, cached pass.
+
+        Returns ``(embeddings, offsets)``; text ``i`` owns rows
+        ``offsets[i]:offsets[i + 1]``. Chunk vectors are cached by chunk text,
+        so they are reused across job descriptions.
+        """
+        chunks_per_doc = self.chunk_texts(texts)
+        flat = [chunk for chunks in chunks_per_doc for chunk in chunks]
+        return encode_with_cache(self.cache, self._encode, flat), chunk_offsets(chunks_per_doc)
+
+    def chunked_job_embedding(self, job_description):
+        """Mean of the normalized job-description chunk vectors."""
+        job_chunks, _ = self.chunk_embeddings([job_description])
+        return normalize_rows(job_chunks).mean(axis=0)
+
+    def chunked_scores(self, job_description, resume_texts, pooling=CHUNK_POOLING, top_n=CHUNK_TOP_N,
+                       job_embedding=None):
+        """Cosine score per resume, pooled over its chunks against the mean job-chunk vector."""
+        if job_embedding is None:
+            job_embedding = self.chunked_job_embedding(job_description)
+        resume_chunks, offsets = self.chunk_embeddings(resume_texts)
+        return pool_chunk_scores(cosine_scores(job_embedding, resume_chunks), offsets, pooling, top_n)
+
+    def rank_indices(self, job_description, resume_texts, top_k=None, threshold=None):
+        """Score every resume with one matrix-vector product.
+
+        Returns ``(indices, scores)`` for the best ``top_k`` resumes at or above
+        ``threshold``, best first, without copying any resume text. In chunked
+        mode long texts are scored over all their windows instead of being
+        truncated at the model's max sequence length.
+        """
+        if len(resume_texts) == 0:
+            return rank_embeddings(None, [], top_k=top_k, threshold=threshold)
+        with span("rank", documents=len(resume_texts), chunked=self.chunked):
+            if self.chunked:
+                scores = self.chunked_scores(job_description, resume_texts, self.pooling, self.top_n)
+                return select_top_k(scores, top_k=top_k, threshold=threshold)
+            job_embedding = self.generate_job_embedding(job_description)
+            resume_embeddings = self.batch_resume_embeddings(resume_texts)
+            return rank_embeddings(job_embedding, resume_embeddings, top_k=top_k, threshold=threshold)
+
+    def rank_candidates(self, job_description, resume_texts, candidate_names=None, top_k=None, threshold=None):
+        """Rank resumes against the job as ``(name, score, text)`` tuples, best first."""
         if candidate_names is None:
             candidate_names = [f"Candidate_{i+1}" for i in range(len(resume_texts))]
-        ranked_candidates = list(zip(candidate_names, similarities, resume_texts))
-        ranked_candidates.sort(key=lambda x: x[1], reverse=True)
-        return ranked_candidates
+        indices, scores = self.rank_indices(job_description, resume_texts, top_k=top_k, threshold=threshold)
+        return [
+            (candidate_names[i], float(score), resume_texts[i])
+            for i, score in zip(indices, scores)
+        ]
     
+    def rank_candidates_stream(self, job_description, candidates, top_k=None, threshold=None,
+                               micro_batch=STREAM_MICRO_BATCH):
+        """Rank ``(name, text)`` pairs as they arrive, e.g. straight from the resume parser.
+
+        Resumes are embedded in micro-batches (1, 2, 4, ... up to ``micro_batch``,
+        so the first result comes quickly) and scored into a running top-k heap.
+        Yields ``(ranked, processed)`` after each micro-batch whose scores changed
+        the ranking, where ``ranked`` has the same ``(name, score, text)`` shape as
+        ``rank_candidates``; the final yield always holds the complete ranking.
+        """
+        if self.chunked:
+            job_embedding = self.chunked_job_embedding(job_description)
+        else:
+            job_embedding = self.generate_job_embedding(job_description)
+        top = RunningTopK(top_k, threshold)
+        batch, size = [], 1
+
+        def flush():
+            texts = [text for _, text in batch]
+            if self.chunked:
+                scores = self.chunked_scores(job_description, texts, self.pooling, self.top_n, job_embedding)
+            else:
+                scores = cosine_scores(job_embedding, self.batch_resume_embeddings(texts))
+            return top.push_many(scores, batch)
+
+        def ranked():
+            return [(name, score, text) for score, (name, text) in top.ranked()]
+
+        for name, text in candidates:
+            batch.append((name, text))
+            if len(batch) < size:
+                continue
+            if flush():
+                yield ranked(), top.seen
+            batch, size = [], min(size * 2, micro_batch)
+        if batch:
+            flush()
+        yield ranked(), top.seen
+
+    def rank_matrix(self, job_descriptions, resume_texts, candidate_names=None, top_k_per_job=10,
+                    top_k_per_resume=None, threshold=None, max_block_mb=SCORE_BLOCK_MB):
+        """Match many jobs against a whole resume pool in one pass.
+
+        Every job and resume is embedded once (through the cache), then scored
+        in blocks under ``max_block_mb`` without materializing the N x M matrix.
+        Returns ``(per_job, per_resume)``: ``per_job[j]`` is a ``rank_candidates``
+        style list of ``(name, score, text)`` tuples and ``per_resume[i]`` a list
+        of ``(job_index, score)`` pairs ("best roles for this candidate"), or
+        None when ``top_k_per_resume`` is None. ``top_k_per_job`` must be finite.
+        Chunked mode is not applied here.
+        """
+        if candidate_names is None:
+            candidate_names = [f"Candidate_{i+1}" for i in range(len(resume_texts))]
+        if len(job_descriptions) == 0 or len(resume_texts) == 0:
+            return [[] for _ in job_descriptions], ([[] for _ in resume_texts] if top_k_per_resume is not None else None)
+        job_embeddings = self.batch_resume_embeddings(job_descriptions)
+        resume_embeddings = self.batch_resume_embeddings(resume_texts)
+        per_job, per_resume = blocked_top_k(
+            job_embeddings, resume_embeddings, top_k_per_job=top_k_per_job,
+            top_k_per_resume=top_k_per_resume, threshold=threshold, max_block_mb=max_block_mb,
+        )
+        job_rankings = [
+            [(candidate_names[i], float(score), resume_texts[i]) for i, score in zip(indices, scores)]
+            for indices, scores in per_job
+        ]
+        if per_resume is None:
+            return job_rankings, None
+        resume_rankings = [
+            [(int(j), float(score)) for j, score in zip(indices, scores)]
+            for indices, scores in per_resume
+        ]
+        return job_rankings, resume_rankings
+
+    def rank_with_prefilter(self, job_description, lexical_index, top_k=None, threshold=None,
+                            shortlist_size=PREFILTER_TOP_N, fusion=None, alpha=HYBRID_ALPHA):
+        """Shortlist with a ``BM25Index``, then rank only the shortlist densely.
+
+        Only ``shortlist_size`` resumes are encoded. With ``fusion`` (``linear``
+        or ``rrf``) the order blends dense and BM25 scores; the returned score is
+        still the cosine similarity and ``threshold`` applies to it.
+        """
+        with span("prefilter", documents=len(lexical_index)) as sp:
+            rows, lexical_scores = lexical_index.search_indices(job_description, top_n=shortlist_size)
+            sp.set(shortlist=len(rows))
+        texts = [lexical_index.texts[r] for r in rows]
+        names = [lexical_index.names[r] for r in rows]
+        if fusion is None:
+            return self.rank_candidates(job_description, texts, names, top_k=top_k, threshold=threshold)
+        indices, dense_scores = self.rank_indices(job_description, texts, top_k=None, threshold=threshold)
+        fused = fuse_scores(dense_scores, lexical_scores[indices], method=fusion, alpha=alpha)
+        order = np.argsort(-fused, kind="stable")[:top_k]
+        return [(names[indices[i]], float(dense_scores[i]), texts[indices[i]]) for i in order]
+
+    def add_to_index(self, index, resume_texts, candidate_names, doc_ids=None):
+        """Embed resumes and add them to a standing ``IVFIndex`` talent pool."""
+        embeddings = self.batch_resume_embeddings(resume_texts)
+        return index.add(embeddings, candidate_names, resume_texts, doc_ids=doc_ids)
+
+    def search_index(self, job_description, index, top_k=10, threshold=None, n_probe=None,
+                     rescore=QUANTIZED_RESCORE):
+        """Query a standing ``IVFIndex`` with the same ``(name, score, text)`` contract as ``rank_candidates``.
+
+        For a quantized index, ``rescore`` re-scores the shortlist with float32
+        vectors (embedding cache hits for resumes added through ``add_to_index``).
+        """
+        job_embedding = self.generate_job_embedding(job_description)
+        rescore_fn = None
+        if rescore and index.storage != "float32":
+            rescore_fn = lambda rows: self.batch_resume_embeddings([index.texts[r] for r in rows])
+        return index.search(job_embedding, top_k=top_k, threshold=threshold, n_probe=n_probe, rescore_fn=rescore_fn)
+
     def remove_stopwords(self, text: str) -> str:
         """Remove stopwords from the text using NLTK if available, else a small fallback set."""
-        if not text:
-            return text
-        words = text.split()
-        # Try NLTK stopwords, fall back to the small built-in list
-        stop_set = DEFAULT_STOPWORDS
-        if nltk_stopwords is not None:
-            try:
-                stop_set = set(nltk_stopwords.words('english'))
-            except Exception:
-                # Missing corpus; keep fallback
-                pass
-        filtered = [word for word in words if word.lower() not in stop_set]
-        return " ".join(filtered)
+        return remove_stopwords(text)
+
+    @property
+    def compressor(self):
+        """Token-budget compressor that ranks resume sentences with this embedding model."""
+        if self._compressor is None:
+            self._compressor = PromptCompressor(self._encode)
+        return self._compressor
+
+    def compress_for_reasoning(self, job_description, resume_text):
+        """Cut the job and resume to their token budgets, keeping the most job-relevant sentences."""
+        return self.compressor.compress(job_description, resume_text)
+
+    def compression_stats(self):
+        """Input/output token totals of the prompts compressed so far."""
+        return self.compressor.stats()
 
     def generate_fit_reasoning(self, job_description, resume_text, candidate_name):
         """Generate reasoning using the dedicated reasoning module."""
-        # to reduce the token usage, we can remove the stopwords from the job description and resume text
-        job_description = self.remove_stopwords(job_description)
-        resume_text = self.remove_stopwords(resume_text)
+        # to reduce the token usage, compress the job description and resume to their token budgets
+        job_description, resume_text = self.compress_for_reasoning(job_description, resume_text)
         return generate_comprehensive_fit_reasoning(job_description, resume_text, candidate_name)
 
+    def stream_fit_reasoning(self, job_description, ranked_candidates, **kwargs):
+        """Explain ``(name, score, text)`` candidates concurrently under the Groq rate limits.
+
+        Yields ``(index, reasoning)`` as each explanation arrives.
+        """
+        candidates = []
+        compressed_job = job_description
+        for name, _score, text in ranked_candidates:
+            compressed_job, compressed_text = self.compress_for_reasoning(job_description, text)
+            candidates.append((name, compressed_text))
+        return stream_fit_reasoning(compressed_job, candidates, **kwargs)
+
     def summarize_top_candidates(self, job_description, ranked_candidates, top_k=10, return_markdown=True):
         top = ranked_candidates[:top_k]
+        # One structured request covers several candidates and sends the job description once
+        reasonings = dict(self.stream_fit_reasoning(job_description, top, batched=True))
         rows = []
 
-        for name, score, resume_text in top:
-            reasoning = self.generate_fit_reasoning(
-                job_description, resume_text, name
-            )
+        for index, (name, score, resume_text) in enumerate(top):
             rows.append({
                 "name": name,
                 "similarity": float(score),
-                "reasoning": reasoning,
+                "reasoning": reasonings[index],
             })
 
         if not return_markdown:
@@ -0,0 +1,210 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config.settings import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    ENCODE_MAX_BATCH,
+    ENCODE_POOL_MIN_DOCS,
+    ENCODE_TOKEN_BUDGET,
+    ENCODE_WORKERS,
+)
+
+
+def token_lengths(texts: Sequence[str], tokenizer=None, max_length: Optional[int] = None) -> np.ndarray:
+    """Token count per text, clipped to the model's max sequence length.
+
+    Falls back to whitespace word counts without a tokenizer.
+    """
+    if tokenizer is not None:
+        try:
+            encoded = tokenizer(list(texts), add_special_tokens=True, truncation=max_length is not None,
+                                max_length=max_length)
+            lengths = np.array([len(ids) for ids in encoded["input_ids"]], dtype=np.int64)
+        except Exception:
+            lengths = None
+        if lengths is not None:
+            return lengths
+    lengths = np.array([len(text.split()) + 2 for text in texts], dtype=np.int64)
+    return np.minimum(lengths, max_length) if max_length else lengths
+
+
+def plan_batches(lengths, token_budget: int = ENCODE_TOKEN_BUDGET, max_batch: int = ENCODE_MAX_BATCH) -> List[np.ndarray]:
+    """Group text indices into length-sorted batches whose padded size fits ``token_budget``.
+
+    Short texts share big batches and long texts get small ones, so little
+    compute is spent on padding.
+    """
+    lengths = np.asarray(lengths)
+    order = np.argsort(lengths, kind="stable")
+    batches, current, longest = [], [], 0
+    for index in order:
+        length = max(1, int(lengths[index]))
+        # Padded cost of the batch is its size times its longest member
+        if current and ((len(current) + 1) * max(longest, length) > token_budget or len(current) >= max_batch):
+            batches.append(np.array(current))
+            current, longest = [], 0
+        current.append(index)
+        longest = max(longest, length)
+    if current:
+        batches.append(np.array(current))
+    return batches
+
+
+def encode_bucketed(model, texts: Sequence[str], token_budget: int = ENCODE_TOKEN_BUDGET,
+                    max_batch: int = ENCODE_MAX_BATCH, lengths=None) -> np.ndarray:
+    """Encode ``texts`` in length-bucketed batches and return rows in the original order."""
+    texts = list(texts)
+    if lengths is None:
+        lengths = token_lengths(texts, getattr(model, "tokenizer", None), model.get_max_seq_length())
+    output = None
+    for batch in plan_batches(lengths, token_budget, max_batch):
+        vectors = model.encode([texts[i] for i in batch], batch_size=len(batch),
+                               convert_to_numpy=True, show_progress_bar=False)
+        if output is None:
+            output = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        output[batch] = vectors
+    return output if output is not None else np.empty((0, 0), dtype=np.float32)
+
+
+# -- multi-process encoding ------------------------------------------
+
+_WORKER_MODEL = None
+
+
+def _init_worker(model_name: str, backend: str, threads: int) -> None:
+    global _WORKER_MODEL
+    import torch  # type: ignore
+
+    from src.embeddings import get_model
+
+    # Split the cores between workers instead of oversubscribing them
+    torch.set_num_threads(max(1, threads))
+    os.environ.setdefault("OMP_NUM_THREADS", str(max(1, threads)))
+    _WORKER_MODEL = get_model(model_name, backend)
+
+
+def _encode_in_worker(batch: List[str]) -> np.ndarray:
+    return _WORKER_MODEL.encode(batch, batch_size=len(batch), convert_to_numpy=True, show_progress_bar=False)
+
+
+_POOL = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def get_encode_pool(workers: int = ENCODE_WORKERS, model_name: str = EMBEDDING_MODEL,
+                    backend: str = EMBEDDING_BACKEND) -> ProcessPoolExecutor:
+    """Process pool whose workers each hold one copy of the model; created once per process."""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown()
+            threads = (os.cpu_count() or workers) // workers
+            _POOL = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_name, backend, threads),
+            )
+            _POOL_WORKERS = workers
+        return _POOL
+
+
+def shutdown_encode_pool() -> None:
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown()
+        _POOL, _POOL_WORKERS = None, 0
+
+
+def encode_multi_process(model, texts: Sequence[str], workers: int = ENCODE_WORKERS,
+                         token_budget: int = ENCODE_TOKEN_BUDGET, max_batch: int = ENCODE_MAX_BATCH,
+                         model_name: str = EMBEDDING_MODEL) -> np.ndarray:
+    """Spread length-bucketed batches over a pool of CPU worker processes.
+
+    ``model`` is only used in this process for tokenizing; rows come back in
+    the original order.
+    """
+    texts = list(texts)
+    lengths = token_lengths(texts, getattr(model, "tokenizer", None), model.get_max_seq_length())
+    batches = plan_batches(lengths, token_budget, max_batch)
+    pool = get_encode_pool(workers, model_name)
+    output = None
+    for batch, vectors in zip(batches, pool.map(_encode_in_worker, [[texts[i] for i in b] for b in batches])):
+        if output is None:
+            output = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        output[batch] = vectors
+    return output if output is not None else np.empty((0, 0), dtype=np.float32)
+
+
+def encode_scheduled(model, texts: Sequence[str], workers: int = ENCODE_WORKERS,
+                     pool_min_docs: int = ENCODE_POOL_MIN_DOCS) -> np.ndarray:
+    """Bucketed encoding, moved to the worker pool for ingests of at least ``pool_min_docs`` texts."""
+    if workers > 1 and len(texts) >= pool_min_docs:
+        return encode_multi_process(model, texts, workers)
+    return encode_bucketed(model, texts)
+
+
+def benchmark_encoding(model, texts: Sequence[str], workers: int = 0) -> List[Dict[str, float]]:
+    """Docs/s and tokens/s of the default ``model.encode`` path against the scheduled paths."""
+    texts = list(texts)
+    tokens = int(token_lengths(texts, getattr(model, "tokenizer", None), model.get_max_seq_length()).sum())
+    runs = [
+        ("default", lambda: model.encode(texts, convert_to_tensor=False, show_progress_bar=False)),
+        ("bucketed", lambda: encode_bucketed(model, texts)),
+    ]
+    if workers > 1:
+        get_encode_pool(workers)
+        pool_warmup = texts[: workers * 2] or ["warm up"]
+        encode_multi_process(model, pool_warmup, workers)  # load worker models outside the timing
+        runs.append((f"multi_process[{workers}]", lambda: encode_multi_process(model, texts, workers)))
+    report = []
+    for name, run in runs:
+        start_time = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start_time
+        report.append({
+            "path": name,
+            "seconds": seconds,
+            "docs_per_s": len(texts) / seconds if seconds else 0.0,
+            "tokens_per_s": tokens / seconds if seconds else 0.0,
+        })
+    return report
+
+
+def main():
+    """Compare encoding throughput on a synthetic mix of short and long resumes."""
+    import argparse
+    import random
+
+    from src.embeddings import get_model
+
+    parser = argparse.ArgumentParser(description="Embedding throughput: default vs bucketed vs multi-process")
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=max(2, (os.cpu_count() or 2) // 2))
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words = ("python sql machine learning data pipelines leadership stakeholder analytics "
+             "forecasting cloud aws spark modeling statistics experimentation dashboards").split()
+    # Mix of one-paragraph pasted resumes and multi-page documents
+    texts = [" ".join(rng.choice(words) for _ in range(rng.choice([40, 80, 600, 2000])))
+             for _ in range(args.docs)]
+    model = get_model()
+    print(f"{'path':<20} {'seconds':>8} {'docs/s':>9} {'tokens/s':>10}")
+    for row in benchmark_encoding(model, texts, args.workers):
+        print(f"{row['path']:<20} {row['seconds']:>8.2f} {row['docs_per_s']:>9.1f} {row['tokens_per_s']:>10.0f}")
+    shutdown_encode_pool()
+
+
+if __name__ == "__main__":
+    main()
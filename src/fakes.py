@@ -0,0 +1,149 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class FakeDocument:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeLlamaParse:
+    """Offline stand-in for ``LlamaParse``: returns the file's own text after a simulated delay.
+
+    Pass it as ``parser`` to ``parse_resumes_batch``. ``error_rate`` of the
+    calls raise, exercising the retry path.
+    """
+
+    def __init__(self, latency_ms: float = 500.0, jitter_ms: float = 200.0, error_rate: float = 0.0,
+                 seed: Optional[int] = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    async def aload_data(self, file_path: str) -> List[FakeDocument]:
+        self.calls += 1
+        delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+        await asyncio.sleep(delay)
+        if self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise RuntimeError("fake LlamaParse: job failed")
+        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+            return [FakeDocument(f.read())]
+
+    def load_data(self, file_path: str) -> List[FakeDocument]:
+        return asyncio.run(self.aload_data(file_path))
+
+
+_CANDIDATE_ID = re.compile(r"### Candidate id (\d+):")
+
+
+class _FakeGroqHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Dict[str, object], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        fake = self.server.fake
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+        status, headers = fake.draw_outcome()
+        if status != 200:
+            self._send(status, {"error": {"message": "fake Groq error", "type": "fake"}}, headers)
+            return
+        prompt = request["messages"][-1]["content"]
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            explanations = [{"id": int(i), "reasoning": "Strong overlap with the role's core requirements."}
+                            for i in _CANDIDATE_ID.findall(prompt)]
+            content = json.dumps({"explanations": explanations})
+        else:
+            content = "The candidate's experience closely matches the role's core requirements."
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        self._send(200, {
+            "id": f"fake-{fake.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+
+class _FakeGroqHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FakeGroqServer:
+    """Local HTTP fake of Groq's chat completions endpoint.
+
+    Point the Groq clients at it with ``GROQ_BASE_URL=fake.url``. Each request
+    waits ``latency_ms`` (+/- ``jitter_ms``); ``rate_limit_rate`` of them get
+    429 with ``Retry-After`` and ``error_rate`` get 500. JSON-mode requests
+    receive one explanation per ``### Candidate id N:`` in the prompt.
+    """
+
+    def __init__(self, latency_ms: float = 800.0, jitter_ms: float = 300.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 0.2, seed: Optional[int] = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.server = None
+        self.url = None
+
+    def draw_outcome(self):
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+            roll = self.rng.random()
+        time.sleep(delay)
+        if roll < self.rate_limit_rate:
+            with self.lock:
+                self.errors += 1
+            return 429, {"Retry-After": str(self.retry_after)}
+        if roll < self.rate_limit_rate + self.error_rate:
+            with self.lock:
+                self.errors += 1
+            return 500, {}
+        return 200, {}
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "FakeGroqServer":
+        self.server = _FakeGroqHTTPServer((host, port), _FakeGroqHandler)
+        self.server.fake = self
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,127 @@
+import json
+import os
+from typing import Callable, Optional
+
+import numpy as np
+
+from config.settings import (
+    ONNX_EXPORT_DIR,
+    ONNX_PARITY_MIN_COSINE,
+    ONNX_QUANTIZATION_CONFIG,
+)
+from src.embedding_cache import model_slug
+from src.ranking import normalize_rows
+from src.utils import ensure_dir
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+PARITY_FILE = "parity.json"
+
+# Short and long job/resume-like texts for the parity check
+PARITY_TEXTS = [
+    "Senior Data Scientist",
+    "Machine learning engineer with Python, SQL and AWS experience",
+    "Built recommendation engines and time series forecasting models in production.",
+    "Responsibilities: design A/B tests, partner with product managers, and communicate results to stakeholders.",
+    "Skills: Python (NumPy, Pandas, Scikit-learn), SQL (MySQL, Postgres), Git, Tableau, Spark, Airflow. "
+    "Led a team of four analysts; reduced churn by 12% through customer segmentation and targeted campaigns.",
+    "Registered nurse with ICU experience and BLS certification",
+    "Frontend developer: React, TypeScript, accessibility, design systems",
+]
+
+
+def onnx_export_dir(model_name: str, export_root: str = ONNX_EXPORT_DIR) -> str:
+    return os.path.join(export_root, model_slug(model_name))
+
+
+def _onnx_file_name(quantized: bool) -> str:
+    if quantized:
+        return f"onnx/model_qint8_{ONNX_QUANTIZATION_CONFIG}.onnx"
+    return "onnx/model.onnx"
+
+
+def parity_cosine(reference_model, candidate_model, texts=PARITY_TEXTS) -> float:
+    """Lowest cosine similarity between the two models' embeddings of ``texts``."""
+    reference = normalize_rows(reference_model.encode(texts, convert_to_numpy=True, show_progress_bar=False))
+    candidate = normalize_rows(candidate_model.encode(texts, convert_to_numpy=True, show_progress_bar=False))
+    return float(np.min(np.sum(reference * candidate, axis=1)))
+
+
+def _read_parity(export_dir: str) -> dict:
+    path = os.path.join(export_dir, PARITY_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _write_parity(export_dir: str, results: dict) -> None:
+    with open(os.path.join(export_dir, PARITY_FILE), "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def export_onnx(model_name: str, quantized: bool, export_dir: str) -> str:
+    """Export ``model_name`` to ONNX (optionally dynamic int8) once; returns the model file name."""
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    file_name = _onnx_file_name(quantized)
+    if os.path.exists(os.path.join(export_dir, file_name)):
+        return file_name
+    ensure_dir(export_dir)
+    if not os.path.exists(os.path.join(export_dir, _onnx_file_name(False))):
+        # Loading with backend="onnx" converts the PyTorch weights
+        SentenceTransformer(model_name, backend="onnx").save_pretrained(export_dir)
+    if quantized:
+        onnx_model = SentenceTransformer(export_dir, backend="onnx")
+        export_dynamic_quantized_onnx_model(onnx_model, ONNX_QUANTIZATION_CONFIG, export_dir)
+    return file_name
+
+
+def load_onnx_model(
+    model_name: str,
+    backend: str,
+    reference_loader: Callable[[], object],
+    export_root: str = ONNX_EXPORT_DIR,
+    min_cosine: float = ONNX_PARITY_MIN_COSINE,
+) -> Optional[object]:
+    """Load the cached ONNX export of ``model_name``, exporting it on first use.
+
+    The export is only enabled after its embeddings agree with the PyTorch
+    model (``reference_loader``) to at least ``min_cosine``. The measured cosine
+    and the threshold it was judged against are recorded next to the export, so
+    later processes skip the check and a changed threshold re-judges it. Returns
+    None when export, loading or the parity check fails.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    quantized = backend == "onnx-int8"
+    export_dir = onnx_export_dir(model_name, export_root)
+    try:
+        file_name = export_onnx(model_name, quantized, export_dir)
+        model = SentenceTransformer(export_dir, backend="onnx", model_kwargs={"file_name": file_name})
+    except Exception as e:
+        print(f"[embeddings] ONNX export/load failed for {model_name} ({backend}): {e}")
+        return None
+
+    parity = _read_parity(export_dir)
+    check = parity.get(file_name)
+    if check is None or "min_cosine" not in check:
+        try:
+            cosine = parity_cosine(reference_loader(), model)
+        except Exception as e:
+            print(f"[embeddings] {backend} parity check failed for {model_name}: {e}; using PyTorch")
+            return None
+        check = {"min_cosine": cosine}
+        print(f"[embeddings] {backend} parity vs PyTorch: min cosine {cosine:.4f}")
+    if check.get("threshold") != min_cosine:
+        # The measured cosine does not depend on the threshold; only the verdict is redone
+        check.update(passed=check["min_cosine"] >= min_cosine, threshold=min_cosine)
+        parity[file_name] = check
+        _write_parity(export_dir, parity)
+    if not check["passed"]:
+        print(f"[embeddings] {backend} failed the parity check (min cosine {check['min_cosine']:.4f} "
+              f"< {check['threshold']}); using PyTorch")
+        return None
+    return model
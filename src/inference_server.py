@@ -0,0 +1,359 @@
+import base64
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+from config.settings import (
+    SERVER_MAX_BATCH,
+    SERVER_MAX_QUEUE,
+    SERVER_MAX_WAIT_MS,
+    SERVER_REQUEST_TIMEOUT,
+)
+from src.instrumentation import METRIC_PREFIX, prometheus_text
+from src.ranking import rank_embeddings
+
+
+class ServerBusy(Exception):
+    """Raised when accepting a request would exceed the queue limit."""
+
+
+class MicroBatcher:
+    """Coalesces concurrent encode requests into shared model batches.
+
+    A worker thread takes the oldest request, then keeps collecting until the
+    batch holds ``max_batch`` texts or ``max_wait_ms`` has passed since that
+    request arrived, and encodes everything in one call. Requests that would
+    push more than ``max_queue`` texts into the queue are rejected with
+    ``ServerBusy`` instead of waiting.
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch: int = SERVER_MAX_BATCH,
+                 max_wait_ms: float = SERVER_MAX_WAIT_MS, max_queue: int = SERVER_MAX_QUEUE):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max_queue
+        self._pending: List[Tuple[List[str], Future, float]] = []
+        self._queued_texts = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.max_batch_seen = 0
+        self.encode_seconds = 0.0
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts: Sequence[str]) -> Future:
+        texts = list(texts)
+        future: Future = Future()
+        if not texts:
+            future.set_result(np.empty((0, 0), dtype=np.float32))
+            return future
+        with self._cond:
+            # An oversized request is still accepted into an empty queue
+            if self._queued_texts and self._queued_texts + len(texts) > self.max_queue:
+                self.rejected += 1
+                raise ServerBusy(f"{self._queued_texts} texts already queued")
+            self._pending.append((texts, future, time.monotonic()))
+            self._queued_texts += len(texts)
+            self.requests += 1
+            self._cond.notify()
+        return future
+
+    def encode(self, texts: Sequence[str], timeout: Optional[float] = SERVER_REQUEST_TIMEOUT) -> np.ndarray:
+        return self.submit(texts).result(timeout=timeout)
+
+    def _take_batch(self) -> List[Tuple[List[str], Future, float]]:
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return []
+            deadline = self._pending[0][2] + self.max_wait
+            while sum(len(texts) for texts, _, _ in self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    break
+                self._cond.wait(remaining)
+            # Whole requests only; a request larger than max_batch goes alone
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch):
+                request = self._pending.pop(0)
+                batch.append(request)
+                size += len(request[0])
+            self._queued_texts -= size
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            flat = [text for texts, _, _ in batch for text in texts]
+            start_time = time.perf_counter()
+            try:
+                vectors = np.asarray(self.encode_fn(flat), dtype=np.float32)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            self.encode_seconds += time.perf_counter() - start_time
+            self.batches += 1
+            self.batched_texts += len(flat)
+            self.max_batch_seen = max(self.max_batch_seen, len(flat))
+            offset = 0
+            for texts, future, _ in batch:
+                future.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            for _, future, _ in self._pending:
+                future.set_exception(ServerBusy("server shutting down"))
+            self._pending.clear()
+            self._cond.notify_all()
+
+    def metrics(self) -> Dict[str, float]:
+        with self._cond:
+            queue_requests, queue_texts = len(self._pending), self._queued_texts
+        return {
+            "queue_requests": queue_requests,
+            "queue_texts": queue_texts,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_texts / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "encode_seconds": self.encode_seconds,
+        }
+
+
+def _pack(vectors: np.ndarray) -> Dict[str, object]:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    return {"shape": list(vectors.shape), "data": base64.b64encode(vectors.tobytes()).decode("ascii")}
+
+
+def _unpack(payload: Dict[str, object]) -> np.ndarray:
+    data = base64.b64decode(payload["data"])
+    return np.frombuffer(data, dtype=np.float32).reshape(payload["shape"])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "JobRecInference/1.0"
+
+    def log_message(self, format, *args):  # keep the console for batch metrics
+        pass
+
+    def _send(self, status: int, body: Dict[str, object], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self._send(200, service.info())
+        elif self.path == "/metrics":
+            self._send(200, service.batcher.metrics())
+        elif self.path == "/metrics/prometheus":
+            gauges = "".join(f"{METRIC_PREFIX}_server_{key} {value:g}\n"
+                             for key, value in service.batcher.metrics().items())
+            data = (gauges + prometheus_text()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/encode":
+                self._send(200, _pack(service.batcher.encode(request["texts"])))
+            elif self.path == "/rank":
+                self._send(200, {"ranked": service.rank(request)})
+            else:
+                self._send(404, {"error": f"unknown path {self.path}"})
+        except ServerBusy as e:
+            self._send(503, {"error": str(e)}, {"Retry-After": "1"})
+        except (KeyError, ValueError, TypeError) as e:
+            self._send(400, {"error": f"bad request: {e}"})
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+
+
+class _TCPHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 resets bursts of concurrent clients
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)  # BaseHTTPRequestHandler expects a (host, port) address
+
+
+class InferenceService:
+    """Shares one ``JobResumeEmbedder`` and one ``MicroBatcher`` between all clients."""
+
+    def __init__(self, embedder, batcher: Optional[MicroBatcher] = None):
+        self.embedder = embedder
+        self.batcher = batcher or MicroBatcher(embedder.batch_resume_embeddings)
+
+    def info(self) -> Dict[str, object]:
+        return {
+            "status": "ok",
+            "backend": self.embedder.backend,
+            "max_seq_length": self.embedder.model.get_max_seq_length(),
+        }
+
+    def rank(self, request: Dict[str, object]) -> List[Tuple[int, float]]:
+        """``(resume_index, score)`` pairs, best first, for a ``/rank`` request."""
+        texts = list(request["resume_texts"])
+        if not texts:
+            return []
+        vectors = self.batcher.encode([request["job_description"]] + texts)
+        indices, scores = rank_embeddings(vectors[0], vectors[1:], top_k=request.get("top_k"),
+                                          threshold=request.get("threshold"))
+        return [(int(i), float(score)) for i, score in zip(indices, scores)]
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8765, unix_socket: Optional[str] = None):
+        """Build the HTTP server (TCP or Unix socket); call ``serve_forever()`` on the result."""
+        if unix_socket:
+            if os.path.exists(unix_socket):
+                os.remove(unix_socket)
+            server = _UnixHTTPServer(unix_socket, _Handler)
+        else:
+            server = _TCPHTTPServer((host, port), _Handler)
+        server.service = self
+        return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class InferenceClient:
+    """Thin client for the inference server.
+
+    ``url`` is ``http://host:port`` or ``unix:///path/to.sock``. Busy replies
+    (HTTP 503) are retried after the server's ``Retry-After`` delay.
+    """
+
+    def __init__(self, url: str, timeout: float = SERVER_REQUEST_TIMEOUT, busy_retries: int = 5):
+        self.url = urlparse(url)
+        self.timeout = timeout
+        self.busy_retries = busy_retries
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self.url.scheme == "unix":
+            return _UnixHTTPConnection(self.url.path, self.timeout)
+        return http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, body: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        for attempt in range(self.busy_retries + 1):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=payload, headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                data = json.loads(response.read() or b"{}")
+                if response.status == 503 and attempt < self.busy_retries:
+                    time.sleep(float(response.getheader("Retry-After") or 1))
+                    continue
+                if response.status != 200:
+                    raise RuntimeError(f"Inference server error {response.status}: {data.get('error')}")
+                return data
+            finally:
+                connection.close()
+        raise RuntimeError("Inference server stayed busy")
+
+    def info(self) -> Dict[str, object]:
+        return self._request("GET", "/health")
+
+    def metrics(self) -> Dict[str, float]:
+        return self._request("GET", "/metrics")
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return _unpack(self._request("POST", "/encode", {"texts": list(texts)}))
+
+    def rank_candidates(self, job_description: str, resume_texts: Sequence[str], candidate_names=None,
+                        top_k: Optional[int] = None, threshold: Optional[float] = None):
+        """Server-side ranking with the same ``(name, score, text)`` contract as ``rank_candidates``."""
+        resume_texts = list(resume_texts)
+        if candidate_names is None:
+            candidate_names = [f"Candidate_{i+1}" for i in range(len(resume_texts))]
+        ranked = self._request("POST", "/rank", {
+            "job_description": job_description, "resume_texts": resume_texts,
+            "top_k": top_k, "threshold": threshold,
+        })["ranked"]
+        return [(candidate_names[i], float(score), resume_texts[i]) for i, score in ranked]
+
+
+def main():
+    """Run the shared embedding/ranking server."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local embedding/ranking server with cross-request micro-batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=SERVER_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=SERVER_MAX_WAIT_MS)
+    parser.add_argument("--max-queue", type=int, default=SERVER_MAX_QUEUE)
+    args = parser.parse_args()
+
+    from src.embeddings import JobResumeEmbedder
+
+    embedder = JobResumeEmbedder(server_url=None)
+    batcher = MicroBatcher(embedder.batch_resume_embeddings, args.max_batch, args.max_wait_ms, args.max_queue)
+    service = InferenceService(embedder, batcher)
+    server = service.serve(args.host, args.port, args.unix_socket)
+    where = args.unix_socket or f"http://{args.host}:{args.port}"
+    print(f"[server] Serving {embedder.backend} embeddings on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        batcher.close()
+        server.server_close()
+        if embedder.cache is not None:
+            embedder.cache.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from config.settings import (
+    INSTRUMENTATION_ENABLED,
+    INSTRUMENTATION_LOG_PATH,
+)
+
+# Span durations (seconds) bucketed for the Prometheus histogram
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_PREFIX = "jobrec"
+
+_ENABLED = INSTRUMENTATION_ENABLED
+_LOG_PATH = INSTRUMENTATION_LOG_PATH
+_RUN: contextvars.ContextVar = contextvars.ContextVar("instrumentation_run", default=None)
+_CURRENT: contextvars.ContextVar = contextvars.ContextVar("instrumentation_span", default=None)
+_IDS = itertools.count(1)
+
+
+class _NoopSpan:
+    """Returned while instrumentation is off; falsy so callers can skip computing sizes."""
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """One timed stage with numeric counters (documents, tokens, bytes, retries, cache hits)
+    and string labels (backend, model)."""
+
+    __slots__ = ("name", "id", "parent", "attrs", "start", "seconds", "error", "_token", "_run")
+
+    def __init__(self, name: str, attrs: Dict[str, object], run):
+        self.name = name
+        self.id = next(_IDS)
+        parent = _CURRENT.get()
+        self.parent = parent.id if parent is not None else None
+        self.attrs = dict(attrs)
+        self.seconds = 0.0
+        self.error = None
+        self._run = run
+
+    def __bool__(self):
+        return True
+
+    def __enter__(self):
+        self._token = _CURRENT.set(self)
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.time() - self.start
+        _CURRENT.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _finish(self)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key: str, amount=1):
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"span": self.name, "id": self.id, "parent": self.parent, "start": self.start,
+                "seconds": self.seconds, "error": self.error, **self.attrs}
+
+
+def span(name: str, **attrs):
+    """Time a block as span ``name``: ``with span("encode", documents=n) as sp: ...``.
+
+    Spans are recorded when instrumentation is enabled or a ``collect()`` run
+    is active; otherwise a shared no-op object is returned.
+    """
+    run = _RUN.get()
+    if not _ENABLED and run is None:
+        return _NOOP
+    return Span(name, attrs, run)
+
+
+def current_span():
+    """The innermost open span, or a no-op one."""
+    return _CURRENT.get() or _NOOP
+
+
+def _is_counter(value) -> bool:
+    # Numbers are summed; strings and booleans are labels
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class Metrics:
+    """Process-wide per-span aggregates behind the Prometheus text output."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.buckets: Dict[str, List[int]] = {}
+        self.totals: Dict[str, Dict[str, float]] = {}
+
+    def record(self, sp: Span) -> None:
+        with self.lock:
+            self.counts[sp.name] = self.counts.get(sp.name, 0) + 1
+            self.seconds[sp.name] = self.seconds.get(sp.name, 0.0) + sp.seconds
+            if sp.error:
+                self.errors[sp.name] = self.errors.get(sp.name, 0) + 1
+            buckets = self.buckets.setdefault(sp.name, [0] * len(BUCKETS))
+            for i, bound in enumerate(BUCKETS):
+                if sp.seconds <= bound:
+                    buckets[i] += 1
+            totals = self.totals.setdefault(sp.name, {})
+            for key, value in sp.attrs.items():
+                if _is_counter(value):
+                    totals[key] = totals.get(key, 0) + value
+
+    def prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            names = sorted(self.counts)
+            lines.append(f"# TYPE {METRIC_PREFIX}_span_seconds histogram")
+            for name in names:
+                for bound, count in zip(BUCKETS, self.buckets[name]):
+                    lines.append(f'{METRIC_PREFIX}_span_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'{METRIC_PREFIX}_span_seconds_bucket{{span="{name}",le="+Inf"}} {self.counts[name]}')
+                lines.append(f'{METRIC_PREFIX}_span_seconds_sum{{span="{name}"}} {self.seconds[name]:.6f}')
+                lines.append(f'{METRIC_PREFIX}_span_seconds_count{{span="{name}"}} {self.counts[name]}')
+            lines.append(f"# TYPE {METRIC_PREFIX}_span_errors_total counter")
+            for name in names:
+                lines.append(f'{METRIC_PREFIX}_span_errors_total{{span="{name}"}} {self.errors.get(name, 0)}')
+            keys = sorted({key for totals in self.totals.values() for key in totals})
+            for key in keys:
+                lines.append(f"# TYPE {METRIC_PREFIX}_{key}_total counter")
+                for name in names:
+                    if key in self.totals[name]:
+                        lines.append(f'{METRIC_PREFIX}_{key}_total{{span="{name}"}} {self.totals[name][key]:g}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counts.clear()
+            self.errors.clear()
+            self.seconds.clear()
+            self.buckets.clear()
+            self.totals.clear()
+
+
+METRICS = Metrics()
+_LOG_LOCK = threading.Lock()
+
+
+def _finish(sp: Span) -> None:
+    METRICS.record(sp)
+    if sp._run is not None:
+        sp._run.add(sp)
+    if _ENABLED and _LOG_PATH:
+        line = json.dumps(sp.to_dict(), default=str)
+        with _LOG_LOCK:
+            os.makedirs(os.path.dirname(_LOG_PATH) or ".", exist_ok=True)
+            with open(_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Run:
+    """Spans finished inside one ``collect()`` block, e.g. one ranking request."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.seconds = 0.0
+
+    def add(self, sp: Span) -> None:
+        with self.lock:
+            self.spans.append(sp)
+
+    def breakdown(self) -> List[Dict[str, object]]:
+        """Per-span-name count, total seconds and summed counters, slowest first."""
+        rows: Dict[str, Dict[str, object]] = {}
+        with self.lock:
+            spans = list(self.spans)
+        for sp in spans:
+            row = rows.setdefault(sp.name, {"span": sp.name, "count": 0, "seconds": 0.0, "errors": 0})
+            row["count"] += 1
+            row["seconds"] += sp.seconds
+            row["errors"] += int(sp.error is not None)
+            for key, value in sp.attrs.items():
+                if _is_counter(value):
+                    row[key] = row.get(key, 0) + value
+        return sorted(rows.values(), key=lambda row: row["seconds"], reverse=True)
+
+
+class collect:
+    """Record every span of this block (and threads/tasks it starts through
+    ``iterate_async``) into a ``Run``, even while instrumentation is disabled."""
+
+    def __enter__(self) -> Run:
+        self.run = Run()
+        self._token = _RUN.set(self.run)
+        return self.run
+
+    def __exit__(self, *exc):
+        self.run.seconds = time.time() - self.run.started
+        _RUN.reset(self._token)
+        return False
+
+
+def enable(log_path: Optional[str] = INSTRUMENTATION_LOG_PATH) -> None:
+    """Record spans process-wide, appending each one to the JSON log at ``log_path`` (None: no log)."""
+    global _ENABLED, _LOG_PATH
+    _ENABLED, _LOG_PATH = True, log_path
+
+
+def disable() -> None:
+    global _ENABLED
+    _ENABLED = False
+
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+
+def prometheus_text() -> str:
+    """Span metrics in the Prometheus text exposition format."""
+    return METRICS.prometheus()
+
+
+def write_prometheus(path: str) -> None:
+    """Write ``prometheus_text()`` atomically, e.g. for node_exporter's textfile collector."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
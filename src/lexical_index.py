@@ -0,0 +1,315 @@
+import json
+import math
+import os
+import re
+import time
+from array import array
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import BM25_B, BM25_K1, HYBRID_ALPHA, LEXICAL_INDEX_DIR
+from src.compression import STOPWORDS
+from src.embedding_cache import text_key
+from src.ranking import select_top_k
+from src.utils import ensure_dir, last_occurrences
+
+META_FILE = "meta.json"
+ARRAYS_FILE = "arrays.npz"
+FUSION_METHODS = ("linear", "rrf")
+RRF_K = 60
+
+# Keeps skill tokens such as c++, c#, node.js and ci/cd together
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word/skill tokens without stopwords."""
+    return [token for token in _TOKEN.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Incremental inverted index scoring resumes against a job with Okapi BM25.
+
+    Each term keeps a posting list of ``(row, term frequency)``; a query only
+    touches the postings of its own terms, so shortlisting a large pool costs a
+    fraction of encoding it. Mirrors ``IVFIndex``: ``add`` replaces existing
+    ``doc_id``s, ``delete`` is reclaimed by ``compact``/``save``.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self._post_rows: List[array] = []
+        self._post_tfs: List[array] = []
+        self.df: List[int] = []
+        self._doc_len = array("i")
+        self._doc_terms: List[array] = []  # unique term ids per row, to keep df exact on delete
+        self._alive = array("b")
+        self._total_len = 0
+        self.names: List[str] = []
+        self.texts: List[str] = []
+        self.doc_ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    @property
+    def avg_len(self) -> float:
+        return self._total_len / len(self) if len(self) else 0.0
+
+    # -- mutation ----------------------------------------------------
+
+    def _term_id(self, term: str) -> int:
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = len(self.vocab)
+            self.vocab[term] = term_id
+            self._post_rows.append(array("i"))
+            self._post_tfs.append(array("i"))
+            self.df.append(0)
+        return term_id
+
+    def add(self, texts: Sequence[str], names: Sequence[str], doc_ids: Optional[Sequence[str]] = None) -> List[str]:
+        """Index resumes; an existing ``doc_id`` is replaced. Returns the ids."""
+        if doc_ids is None:
+            doc_ids = [text_key(t) for t in texts]
+        returned = list(doc_ids)
+        # A repeated id within the batch would count twice in df (and drive idf negative); keep its last copy
+        keep = last_occurrences(doc_ids)
+        if len(keep) < len(doc_ids):
+            texts = [texts[i] for i in keep]
+            names = [names[i] for i in keep]
+            doc_ids = [doc_ids[i] for i in keep]
+        self.delete([d for d in doc_ids if d in self._row_of])
+        for text, name, doc_id in zip(texts, names, doc_ids):
+            row = len(self.doc_ids)
+            counts = Counter(tokenize(text))
+            term_ids = array("i")
+            for term, tf in counts.items():
+                term_id = self._term_id(term)
+                self._post_rows[term_id].append(row)
+                self._post_tfs[term_id].append(tf)
+                self.df[term_id] += 1
+                term_ids.append(term_id)
+            length = sum(counts.values())
+            self._doc_len.append(length)
+            self._doc_terms.append(term_ids)
+            self._alive.append(1)
+            self._total_len += length
+            self.names.append(name)
+            self.texts.append(text)
+            self.doc_ids.append(doc_id)
+            self._row_of[doc_id] = row
+        return returned
+
+    def delete(self, doc_ids: Iterable[str]) -> int:
+        """Remove resumes by id; postings are reclaimed on the next ``compact``/``save``."""
+        removed = 0
+        for doc_id in doc_ids:
+            row = self._row_of.pop(doc_id, None)
+            if row is None:
+                continue
+            self._alive[row] = 0
+            self._total_len -= self._doc_len[row]
+            for term_id in self._doc_terms[row]:
+                self.df[term_id] -= 1
+            removed += 1
+        return removed
+
+    def compact(self) -> None:
+        """Drop deleted rows and renumber postings."""
+        if len(self) == len(self.doc_ids):
+            return
+        alive = np.frombuffer(self._alive, dtype=np.int8).astype(bool)
+        new_row = np.cumsum(alive) - 1
+        for term_id in range(len(self.vocab)):
+            rows = np.frombuffer(self._post_rows[term_id], dtype=np.int32)
+            keep = alive[rows]
+            self._post_rows[term_id] = array("i", new_row[rows[keep]].astype(np.int32).tobytes())
+            self._post_tfs[term_id] = array("i", np.frombuffer(self._post_tfs[term_id], dtype=np.int32)[keep].tobytes())
+        keep_rows = np.flatnonzero(alive)
+        self._doc_len = array("i", (self._doc_len[i] for i in keep_rows))
+        self._doc_terms = [self._doc_terms[i] for i in keep_rows]
+        self._alive = array("b", [1] * keep_rows.shape[0])
+        self.names = [self.names[i] for i in keep_rows]
+        self.texts = [self.texts[i] for i in keep_rows]
+        self.doc_ids = [self.doc_ids[i] for i in keep_rows]
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self.doc_ids)}
+
+    # -- search ------------------------------------------------------
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every row (0 for rows sharing no term with the query, -inf for deleted rows)."""
+        n_rows = len(self.doc_ids)
+        scores = np.zeros(n_rows, dtype=np.float32)
+        if not n_rows or not len(self):
+            return scores
+        doc_len = np.frombuffer(self._doc_len, dtype=np.int32)
+        norm = self.k1 * (1 - self.b + self.b * doc_len / max(self.avg_len, 1e-9))
+        n_docs = len(self)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None or self.df[term_id] <= 0:
+                continue
+            idf = math.log(1 + (n_docs - self.df[term_id] + 0.5) / (self.df[term_id] + 0.5))
+            rows = np.frombuffer(self._post_rows[term_id], dtype=np.int32)
+            tfs = np.frombuffer(self._post_tfs[term_id], dtype=np.int32).astype(np.float32)
+            np.add.at(scores, rows, idf * tfs * (self.k1 + 1) / (tfs + norm[rows]))
+        scores[np.frombuffer(self._alive, dtype=np.int8) == 0] = -np.inf
+        return scores
+
+    def search_indices(self, query: str, top_n: Optional[int] = 500) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and BM25 scores of the best ``top_n`` resumes sharing a term with the query."""
+        scores = self.scores(query)
+        return select_top_k(scores, top_k=top_n, threshold=1e-9)
+
+    def search(self, query: str, top_n: Optional[int] = 500) -> List[Tuple[str, float, str]]:
+        """Shortlist as ``(name, bm25 score, text)`` tuples."""
+        rows, scores = self.search_indices(query, top_n)
+        return [(self.names[r], float(s), self.texts[r]) for r, s in zip(rows, scores)]
+
+    # -- persistence -------------------------------------------------
+
+    def save(self, path: str = LEXICAL_INDEX_DIR) -> None:
+        self.compact()
+        ensure_dir(path)
+        offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(rows) for rows in self._post_rows])
+        arrays = {
+            "post_rows": np.frombuffer(b"".join(rows.tobytes() for rows in self._post_rows), dtype=np.int32),
+            "post_tfs": np.frombuffer(b"".join(tfs.tobytes() for tfs in self._post_tfs), dtype=np.int32),
+            "offsets": offsets,
+            "doc_len": np.frombuffer(self._doc_len, dtype=np.int32),
+        }
+        tmp_arrays = os.path.join(path, "arrays.tmp.npz")
+        np.savez(tmp_arrays, **arrays)
+        os.replace(tmp_arrays, os.path.join(path, ARRAYS_FILE))
+        meta = {
+            "k1": self.k1, "b": self.b, "vocab": sorted(self.vocab, key=self.vocab.get),
+            "names": self.names, "texts": self.texts, "doc_ids": self.doc_ids,
+        }
+        tmp_meta = os.path.join(path, META_FILE + ".tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, os.path.join(path, META_FILE))
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_DIR) -> "BM25Index":
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(k1=meta["k1"], b=meta["b"])
+        with np.load(os.path.join(path, ARRAYS_FILE)) as arrays:
+            post_rows, post_tfs = arrays["post_rows"], arrays["post_tfs"]
+            offsets, doc_len = arrays["offsets"], arrays["doc_len"]
+        index.vocab = {term: term_id for term_id, term in enumerate(meta["vocab"])}
+        doc_terms = [[] for _ in range(doc_len.shape[0])]
+        for term_id in range(len(index.vocab)):
+            rows = post_rows[offsets[term_id]:offsets[term_id + 1]]
+            index._post_rows.append(array("i", rows.astype(np.int32).tobytes()))
+            index._post_tfs.append(array("i", post_tfs[offsets[term_id]:offsets[term_id + 1]].astype(np.int32).tobytes()))
+            index.df.append(int(rows.shape[0]))
+            for row in rows.tolist():
+                doc_terms[row].append(term_id)
+        index._doc_len = array("i", doc_len.astype(np.int32).tobytes())
+        index._doc_terms = [array("i", terms) for terms in doc_terms]
+        index._alive = array("b", [1] * doc_len.shape[0])
+        index._total_len = int(doc_len.sum())
+        index.names, index.texts, index.doc_ids = meta["names"], meta["texts"], meta["doc_ids"]
+        index._row_of = {doc_id: row for row, doc_id in enumerate(index.doc_ids)}
+        return index
+
+
+def fuse_scores(dense_scores, lexical_scores, method: str = "linear", alpha: float = HYBRID_ALPHA) -> np.ndarray:
+    """Combine dense cosine and BM25 scores of the same shortlist.
+
+    ``linear``: ``alpha * cosine + (1 - alpha) * min-max scaled BM25``.
+    ``rrf``: reciprocal rank fusion, ``1 / (60 + rank)`` summed over both rankings.
+    """
+    dense = np.asarray(dense_scores, dtype=np.float32)
+    lexical = np.asarray(lexical_scores, dtype=np.float32)
+    if method == "linear":
+        spread = lexical.max() - lexical.min() if lexical.size else 0.0
+        scaled = (lexical - lexical.min()) / spread if spread > 0 else np.ones_like(lexical)
+        return alpha * dense + (1 - alpha) * scaled
+    if method == "rrf":
+        fused = np.zeros(dense.shape[0], dtype=np.float32)
+        for scores in (dense, lexical):
+            ranks = np.empty(scores.shape[0], dtype=np.int64)
+            ranks[np.argsort(-scores, kind="stable")] = np.arange(scores.shape[0])
+            fused += 1.0 / (RRF_K + 1 + ranks)
+        return fused
+    raise ValueError(f"Unknown fusion method '{method}'; expected one of {FUSION_METHODS}")
+
+
+def prefilter_recall_report(
+    index: BM25Index,
+    job_descriptions: Sequence[str],
+    dense_top_k: Callable[[str], Iterable[int]],
+    top_k: int = 10,
+    sizes: Sequence[int] = (50, 100, 250, 500, 1000, 2500),
+) -> List[Dict[str, float]]:
+    """How many of the exact dense top-k rows survive a BM25 shortlist of each size.
+
+    ``dense_top_k(job)`` returns the exact top-k rows over the whole pool
+    (index row order). Also reports the share of the pool that would be
+    encoded and the mean shortlist latency.
+    """
+    truth = [set(int(r) for r in dense_top_k(job)) for job in job_descriptions]
+    report = []
+    for size in sizes:
+        hits, elapsed = 0, 0.0
+        for job, expected in zip(job_descriptions, truth):
+            start_time = time.perf_counter()
+            rows, _ = index.search_indices(job, top_n=size)
+            elapsed += time.perf_counter() - start_time
+            hits += len(expected.intersection(rows.tolist()))
+        report.append({
+            "shortlist": size,
+            "recall": hits / max(1, sum(len(t) for t in truth)),
+            "encoded_share": min(1.0, size / max(1, len(index))),
+            "latency_ms": elapsed * 1000 / max(1, len(job_descriptions)),
+        })
+    return report
+
+
+def main():
+    """Print recall of the BM25 prefilter against exact dense ranking on a synthetic pool."""
+    import argparse
+
+    from src.benchmark import synthetic_jobs, synthetic_resumes
+    from src.embeddings import JobResumeEmbedder
+    from src.ranking import rank_embeddings
+
+    parser = argparse.ArgumentParser(description="BM25 prefilter recall vs shortlist size")
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 250, 500, 1000, 2500])
+    args = parser.parse_args()
+
+    resumes = synthetic_resumes(args.size)
+    jobs = synthetic_jobs(args.jobs)
+    start_time = time.perf_counter()
+    index = BM25Index()
+    index.add(resumes, [f"Candidate_{i+1}" for i in range(args.size)], doc_ids=[str(i) for i in range(args.size)])
+    print(f"Indexed {args.size} resumes in {time.perf_counter() - start_time:.1f}s")
+
+    embedder = JobResumeEmbedder()
+    start_time = time.perf_counter()
+    pool = embedder.batch_resume_embeddings(resumes)
+    print(f"Encoded the full pool in {time.perf_counter() - start_time:.1f}s (the cost the prefilter avoids)")
+
+    def dense_top_k(job):
+        return rank_embeddings(embedder.generate_job_embedding(job), pool, top_k=args.top_k)[0]
+
+    print(f"{'shortlist':>9} {'recall@' + str(args.top_k):>10} {'encoded':>8} {'ms/job':>8}")
+    for row in prefilter_recall_report(index, jobs, dense_top_k, args.top_k, args.sizes):
+        print(f"{row['shortlist']:>9} {row['recall']:>10.3f} {row['encoded_share']:>8.1%} {row['latency_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from config.settings import PARSE_CACHE_MAX_MB, PARSE_CACHE_PATH
+from src.utils import ensure_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parsed (
+    key TEXT PRIMARY KEY,
+    backend TEXT NOT NULL,
+    text TEXT NOT NULL,
+    name TEXT,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS parsed_accessed ON parsed (accessed);
+"""
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """SQLite-backed map from file content hash to parsed text and candidate name.
+
+    SQLite's file locking (in WAL mode) makes the cache safe to share between
+    several Streamlit worker processes on one host. Every call opens its own
+    short-lived connection, so instances can also be shared across threads.
+    Entries are evicted least-recently-used first once the stored text exceeds
+    ``max_mb``.
+    """
+
+    def __init__(self, path: str = PARSE_CACHE_PATH, max_mb: float = PARSE_CACHE_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        ensure_dir(os.path.dirname(path) or ".")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(file_hash: str, signature: str) -> str:
+        """Cache key for a file hash under a parser backend/version signature."""
+        return f"{file_hash}:{signature}"
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Return ``(text, name)`` for a key, or None on a miss."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT text, name FROM parsed WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE parsed SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return row[0], row[1]
+
+    def put(self, key: str, text: str, backend: str, name: Optional[str] = None) -> None:
+        now = time.time()
+        size = len(text.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO parsed (key, backend, text, name, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET backend = excluded.backend, text = excluded.text, "
+                "name = COALESCE(excluded.name, parsed.name), size = excluded.size, accessed = excluded.accessed",
+                (key, backend, text, name, size, now, now),
+            )
+            self._evict(conn)
+
+    def set_name(self, key: str, name: str) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE parsed SET name = ? WHERE key = ?", (name, key))
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM parsed").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so eviction does not run on every insert
+        target = int(self.max_bytes * 0.9)
+        for key, size in conn.execute("SELECT key, size FROM parsed ORDER BY accessed").fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM parsed WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM parsed")
+
+    def stats(self) -> Dict[str, float]:
+        with self._connect() as conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM parsed").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+        }
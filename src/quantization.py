@@ -0,0 +1,192 @@
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import EMBEDDING_STORAGE_DTYPE
+from src.ranking import normalize_rows, rank_embeddings, select_top_k
+
+QUANTIZATION_MODES = ("float32", "float16", "int8")
+_SCORE_BLOCK = 65536  # rows upcast at a time while scoring
+
+
+def check_mode(mode: str) -> str:
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode '{mode}'; expected one of {QUANTIZATION_MODES}")
+    return mode
+
+
+def quantize(vectors: np.ndarray, mode: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Codes and per-row float32 scales (all ones unless ``int8``) for normalized ``vectors``."""
+    scales = np.ones(vectors.shape[0], dtype=np.float32)
+    if mode == "int8":
+        scales = np.abs(vectors).max(axis=1, initial=0.0) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    if mode == "float16":
+        return vectors.astype(np.float16), scales
+    return vectors.astype(np.float32, copy=False), scales
+
+
+def score_codes(codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+    """Dot products of a normalized query with quantized rows, upcasting one block at a time."""
+    out = np.empty(codes.shape[0], dtype=np.float32)
+    for start in range(0, codes.shape[0], _SCORE_BLOCK):
+        block = codes[start:start + _SCORE_BLOCK]
+        out[start:start + _SCORE_BLOCK] = block.astype(np.float32, copy=False) @ query
+    if scales is not None:
+        out *= scales
+    return out
+
+
+def rescore_shortlist(
+    query_embedding,
+    scores: np.ndarray,
+    top_k: Optional[int],
+    threshold: Optional[float],
+    rescore_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    rescore_factor: int = 4,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k positions of approximate ``scores``, re-scored exactly through ``rescore_fn`` when given.
+
+    ``rescore_fn`` maps positions to float32 embeddings (e.g. read from the
+    embedding cache); the best ``top_k * rescore_factor`` positions are re-scored.
+    """
+    if rescore_fn is None or top_k is None:
+        return select_top_k(scores, top_k=top_k, threshold=threshold)
+    # Loosen the threshold for the shortlist; the exact scores decide
+    slack = None if threshold is None else threshold - 0.02
+    shortlist, _ = select_top_k(scores, top_k=top_k * rescore_factor, threshold=slack)
+    if shortlist.shape[0] == 0:
+        return shortlist, scores[shortlist]
+    picked, exact = rank_embeddings(query_embedding, rescore_fn(shortlist), top_k=top_k, threshold=threshold)
+    return shortlist[picked], exact
+
+
+class QuantizedEmbeddings:
+    """Compact store of normalized resume embeddings.
+
+    ``float16`` halves memory; ``int8`` quarters it using one float32 scale per
+    vector (symmetric scalar quantization). Scores are computed block by block
+    straight from the compressed arrays, so a full float32 copy is never built.
+    """
+
+    def __init__(self, embeddings, mode: str = "int8"):
+        self.mode = check_mode(mode)
+        self.codes, scales = quantize(normalize_rows(embeddings), mode)
+        self.scales = scales if mode == "int8" else None
+
+    @classmethod
+    def from_blocks(cls, blocks: Iterable[np.ndarray], mode: str = EMBEDDING_STORAGE_DTYPE) -> "QuantizedEmbeddings":
+        """Quantize embeddings block by block, so the full float32 matrix never exists at once."""
+        store = cls(np.empty((0, 0), dtype=np.float32), mode)
+        codes, scales = [], []
+        for block in blocks:
+            block_codes, block_scales = quantize(normalize_rows(block), mode)
+            codes.append(block_codes)
+            scales.append(block_scales)
+        if codes:
+            store.codes = np.concatenate(codes)
+            store.scales = np.concatenate(scales) if mode == "int8" else None
+        return store
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, query_embedding) -> np.ndarray:
+        """Approximate cosine similarity of the query against every stored vector."""
+        return score_codes(self.codes, self.scales, normalize_rows(query_embedding)[0])
+
+    def rank(
+        self,
+        query_embedding,
+        top_k: Optional[int] = 10,
+        threshold: Optional[float] = None,
+        rescore_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        rescore_factor: int = 4,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k ``(indices, scores)`` from the compressed vectors, best first.
+
+        With ``rescore_fn`` (row indices -> float32 embeddings, e.g. read from
+        the embedding cache), the best ``top_k * rescore_factor`` rows are
+        re-scored exactly before the final selection.
+        """
+        return rescore_shortlist(query_embedding, self.scores(query_embedding), top_k, threshold,
+                                 rescore_fn, rescore_factor)
+
+
+def agreement_report(
+    embeddings,
+    queries,
+    top_k: int = 10,
+    modes: Sequence[str] = ("float16", "int8"),
+    rescore_factor: int = 4,
+) -> List[Dict[str, float]]:
+    """Compare quantized rankings to exact float32 ranking.
+
+    For each mode (and int8/float16 with float32 re-scoring) reports recall@k,
+    exact top-k order agreement, max absolute score error, memory and latency.
+    """
+    exact_vectors = normalize_rows(embeddings)
+    queries = normalize_rows(queries)
+    truth = [rank_embeddings(q, exact_vectors, top_k=top_k, normalized=True) for q in queries]
+    report = [{"mode": "float32", "rescored": False, "recall": 1.0, "order_agreement": 1.0,
+               "max_score_error": 0.0, "megabytes": exact_vectors.nbytes / 1e6, "latency_ms": None}]
+
+    for mode in modes:
+        store = QuantizedEmbeddings(exact_vectors, mode)
+        for rescored in (False, True):
+            rescore_fn = (lambda rows: exact_vectors[rows]) if rescored else None
+            hits = same_order = 0
+            max_error = 0.0
+            elapsed = 0.0
+            for query, (true_idx, true_scores) in zip(queries, truth):
+                start_time = time.perf_counter()
+                idx, scores = store.rank(query, top_k=top_k, rescore_fn=rescore_fn, rescore_factor=rescore_factor)
+                elapsed += time.perf_counter() - start_time
+                hits += len(set(idx.tolist()) & set(true_idx.tolist()))
+                same_order += int(np.array_equal(idx, true_idx))
+                if not rescored:
+                    max_error = max(max_error, float(np.abs(store.scores(query)[true_idx] - true_scores).max()))
+            report.append({
+                "mode": mode,
+                "rescored": rescored,
+                "recall": hits / (len(queries) * top_k),
+                "order_agreement": same_order / len(queries),
+                "max_score_error": max_error if not rescored else 0.0,
+                "megabytes": store.nbytes / 1e6,
+                "latency_ms": elapsed * 1000 / len(queries),
+            })
+    return report
+
+
+def main():
+    """Print the agreement report for a synthetic pool so a storage mode can be picked."""
+    import argparse
+
+    from src.vector_index import _synthetic_embeddings
+
+    parser = argparse.ArgumentParser(description="Quantized vs float32 ranking agreement")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings = _synthetic_embeddings(args.size, args.dim, n_topics=200, rng=rng)
+    queries = _synthetic_embeddings(args.queries, args.dim, n_topics=200, rng=rng)
+    print(f"{'mode':<16} {'recall@' + str(args.top_k):>10} {'same order':>10} {'max err':>8} {'MB':>8} {'ms/query':>9}")
+    for row in agreement_report(embeddings, queries, top_k=args.top_k):
+        label = row["mode"] + ("+rescore" if row["rescored"] else "")
+        latency = f"{row['latency_ms']:.2f}" if row["latency_ms"] is not None else "-"
+        print(f"{label:<16} {row['recall']:>10.3f} {row['order_agreement']:>10.2f} "
+              f"{row['max_score_error']:>8.4f} {row['megabytes']:>8.1f} {latency:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import heapq
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_rows(matrix) -> np.ndarray:
+    """L2-normalize each row so dot products are cosine similarities."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def cosine_scores(query_embedding, resume_embeddings, normalized: bool = False) -> np.ndarray:
+    """Cosine similarity of one query against every row with a single matrix-vector product."""
+    query = normalize_rows(query_embedding)[0]
+    matrix = resume_embeddings if normalized else normalize_rows(resume_embeddings)
+    return matrix @ query
+
+
+def select_top_k(
+    scores,
+    top_k: Optional[int] = None,
+    threshold: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices and scores of the best ``top_k`` entries at or above ``threshold``.
+
+    Uses ``argpartition`` so only the selected entries are sorted.
+    """
+    scores = np.asarray(scores)
+    candidates = np.arange(scores.shape[0])
+    if threshold is not None:
+        candidates = np.flatnonzero(scores >= threshold)
+    if top_k is not None and 0 <= top_k < candidates.shape[0]:
+        if top_k == 0:
+            candidates = candidates[:0]
+        else:
+            part = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+            candidates = candidates[part]
+    order = np.argsort(-scores[candidates], kind="stable")
+    indices = candidates[order]
+    return indices, scores[indices]
+
+
+def rank_embeddings(
+    query_embedding,
+    resume_embeddings,
+    top_k: Optional[int] = None,
+    threshold: Optional[float] = None,
+    normalized: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Score a pool against one query and return ``(indices, scores)`` best first."""
+    if len(resume_embeddings) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    scores = cosine_scores(query_embedding, resume_embeddings, normalized=normalized)
+    return select_top_k(scores, top_k=top_k, threshold=threshold)
+
+
+def _top_k_columns(scores: np.ndarray, indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the ``k`` best columns of each row of ``scores`` (unordered)."""
+    if scores.shape[1] <= k:
+        return scores, indices
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, part, axis=1), np.take_along_axis(indices, part, axis=1)
+
+
+def _finish_rows(scores: np.ndarray, indices: np.ndarray, threshold: Optional[float]):
+    rows = []
+    for row_scores, row_indices in zip(scores, indices):
+        keep = row_indices >= 0
+        if threshold is not None:
+            keep &= row_scores >= threshold
+        row_scores, row_indices = row_scores[keep], row_indices[keep]
+        order = np.argsort(-row_scores, kind="stable")
+        rows.append((row_indices[order], row_scores[order]))
+    return rows
+
+
+# Bytes per score cell of a block: float32 score, its negation and argpartition's int64 index
+_CELL_BYTES = 4 + 4 + 8
+# argpartition also copies the row it is working on (value + int64 index per column)
+_ROW_BYTES = 4 + 8
+# Bytes per running top-k slot while merging a block: the block's winners, the hstack of old and
+# new scores/indices (twice as wide) and that merge's own negation + argpartition temporaries
+_MERGE_BYTES = 12 + 2 * (12 + 4 + 8)
+
+
+def _block_shape(n_jobs: int, n_resumes: int, k_job: int, k_resume: int, budget: int) -> Tuple[int, int]:
+    """``(job_block, resume_block)`` covering the most scores whose buffers fit in ``budget`` bytes."""
+    best = (1, 1)
+    job_block = max(1, min(n_jobs, 256))
+    while True:
+        free = budget - job_block * (k_job * _MERGE_BYTES + _ROW_BYTES)
+        resume_block = min(n_resumes, free // (job_block * _CELL_BYTES + _ROW_BYTES + k_resume * _MERGE_BYTES))
+        if resume_block >= 1 and job_block * resume_block > best[0] * best[1]:
+            best = (job_block, int(resume_block))
+        if job_block == 1:
+            return best
+        job_block //= 2
+
+
+def blocked_top_k(
+    job_embeddings,
+    resume_embeddings,
+    top_k_per_job: int = 10,
+    top_k_per_resume: Optional[int] = None,
+    threshold: Optional[float] = None,
+    max_block_mb: float = 64,
+    normalized: bool = False,
+):
+    """Top-k resumes per job and top-k jobs per resume without building the N x M score matrix.
+
+    ``max_block_mb`` bounds the running top-k arrays plus one job x resume
+    block of scores with its selection and merge temporaries (blocks keep at
+    least a quarter of it when the running arrays alone are larger); each
+    block's winners are merged into the running arrays. ``top_k_per_job`` must be
+    finite (a full ranking per job is the N x M matrix). Returns ``(per_job,
+    per_resume)``, lists of ``(indices, scores)`` best first like
+    ``select_top_k``; ``per_resume`` is None when ``top_k_per_resume`` is None.
+    """
+    if top_k_per_job is None:
+        raise ValueError("top_k_per_job must be finite; rank each job with rank_embeddings for a full ranking")
+    jobs = job_embeddings if normalized else normalize_rows(job_embeddings)
+    resumes = resume_embeddings if normalized else normalize_rows(resume_embeddings)
+    n_jobs, n_resumes = jobs.shape[0], resumes.shape[0]
+    k_job = min(top_k_per_job, n_resumes)
+    k_resume = None if top_k_per_resume is None else min(top_k_per_resume, n_jobs)
+
+    # The running arrays are output-sized; blocks get what is left, but never less than a quarter
+    budget = int(max_block_mb * 1024 * 1024)
+    running = (n_jobs * k_job + n_resumes * (k_resume or 0)) * (4 + 8)
+    job_block, resume_block = _block_shape(n_jobs, n_resumes, k_job, k_resume or 0,
+                                           max(budget - running, budget // 4))
+
+    job_scores = np.full((n_jobs, k_job), -np.inf, dtype=np.float32)
+    job_indices = np.full((n_jobs, k_job), -1, dtype=np.int64)
+    if k_resume is not None:
+        resume_scores = np.full((n_resumes, k_resume), -np.inf, dtype=np.float32)
+        resume_indices = np.full((n_resumes, k_resume), -1, dtype=np.int64)
+
+    for r0 in range(0, n_resumes, resume_block):
+        r1 = min(n_resumes, r0 + resume_block)
+        block_resumes = resumes[r0:r1]
+        for j0 in range(0, n_jobs, job_block):
+            j1 = min(n_jobs, j0 + job_block)
+            block = jobs[j0:j1] @ block_resumes.T
+            if k_job:
+                cols = np.broadcast_to(np.arange(r0, r1), block.shape)
+                s, i = _top_k_columns(block, cols, k_job)
+                job_scores[j0:j1], job_indices[j0:j1] = _top_k_columns(
+                    np.hstack([job_scores[j0:j1], s]), np.hstack([job_indices[j0:j1], i]), k_job)
+            if k_resume:
+                rows = np.broadcast_to(np.arange(j0, j1), block.T.shape)
+                s, i = _top_k_columns(block.T, rows, k_resume)
+                resume_scores[r0:r1], resume_indices[r0:r1] = _top_k_columns(
+                    np.hstack([resume_scores[r0:r1], s]), np.hstack([resume_indices[r0:r1], i]), k_resume)
+
+    per_job = _finish_rows(job_scores, job_indices, threshold)
+    per_resume = _finish_rows(resume_scores, resume_indices, threshold) if k_resume is not None else None
+    return per_job, per_resume
+
+
+class RunningTopK:
+    """Best ``top_k`` items seen so far, kept in a min-heap as scores stream in.
+
+    Items scoring below ``threshold`` are dropped; ``top_k=None`` keeps every
+    item. Ties keep the item that arrived first.
+    """
+
+    def __init__(self, top_k: Optional[int] = None, threshold: Optional[float] = None):
+        self.top_k = top_k
+        self.threshold = threshold
+        self.seen = 0
+        self._heap: List[Tuple[float, int, Any]] = []
+
+    def push_many(self, scores, items) -> bool:
+        """Offer a batch of ``items`` with their ``scores``; returns True if the top-k changed."""
+        changed = False
+        for score, item in zip(np.asarray(scores, dtype=np.float32).tolist(), items):
+            entry = (score, -self.seen, item)
+            self.seen += 1
+            if self.threshold is not None and score < self.threshold:
+                continue
+            if self.top_k is None or len(self._heap) < self.top_k:
+                heapq.heappush(self._heap, entry)
+                changed = True
+            elif self.top_k > 0 and entry[:2] > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, entry)
+                changed = True
+        return changed
+
+    def ranked(self) -> List[Tuple[float, Any]]:
+        """Current ``(score, item)`` pairs, best first."""
+        return [(score, item) for score, _, item in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
@@ -1,17 +1,165 @@
+import asyncio
+import json
 import os
+import random
+import threading
 import time
-from typing import Optional
-from groq import Groq, APIError
-from src.utils import get_env_var
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from groq import Groq, AsyncGroq, APIConnectionError, APIStatusError
+from config.settings import (
+    REASONING_MODEL,
+    GROQ_RPM,
+    GROQ_TPM,
+    REASONING_CONCURRENCY,
+    REASONING_MAX_RETRIES,
+    REASONING_MAX_BACKOFF,
+    REASONING_CACHE_ENABLED,
+    REASONING_BATCH_ENABLED,
+    REASONING_BATCH_TOKEN_BUDGET,
+    REASONING_BATCH_MAX_CANDIDATES,
+)
+from src.instrumentation import span
+from src.reasoning_cache import ReasoningCache, reasoning_key
+from src.utils import get_env_var, iterate_async
+
+REASONING_MAX_TOKENS = 500
+REASONING_BATCH_TOKENS_PER_CANDIDATE = 150  # completion allowance per candidate in a batch
+PROMPT_VERSION = "fit-v1"  # bump whenever build_fit_prompt changes
+REASONING_FAILED = "Failed to generate reasoning after multiple retries."
+CLIENT_MISSING = "Error: Groq client is not initialized. Please check your API key."
+
+
+def _client_options():
+    options = {"api_key": get_env_var("GroqAPI")}
+    base_url = get_env_var("GROQ_BASE_URL")
+    if base_url:
+        # Point at a local fake Groq endpoint for testing
+        options["base_url"] = base_url
+    return options
+
 
 try:
     if Groq:
-        client = Groq(api_key=get_env_var("GroqAPI"))
+        client = Groq(**_client_options())
     else:
         client = None
 except Exception as e:
     client = None
 
+def make_async_client(**overrides):
+    """AsyncGroq client with SDK retries off; the scheduler handles retries.
+
+    A new client is made per event loop because its connection pool is bound
+    to the loop that created it. ``overrides`` (``api_key``, ``base_url``)
+    replace the configured options, e.g. to talk to ``FakeGroqServer``.
+    """
+    try:
+        return AsyncGroq(max_retries=0, **dict(_client_options(), **overrides))
+    except Exception:
+        return None
+
+
+_REASONING_CACHE = None
+
+
+def get_reasoning_cache() -> Optional[ReasoningCache]:
+    """Shared reasoning cache, or None when caching is disabled."""
+    global _REASONING_CACHE
+    if _REASONING_CACHE is None and REASONING_CACHE_ENABLED:
+        _REASONING_CACHE = ReasoningCache()
+    return _REASONING_CACHE
+
+
+def is_reasoning_failure(reasoning: str) -> bool:
+    return not reasoning or reasoning == REASONING_FAILED or reasoning.startswith("Error")
+
+
+def _cache_lookup(job_description, resume_text, candidate_name, use_cache):
+    cache = get_reasoning_cache() if use_cache else None
+    if cache is None:
+        return None, None
+    key = reasoning_key(job_description, resume_text, candidate_name, REASONING_MODEL, PROMPT_VERSION)
+    return key, cache.get(key)
+
+
+def _cache_store(key, reasoning):
+    # Failure strings are never cached so the next run retries them
+    if key is not None and not is_reasoning_failure(reasoning):
+        get_reasoning_cache().put(key, reasoning, REASONING_MODEL, PROMPT_VERSION)
+
+
+def _record_usage(sp, completion) -> None:
+    usage = getattr(completion, "usage", None)
+    if sp and usage is not None:
+        sp.add("prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+        sp.add("completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+
+
+def build_fit_prompt(job_description: str, resume_text: str, candidate_name: str) -> str:
+    return f"""
+    Based on the following resume and job description, explain in one or two concise sentences
+    why the candidate '{candidate_name}' is a good fit for this role. Synthesize the key
+    qualifications from the resume and connect them directly to the requirements in the job description.
+
+    ## Job Description:
+    {job_description}
+
+    ## Resume:
+    {resume_text}
+    """
+
+
+def _completion_kwargs(prompt: str) -> dict:
+    return dict(
+        model=REASONING_MODEL,
+        messages=[
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ],
+        temperature=0.3,
+        max_tokens=REASONING_MAX_TOKENS,
+        top_p=1,
+        reasoning_effort="low",
+        stream=False,
+        stop=None,
+    )
+
+
+def estimate_tokens(prompt: str, max_tokens: int = REASONING_MAX_TOKENS) -> int:
+    """Rough request cost for rate limiting: ~4 characters per prompt token plus the completion cap."""
+    return len(prompt) // 4 + max_tokens
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Seconds requested by a ``Retry-After`` header on an API error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits (429), server errors (5xx), timeouts and connection failures; other errors never succeed on retry."""
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (APIConnectionError, TimeoutError, asyncio.TimeoutError, ConnectionError))
+
+
+def backoff_delay(attempt: int, base_delay: float, error: Optional[Exception] = None,
+                  max_delay: float = REASONING_MAX_BACKOFF) -> float:
+    """Exponential backoff with full jitter, overridden by a server ``Retry-After`` (both capped at ``max_delay``)."""
+    retry_after = retry_after_seconds(error) if error is not None else None
+    if retry_after is not None:
+        return min(max(0.0, retry_after), max_delay)
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
 
 def generate_comprehensive_fit_reasoning(
     job_description: str,
@@ -19,65 +167,336 @@ def generate_comprehensive_fit_reasoning(
     candidate_name: str,
     max_retries: int = 2,
     retry_delay: int = 5,
+    use_cache: bool = True,
 ) -> str:
     """
     Generates a candidate fit explanation using the Groq API with a retry mechanism.
 
-    Note: The 3-5 second pause between processing different resumes should be
-    handled by the calling script that iterates through the list of candidates.
+    Use ``stream_fit_reasoning`` to explain several candidates concurrently
+    under the account's rate limits.
 
     Args:
         job_description: The full text of the job description.
         resume_text: The full text of the candidate's resume.
         candidate_name: The name of the candidate.
         max_retries: The maximum number of times to retry the API call upon failure.
-        retry_delay: The number of seconds to wait between retries.
+        retry_delay: Base delay in seconds for exponential backoff between retries.
+        use_cache: Serve and store successful explanations in the reasoning cache.
 
     Returns:
         A string containing the reasoning, or an error message if all retries fail.
     """
-    if not client:
-        return "Error: Groq client is not initialized. Please check your API key."
+    with span("reasoning", model=REASONING_MODEL) as sp:
+        key, cached = _cache_lookup(job_description, resume_text, candidate_name, use_cache)
+        if cached is not None:
+            sp.add("cache_hits")
+            return cached
+        if not client:
+            return CLIENT_MISSING
 
-    prompt = f"""
-    Based on the following resume and job description, explain in one or two concise sentences 
-    why the candidate '{candidate_name}' is a good fit for this role. Synthesize the key 
-    qualifications from the resume and connect them directly to the requirements in the job description.
+        prompt = build_fit_prompt(job_description, resume_text, candidate_name)
+
+        for attempt in range(max_retries + 1):
+            error = None
+            try:
+                completion = client.chat.completions.create(**_completion_kwargs(prompt))
+
+                response = completion.choices[0].message.content.strip()
+                _record_usage(sp, completion)
+                _cache_store(key, response)
+                return response
+
+            except Exception as e:
+                error = e
+
+            if attempt < max_retries and is_retryable(error):
+                sp.add("retries")
+                time.sleep(backoff_delay(attempt, retry_delay, error))
+            else:
+                break
+
+        sp.add("failures")
+        return REASONING_FAILED
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute`` units per minute.
+
+    Callers reserve capacity under a thread lock and then sleep off any
+    deficit, so one bucket can be shared by every event loop in the process.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take ``amount`` units and return how many seconds to wait before using them."""
+        # Requests larger than the bucket wait for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        wait = self.reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one Groq account."""
+
+    def __init__(self, rpm: float = GROQ_RPM, tpm: float = GROQ_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    async def acquire(self, tokens: int) -> None:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_RATE_LIMITER = None  # shared by every session in this process
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _RATE_LIMITER
+    if _RATE_LIMITER is None:
+        _RATE_LIMITER = RateLimiter()
+    return _RATE_LIMITER
+
+
+async def _complete_async(async_client, prompt, limiter, max_retries, retry_delay, **overrides) -> Optional[str]:
+    """One chat completion with rate limiting and backoff; None once retries run out."""
+    kwargs = dict(_completion_kwargs(prompt), **overrides)
+    max_tokens = kwargs["max_tokens"]
+    with span("reasoning.request", model=REASONING_MODEL) as sp:
+        for attempt in range(max_retries + 1):
+            if limiter is not None:
+                wait_start = time.perf_counter()
+                await limiter.acquire(estimate_tokens(prompt, max_tokens))
+                sp.add("rate_limit_wait_seconds", time.perf_counter() - wait_start)
+            try:
+                completion = await async_client.chat.completions.create(**kwargs)
+                _record_usage(sp, completion)
+                return completion.choices[0].message.content.strip()
+            except Exception as e:
+                error = e
+            if attempt < max_retries and is_retryable(error):
+                sp.add("retries")
+                await asyncio.sleep(backoff_delay(attempt, retry_delay, error))
+            else:
+                break
+        sp.add("failures")
+        return None
+
+
+async def generate_fit_reasoning_async(
+    job_description: str,
+    resume_text: str,
+    candidate_name: str,
+    async_client=None,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = REASONING_MAX_RETRIES,
+    retry_delay: float = 1.0,
+    use_cache: bool = True,
+) -> str:
+    """Async counterpart of ``generate_comprehensive_fit_reasoning`` that waits on ``limiter``."""
+    key, cached = _cache_lookup(job_description, resume_text, candidate_name, use_cache)
+    if cached is not None:
+        return cached
+    async_client = async_client or make_async_client()
+    if not async_client:
+        return CLIENT_MISSING
+
+    prompt = build_fit_prompt(job_description, resume_text, candidate_name)
+    response = await _complete_async(async_client, prompt, limiter, max_retries, retry_delay)
+    if response is None:
+        return REASONING_FAILED
+    _cache_store(key, response)
+    return response
+
+
+def build_batch_prompt(job_description: str, candidates: Sequence[Tuple[int, str, str]]) -> str:
+    """One prompt explaining several ``(id, name, resume_text)`` candidates; the job is sent once."""
+    resumes = "\n\n".join(
+        f"### Candidate id {candidate_id}: {name}\n{resume_text}"
+        for candidate_id, name, resume_text in candidates
+    )
+    return f"""
+    For each candidate below, explain in one or two concise sentences why they are a good fit
+    for this role. Synthesize the key qualifications from their resume and connect them
+    directly to the requirements in the job description.
+
+    Respond with JSON only, in the form
+    {{"explanations": [{{"id": <candidate id>, "reasoning": "<explanation>"}}]}}
+    with exactly one entry per candidate.
 
     ## Job Description:
     {job_description}
 
-    ## Resume:
-    {resume_text}
+    ## Resumes:
+    {resumes}
     """
 
-    for attempt in range(max_retries + 1):
+
+def pack_batches(
+    job_description: str,
+    candidates: Sequence[Tuple[int, str, str]],
+    token_budget: int = REASONING_BATCH_TOKEN_BUDGET,
+    max_candidates: int = REASONING_BATCH_MAX_CANDIDATES,
+) -> List[List[Tuple[int, str, str]]]:
+    """Group candidates so each batch prompt plus its completion stays within ``token_budget``."""
+    base = len(build_batch_prompt(job_description, [])) // 4
+    batches, current, used = [], [], base
+    for candidate in candidates:
+        cost = (len(candidate[1]) + len(candidate[2]) + 40) // 4 + REASONING_BATCH_TOKENS_PER_CANDIDATE
+        if current and (used + cost > token_budget or len(current) >= max_candidates):
+            batches.append(current)
+            current, used = [], base
+        current.append(candidate)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_response(response: Optional[str], candidate_ids: Sequence[int]) -> Dict[int, str]:
+    """Validate a batch JSON reply; returns reasoning for each expected id that has a usable one."""
+    if not response:
+        return {}
+    text = response.strip()
+    if text.startswith("```"):
+        text = text.strip("`").split("\n", 1)[-1]
+    try:
+        payload = json.loads(text[text.index("{"):text.rindex("}") + 1])
+    except ValueError:
+        return {}
+    entries = payload.get("explanations") if isinstance(payload, dict) else None
+    if not isinstance(entries, list):
+        return {}
+    expected = set(candidate_ids)
+    results = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
         try:
-            completion = client.chat.completions.create(
-                model="openai/gpt-oss-20b",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt,
-                    }
-                ],
-                temperature=0.3,
-                max_tokens=500, 
-                top_p=1,
-                reasoning_effort="low",
-                stream=False,
-                stop=None
+            candidate_id = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        reasoning = entry.get("reasoning")
+        if candidate_id in expected and isinstance(reasoning, str) and reasoning.strip():
+            results.setdefault(candidate_id, reasoning.strip())
+    return results
+
+
+async def generate_batch_reasoning_async(
+    job_description: str,
+    candidates: Sequence[Tuple[int, str, str]],
+    async_client=None,
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = REASONING_MAX_RETRIES,
+    retry_delay: float = 1.0,
+) -> List[Tuple[int, str]]:
+    """Explain a batch of ``(id, name, resume_text)`` candidates in one request.
+
+    Candidates missing from the structured reply fall back to a
+    single-candidate request. Returns ``(id, reasoning)`` for every candidate.
+    """
+    async_client = async_client or make_async_client()
+    if not async_client:
+        return [(candidate_id, CLIENT_MISSING) for candidate_id, _, _ in candidates]
+
+    response = None
+    if len(candidates) > 1:
+        prompt = build_batch_prompt(job_description, candidates)
+        response = await _complete_async(
+            async_client, prompt, limiter, max_retries, retry_delay,
+            max_tokens=REASONING_BATCH_TOKENS_PER_CANDIDATE * len(candidates),
+            response_format={"type": "json_object"},
+        )
+    explained = parse_batch_response(response, [candidate_id for candidate_id, _, _ in candidates])
+
+    results = []
+    for candidate_id, name, resume_text in candidates:
+        reasoning = explained.get(candidate_id)
+        if reasoning is None:
+            reasoning = await generate_fit_reasoning_async(
+                job_description, resume_text, name, async_client=async_client, limiter=limiter,
+                max_retries=max_retries, retry_delay=retry_delay, use_cache=False,
+            )
+        results.append((candidate_id, reasoning))
+    return results
+
+
+async def stream_fit_reasoning_async(
+    job_description: str,
+    candidates: Sequence[Tuple[str, str]],
+    async_client=None,
+    limiter: Optional[RateLimiter] = None,
+    concurrency: int = REASONING_CONCURRENCY,
+    max_retries: int = REASONING_MAX_RETRIES,
+    retry_delay: float = 1.0,
+    use_cache: bool = True,
+    batched: bool = REASONING_BATCH_ENABLED,
+    token_budget: int = REASONING_BATCH_TOKEN_BUDGET,
+) -> AsyncIterator[Tuple[int, str]]:
+    """Explain every ``(name, resume_text)`` candidate concurrently.
+
+    Yields ``(index, reasoning)`` in completion order so callers can show each
+    explanation as soon as it arrives; cached explanations come first. With
+    ``batched``, candidates are packed into multi-candidate requests of at most
+    ``token_budget`` tokens.
+    """
+    pending = []
+    keys = {}
+    hits = []
+    with span("reasoning.cache", documents=len(candidates)) as sp:
+        for index, (name, text) in enumerate(candidates):
+            key, cached = _cache_lookup(job_description, text, name, use_cache)
+            if cached is None:
+                pending.append((index, name, text))
+                keys[index] = key
+            else:
+                hits.append((index, cached))
+        sp.set(cache_hits=len(hits))
+    for item in hits:
+        yield item
+    if not pending:
+        return
+
+    limiter = limiter or get_rate_limiter()
+    async_client = async_client or make_async_client()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    batches = pack_batches(job_description, pending, token_budget) if batched else [[item] for item in pending]
+
+    async def run(batch):
+        async with semaphore:
+            results = await generate_batch_reasoning_async(
+                job_description, batch, async_client=async_client, limiter=limiter,
+                max_retries=max_retries, retry_delay=retry_delay,
             )
-            
-            response = completion.choices[0].message.content.strip()
-            return response
+        for index, reasoning in results:
+            _cache_store(keys[index], reasoning)
+        return results
 
-        except APIError as e:
-            pass
-        except Exception as e:
-            pass
+    tasks = [asyncio.ensure_future(run(batch)) for batch in batches]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            for item in await finished:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
 
-        if attempt < max_retries:
-            time.sleep(retry_delay)
 
-    return "Failed to generate reasoning after multiple retries."
+def stream_fit_reasoning(job_description: str, candidates: Sequence[Tuple[str, str]], **kwargs) -> Iterator[Tuple[int, str]]:
+    """Synchronous generator over ``stream_fit_reasoning_async``."""
+    return iterate_async(lambda: stream_fit_reasoning_async(job_description, candidates, **kwargs))
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from config.settings import REASONING_CACHE_MAX_MB, REASONING_CACHE_PATH, REASONING_CACHE_TTL_DAYS
+from src.utils import ensure_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reasoning (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    reasoning TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reasoning_accessed ON reasoning (accessed);
+"""
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def reasoning_key(job_description: str, resume_text: str, candidate_name: str,
+                  model: str, prompt_version: str) -> str:
+    """Cache key from the prompt inputs, the model id and the prompt template version."""
+    parts = [model, prompt_version, _sha256(job_description), _sha256(resume_text), candidate_name]
+    return _sha256("\x00".join(parts))
+
+
+class ReasoningCache:
+    """SQLite-backed store of LLM fit explanations.
+
+    Entries expire after ``ttl_days`` and are evicted least-recently-used
+    first once the stored text exceeds ``max_mb``. Like ``ParseCache`` it is
+    safe to share between threads and worker processes.
+    """
+
+    def __init__(self, path: str = REASONING_CACHE_PATH, max_mb: float = REASONING_CACHE_MAX_MB,
+                 ttl_days: float = REASONING_CACHE_TTL_DAYS):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self.hits = 0
+        self.misses = 0
+        ensure_dir(os.path.dirname(path) or ".")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT reasoning FROM reasoning WHERE key = ? AND created >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE reasoning SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, reasoning: str, model: str, prompt_version: str) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO reasoning (key, model, prompt_version, reasoning, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, reasoning, len(reasoning.encode("utf-8")), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM reasoning WHERE created < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM reasoning").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so eviction does not run on every insert
+        target = int(self.max_bytes * 0.9)
+        for key, size in conn.execute("SELECT key, size FROM reasoning ORDER BY accessed").fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM reasoning WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM reasoning")
+
+    def stats(self) -> Dict[str, float]:
+        with self._connect() as conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reasoning").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+        }
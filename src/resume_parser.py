@@ -1,9 +1,25 @@
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from llama_parse import LlamaParse
 import asyncio
 from collections import Counter
-from .utils import get_env_var
+from config.settings import (
+    PARSE_CONCURRENCY,
+    PARSE_TIMEOUT,
+    PARSE_RETRIES,
+    LOCAL_EXTRACTION_ENABLED,
+    PDF_MIN_CHARS_PER_PAGE,
+    PDF_MAX_FRAGMENT_RATIO,
+    PARSE_CACHE_ENABLED,
+    PARSE_CACHE_VERSION,
+    NAME_BATCH_SIZE,
+    NAME_N_PROCESS,
+)
+from .instrumentation import current_span, span
+from .parse_cache import ParseCache, file_sha256
+from .utils import get_env_var, iterate_async
 
 def _debug_enabled() -> bool:
     return get_env_var("RESUME_PARSER_DEBUG", "0").lower() in ("1", "true", "yes", "on")
@@ -18,42 +34,191 @@ except Exception:  # pragma: no cover
     spacy = None  # spaCy not installed
 
 _NLP = None  # cached nlp model
+_NLP_UNAVAILABLE = False  # set once loading fails so we do not retry per resume
+NAME_NOT_FOUND = "Name not found"
 
 def _get_spacy_nlp():
-    global _NLP
+    global _NLP, _NLP_UNAVAILABLE
     if _NLP is not None:
         return _NLP
-    if spacy is None:
+    if spacy is None or _NLP_UNAVAILABLE:
         return None
     try:
-        _NLP = spacy.load("en_core_web_sm")
+        nlp = spacy.load("en_core_web_sm")
+        # Name extraction only needs NER; skip tagging, parsing and lemmatizing
+        nlp.select_pipes(enable=["ner"])
+        _NLP = nlp
     except Exception:
-        # Model not available; return None to trigger filename fallback
-        _NLP = None
+        # Model not available; return None to trigger the heuristic fallback
+        _NLP_UNAVAILABLE = True
     return _NLP
 
+def _name_region(resume_text: str) -> str:
+    # Names typically appear in the first few lines
+    return '\n'.join(resume_text.split('\n')[:3])
+
+def _heuristic_name(resume_text: str) -> str:
+    """Cheap fallback: the first short, all-alphabetic header line."""
+    for line in _name_region(resume_text).split('\n'):
+        words = line.strip().strip('#*').split()
+        if 2 <= len(words) <= 4 and all(w.replace('-', '').replace("'", '').replace('.', '').isalpha() for w in words):
+            return " ".join(w.capitalize() if w.isupper() else w for w in words)
+    return NAME_NOT_FOUND
+
+def _first_person(doc) -> str:
+    for ent in doc.ents:
+        if ent.label_ == "PERSON" and ent.text.strip():
+            return ent.text.strip()
+    return NAME_NOT_FOUND
+
+def extract_names_from_resumes(resume_texts, batch_size=NAME_BATCH_SIZE, n_process=NAME_N_PROCESS):
+    """Extract a PERSON name from each resume in one spaCy ``nlp.pipe`` pass.
+
+    Only the NER component runs. Falls back to a header-line heuristic when
+    spaCy or ``en_core_web_sm`` is unavailable. Returns 'Name not found' for
+    resumes without a detectable name.
+    """
+    resume_texts = list(resume_texts)
+    names = [NAME_NOT_FOUND] * len(resume_texts)
+    todo = [i for i, text in enumerate(resume_texts) if text]
+    if not todo:
+        return names
+
+    with span("names", documents=len(todo)) as sp:
+        nlp = _get_spacy_nlp()
+        if not nlp:
+            sp.set(backend="heuristic")
+            for i in todo:
+                names[i] = _heuristic_name(resume_texts[i])
+            return names
+
+        sp.set(backend="spacy")
+        try:
+            regions = (_name_region(resume_texts[i]).title() for i in todo)
+            for i, doc in zip(todo, nlp.pipe(regions, batch_size=batch_size, n_process=n_process)):
+                names[i] = _first_person(doc)
+        except Exception:
+            _dbg("spaCy name extraction failed; using heuristic names")
+            sp.set(backend="heuristic")
+            for i in todo:
+                names[i] = _heuristic_name(resume_texts[i])
+        return names
+
 def extract_name_from_resume(resume_text: str) -> str:
     """Extract a PERSON name from resume text using spaCy NER.
     Returns the first detected PERSON entity or 'Name not found' if none found.
     """
-    nlp = _get_spacy_nlp()
-    if not nlp or not resume_text:
-        return "Name not found"
-    
+    return extract_names_from_resumes([resume_text])[0]
+
+try:
+    from pypdf import PdfReader  # type: ignore
+except Exception:  # pragma: no cover
+    PdfReader = None  # pypdf not installed; PDFs always go to LlamaParse
+
+try:
+    import docx  # type: ignore  # python-docx
+except Exception:  # pragma: no cover
+    docx = None
+
+try:
+    import docx2txt  # type: ignore
+except Exception:  # pragma: no cover
+    docx2txt = None
+
+# Local extractors by file extension. Each returns the text, or None to
+# escalate the file to LlamaParse.
+_EXTRACTORS = {}
+_STATS_LOCK = threading.Lock()
+_BACKEND_STATS = {}
+
+def register_extractor(extension: str, backend: str):
+    """Register a local extractor function for a file extension."""
+    def decorator(func):
+        _EXTRACTORS[extension.lower()] = (backend, func)
+        return func
+    return decorator
+
+def _record_backend(backend: str, seconds: float, escalated: bool = False) -> None:
+    with _STATS_LOCK:
+        stats = _BACKEND_STATS.setdefault(
+            backend, {"files": 0, "seconds": 0.0, "escalated": 0}
+        )
+        if escalated:
+            stats["escalated"] += 1
+        else:
+            stats["files"] += 1
+        stats["seconds"] += seconds
+
+def extraction_stats():
+    """Per-backend file counts, total and mean seconds, and escalations to LlamaParse."""
+    with _STATS_LOCK:
+        return {
+            backend: dict(stats, mean_seconds=stats["seconds"] / stats["files"] if stats["files"] else 0.0)
+            for backend, stats in _BACKEND_STATS.items()
+        }
+
+@register_extractor(".txt", "text")
+def _extract_txt(file_path):
+    with open(file_path, "rb") as f:
+        raw = f.read()
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("utf-8", errors="replace")
+
+@register_extractor(".docx", "docx")
+def _extract_docx(file_path):
+    if docx is not None:
+        document = docx.Document(file_path)
+        lines = [p.text for p in document.paragraphs]
+        for table in document.tables:
+            for row in table.rows:
+                lines.append(" | ".join(cell.text for cell in row.cells))
+        return "\n".join(lines)
+    if docx2txt is not None:
+        return docx2txt.process(file_path)
+    return None
+
+@register_extractor(".pdf", "pdf_text_layer")
+def _extract_pdf_text_layer(file_path):
+    """Read the embedded text layer; escalate scanned or layout-heavy PDFs."""
+    if PdfReader is None:
+        return None
+    reader = PdfReader(file_path)
+    pages = [page.extract_text() or "" for page in reader.pages]
+    text = "\n".join(pages)
+    if not pages or len(text.strip()) < PDF_MIN_CHARS_PER_PAGE * len(pages):
+        return None  # little or no text layer: likely scanned
+    lines = [line for line in text.splitlines() if line.strip()]
+    short_lines = sum(1 for line in lines if len(line.split()) <= 2)
+    if lines and short_lines / len(lines) > PDF_MAX_FRAGMENT_RATIO:
+        return None  # text broken into fragments: multi-column or table layout
+    return text
+
+def extract_text_locally(file_path):
+    """Try the registered local extractor for this file type.
+
+    Returns ``(backend, text)``, or None when the file must go to LlamaParse.
+    """
+    _, ext = os.path.splitext(str(file_path).lower())
+    entry = _EXTRACTORS.get(ext)
+    if entry is None:
+        return None
+    backend, func = entry
+    start_time = time.perf_counter()
     try:
-        # Process the first few lines where names typically appear
-        first_lines = '\n'.join(resume_text.split('\n')[:3])
-        doc = nlp(first_lines.title())
-        # Get all PERSON entities and return the first one
-        for ent in doc.ents:
-            if ent.label_ == "PERSON" and ent.text.strip():
-                return ent.text.strip()
-                
+        text = func(file_path)
     except Exception as e:
-        return "Name not found"
-    
-    return "Name not found"
-
+        _dbg(f"{backend} extractor failed for {file_path}: {e}")
+        text = None
+    elapsed = time.perf_counter() - start_time
+    if text is None or not text.strip():
+        _record_backend(backend, elapsed, escalated=True)
+        return None
+    _record_backend(backend, elapsed)
+    return backend, text
 
 def setup_llamaparse():
     """Load API key and initialize LlamaParse with proper configuration."""
@@ -64,49 +229,263 @@ def setup_llamaparse():
         raise ValueError("LLAMAPARSE API key not found in environment variables or Streamlit secrets")
     
     # Initialize with minimal, stable configuration
+    options = {}
+    base_url = get_env_var('LLAMAPARSE_BASE_URL')
+    if base_url:
+        # Point at a local stub server for testing
+        options["base_url"] = base_url
     parser = LlamaParse(
         api_key=api_key,
         result_type="markdown",
-        verbose=True
+        verbose=True,
+        **options
     )
     
     return parser
 
+_PARSER = None  # shared LlamaParse client
+_PARSER_LOCK = threading.Lock()
+
+def get_llamaparse():
+    """Return the process-wide LlamaParse client, creating it on first use."""
+    global _PARSER
+    if _PARSER is None:
+        with _PARSER_LOCK:
+            if _PARSER is None:
+                _PARSER = setup_llamaparse()
+    return _PARSER
+
+def _document_text(documents):
+    if documents and len(documents) > 0:
+        return documents[0].text
+    return "No content extracted"
+
+_PARSE_CACHE = None  # shared parsed-text cache
+
+def get_parse_cache():
+    """Return the shared parsed-text cache, or None when caching is disabled."""
+    global _PARSE_CACHE
+    if _PARSE_CACHE is None and PARSE_CACHE_ENABLED:
+        _PARSE_CACHE = ParseCache()
+    return _PARSE_CACHE
+
+def _parser_signature(use_local):
+    # Cached text is only valid for the pipeline that produced it
+    return f"v{PARSE_CACHE_VERSION}:{'local+' if use_local else ''}llamaparse-markdown"
+
+def _is_parse_failure(text):
+    text = (text or "").strip()
+    return not text or text == "No content extracted" or text.startswith(("Error", "Both sync and async failed"))
+
+def _cache_key(file_path, use_local, cache):
+    if cache is None:
+        return None
+    try:
+        return ParseCache.make_key(file_sha256(file_path), _parser_signature(use_local))
+    except OSError:
+        return None
+
+def _cached_text(key, cache):
+    if key is None:
+        return None
+    hit = cache.get(key)
+    return hit[0] if hit else None
+
+def _store_text(key, text, backend, cache):
+    if key is None or _is_parse_failure(text):
+        return
+    cache.put(key, text, backend)
+
+def candidate_names_for_files(file_paths, texts, use_local=LOCAL_EXTRACTION_ENABLED):
+    """Candidate names for parsed files, cached alongside their text.
+
+    Names missing from the parse cache are extracted in one batch. Returns
+    'Name not found' entries like ``extract_names_from_resumes``.
+    """
+    names = [None] * len(file_paths)
+    cache = get_parse_cache()
+    keys = [_cache_key(path, use_local, cache) for path in file_paths]
+    hits = [cache.get(key) if key is not None else None for key in keys]
+    for i, hit in enumerate(hits):
+        if hit and hit[1]:
+            names[i] = hit[1]
+    missing = [i for i, name in enumerate(names) if name is None]
+    extracted = extract_names_from_resumes([texts[i] or "" for i in missing])
+    for i, name in zip(missing, extracted):
+        names[i] = name
+        if hits[i] is not None:
+            cache.set_name(keys[i], name)
+    return names
+
+def candidate_name_for_file(file_path, text, use_local=LOCAL_EXTRACTION_ENABLED):
+    """Candidate name for a single parsed file, cached alongside its text."""
+    return candidate_names_for_files([file_path], [text], use_local)[0]
+
 async def parse_resume_async(file_path):
     """Async version of resume parsing."""
-    parser = setup_llamaparse()
+    parser = get_llamaparse()
     
     try:
         # Use async parsing
         documents = await parser.aload_data(file_path)
-        
-        if documents and len(documents) > 0:
-            return documents[0].text
-        else:
-            return "No content extracted"
+        return _document_text(documents)
             
     except Exception as e:
         return f"Error: {str(e)}"
 
-def parse_resume_sync(file_path):
-    """Synchronous version with better error handling."""
-    parser = setup_llamaparse()
-    
+def _file_size(file_path):
     try:
-        # Try synchronous parsing first
-        documents = parser.load_data(file_path)
-        
-        if documents and len(documents) > 0:
-            return documents[0].text
-        else:
-            return "No content extracted"
-            
-    except Exception as e:
-        # Try async version as fallback
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+def parse_resume_sync(file_path, use_local=LOCAL_EXTRACTION_ENABLED):
+    """Synchronous version with better error handling.
+
+    Previously parsed files are served from the parse cache, and files a local
+    extractor can handle never reach LlamaParse.
+    """
+    with span("parse", documents=1) as sp:
+        if sp:
+            sp.set(bytes=_file_size(file_path))
+        cache = get_parse_cache()
+        key = _cache_key(file_path, use_local, cache)
+        cached = _cached_text(key, cache)
+        if cached is not None:
+            sp.set(backend="cache", cache_hits=1)
+            return cached
+
+        if use_local:
+            local = extract_text_locally(file_path)
+            if local is not None:
+                sp.set(backend=local[0])
+                _store_text(key, local[1], local[0], cache)
+                return local[1]
+
+        parser = get_llamaparse()
+        sp.set(backend="llamaparse")
+
         try:
-            return asyncio.run(parse_resume_async(file_path))
-        except Exception as async_error:
-            return f"Both sync and async failed. Sync: {str(e)}, Async: {str(async_error)}"
+            # Try synchronous parsing first
+            start_time = time.perf_counter()
+            documents = parser.load_data(file_path)
+            _record_backend("llamaparse", time.perf_counter() - start_time)
+            text = _document_text(documents)
+            _store_text(key, text, "llamaparse", cache)
+            return text
+
+        except Exception as e:
+            # Try async version as fallback
+            sp.add("retries")
+            try:
+                return asyncio.run(parse_resume_async(file_path))
+            except Exception as async_error:
+                sp.add("failures")
+                return f"Both sync and async failed. Sync: {str(e)}, Async: {str(async_error)}"
+
+async def _parse_with_retries(parser, file_path, semaphore, timeout, retries, retry_delay):
+    # The concurrency slot is only held while a request is in flight, not during backoff
+    last_error = None
+    for attempt in range(retries + 1):
+        async with semaphore:
+            try:
+                start_time = time.perf_counter()
+                documents = await asyncio.wait_for(parser.aload_data(file_path), timeout)
+                _record_backend("llamaparse", time.perf_counter() - start_time)
+                return _document_text(documents)
+            except asyncio.TimeoutError:
+                last_error = f"timed out after {timeout}s"
+            except Exception as e:
+                last_error = str(e)
+        _dbg(f"Parse attempt {attempt + 1} failed for {file_path}: {last_error}")
+        if attempt < retries:
+            current_span().add("retries")
+            await asyncio.sleep(retry_delay * (2 ** attempt))
+    current_span().add("failures")
+    return f"Error: {last_error}"
+
+def _lookup_text(path, use_local, cache):
+    """Cached or locally extracted text for ``path`` plus its cache key; text is None when LlamaParse is needed."""
+    # Files sent on to LlamaParse get their own "parse" span
+    with span("parse.lookup") as sp:
+        key = _cache_key(path, use_local, cache)
+        text = _cached_text(key, cache)
+        if text is not None:
+            sp.set(backend="cache", documents=1, cache_hits=1)
+        else:
+            local = extract_text_locally(path) if use_local else None
+            if local is not None:
+                sp.set(backend=local[0], documents=1)
+                _store_text(key, local[1], local[0], cache)
+                text = local[1]
+        if sp and text is not None:
+            sp.set(bytes=_file_size(path))
+    return key, text
+
+async def parse_resumes_batch_async(
+    paths,
+    parser=None,
+    concurrency=PARSE_CONCURRENCY,
+    timeout=PARSE_TIMEOUT,
+    retries=PARSE_RETRIES,
+    retry_delay=1.0,
+    use_local=LOCAL_EXTRACTION_ENABLED,
+    cache=None,
+):
+    """Parse files concurrently, yielding ``(path, text)`` as each one finishes.
+
+    Cache lookups and local extraction run in worker threads alongside the
+    remote requests, so cached and local files come back first without
+    holding up the rest. Remaining files go to ``parser``, any object with an
+    ``aload_data(path)`` coroutine (defaults to the shared LlamaParse
+    client). ``cache`` is a ``ParseCache`` (defaults to the shared one).
+    Failed files yield an ``"Error: ..."`` text.
+    """
+    # Resolve the shared cache before worker threads race to create it
+    cache = cache if cache is not None else get_parse_cache()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    remote_parser = []
+
+    async def run(path):
+        key, text = await asyncio.to_thread(_lookup_text, path, use_local, cache)
+        if text is not None:
+            return path, text
+        if not remote_parser:
+            remote_parser.append(parser or get_llamaparse())
+        with span("parse", documents=1, backend="llamaparse") as sp:
+            if sp:
+                sp.set(bytes=_file_size(path))
+            text = await _parse_with_retries(remote_parser[0], path, semaphore, timeout, retries, retry_delay)
+            _store_text(key, text, "llamaparse", cache)
+        return path, text
+
+    tasks = [asyncio.ensure_future(run(path)) for path in paths]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def parse_resumes_batch(
+    paths,
+    parser=None,
+    concurrency=PARSE_CONCURRENCY,
+    timeout=PARSE_TIMEOUT,
+    retries=PARSE_RETRIES,
+    retry_delay=1.0,
+    use_local=LOCAL_EXTRACTION_ENABLED,
+    cache=None,
+):
+    """Synchronous generator over ``parse_resumes_batch_async``.
+
+    The event loop runs in a background thread so callers without one (the
+    Streamlit script, the CLI) can consume results as they complete.
+    """
+    return iterate_async(lambda: parse_resumes_batch_async(
+        paths, parser, concurrency=concurrency, timeout=timeout,
+        retries=retries, retry_delay=retry_delay, use_local=use_local, cache=cache,
+    ))
 
 def test_api_connection():
     """Test if API key and connection work."""
@@ -0,0 +1,278 @@
+import json
+import os
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from config.settings import SKILL_INDEX_DIR
+from src.embedding_cache import text_key
+from src.lexical_index import tokenize
+from src.utils import ensure_dir, last_occurrences
+
+META_FILE = "meta.json"
+ARRAYS_FILE = "arrays.npz"
+
+# Canonical skill -> other spellings recruiters and resumes use for it
+SKILL_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "python": ("python3",),
+    "javascript": ("js", "ecmascript"),
+    "typescript": (),
+    "golang": ("go lang",),
+    "c++": ("cpp",),
+    "c#": ("csharp", "c sharp"),
+    "node.js": ("nodejs", "node"),
+    "react": ("reactjs", "react.js"),
+    "postgresql": ("postgres", "psql"),
+    "sql": ("t-sql", "tsql", "pl/sql"),
+    "nosql": ("no-sql",),
+    "mongodb": ("mongo",),
+    "kubernetes": ("k8s",),
+    "aws": ("amazon web services",),
+    "gcp": ("google cloud", "google cloud platform"),
+    "azure": ("microsoft azure",),
+    "ci/cd": ("cicd", "continuous integration", "continuous delivery"),
+    "machine learning": ("ml",),
+    "deep learning": (),
+    "natural language processing": ("nlp",),
+    "computer vision": (),
+    "data science": (),
+    "data engineering": (),
+    "project management": (),
+    "scikit-learn": ("sklearn", "scikit learn"),
+    "tensorflow": (),
+    "pytorch": ("torch",),
+    "power bi": ("powerbi",),
+    "rest api": ("rest apis", "restful", "restful api"),
+    "spring boot": ("springboot",),
+}
+
+_CANONICAL: Dict[str, str] = {}
+for _skill, _aliases in SKILL_ALIASES.items():
+    for _alias in (_skill,) + _aliases:
+        _CANONICAL[_alias] = _skill
+# Multi-word spellings are matched as phrases, longest first
+_PHRASE = re.compile(
+    r"(?<![a-z0-9])("
+    + "|".join(re.escape(p) for p in sorted((a for a in _CANONICAL if " " in a), key=len, reverse=True))
+    + r")(?![a-z0-9])"
+)
+
+
+def normalize_skill(term: str) -> str:
+    """Canonical form of one skill or keyword (``"K8s"`` -> ``"kubernetes"``)."""
+    term = " ".join((term or "").lower().split())
+    return _CANONICAL.get(term, term)
+
+
+def normalize_filter_term(term: str) -> str:
+    """Canonical form of a typed constraint, tokenized like resume text (``"SQL."`` -> ``"sql"``).
+
+    A multi-word term that is not a known skill stays as its space-joined
+    tokens (``"Python 3"`` -> ``"python 3"``) and matches resumes with all of them.
+    """
+    term = normalize_skill(term)
+    if term in SKILL_ALIASES:
+        return term
+    return normalize_skill(" ".join(tokenize(term)))
+
+
+def extract_skills(text: str) -> Set[str]:
+    """Skills and keywords of a resume: every token plus known multi-word skills, canonicalized."""
+    lowered = (text or "").lower()
+    terms = {normalize_skill(phrase) for phrase in _PHRASE.findall(" ".join(lowered.split()))}
+    terms.update(normalize_skill(token) for token in tokenize(lowered))
+    return terms
+
+
+def parse_skill_filter(must_have: str = "", exclude: str = "") -> Tuple[List[List[str]], List[str]]:
+    """Parse comma-separated constraints; ``|`` inside an item means any of.
+
+    ``"Python, SQL, AWS|GCP"`` -> ``[["python"], ["sql"], ["aws", "gcp"]]``.
+    """
+    groups = []
+    for item in (must_have or "").split(","):
+        group = [normalize_filter_term(term) for term in item.split("|")]
+        group = [term for term in group if term]
+        if group:
+            groups.append(group)
+    excluded = [normalize_filter_term(term) for term in (exclude or "").split(",")]
+    return groups, [term for term in excluded if term]
+
+
+class SkillIndex:
+    """Skills extracted once per resume, stored as sorted integer posting lists.
+
+    ``mask`` combines the posting lists of a constraint with set algebra into a
+    boolean mask over rows, so excluded resumes never reach the embedding
+    model. ``add`` replaces existing ``doc_id``s; ``delete`` is reclaimed by
+    ``compact``/``save``, as in ``BM25Index``.
+    """
+
+    def __init__(self):
+        self.vocab: Dict[str, int] = {}
+        self._postings: List[array] = []
+        self._alive = array("b")
+        self.doc_ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._row_of
+
+    def row(self, doc_id: str) -> Optional[int]:
+        return self._row_of.get(doc_id)
+
+    def add(self, texts: Sequence[str], doc_ids: Optional[Sequence[str]] = None) -> List[str]:
+        """Extract and index skills; an existing ``doc_id`` is replaced. Returns the ids."""
+        if doc_ids is None:
+            doc_ids = [text_key(t) for t in texts]
+        returned = list(doc_ids)
+        # A repeated id within the batch would leave its first copy live but unreachable; keep the last
+        keep = last_occurrences(doc_ids)
+        if len(keep) < len(doc_ids):
+            texts = [texts[i] for i in keep]
+            doc_ids = [doc_ids[i] for i in keep]
+        self.delete([d for d in doc_ids if d in self._row_of])
+        for text, doc_id in zip(texts, doc_ids):
+            row = len(self.doc_ids)
+            for term in extract_skills(text):
+                term_id = self.vocab.get(term)
+                if term_id is None:
+                    term_id = self.vocab[term] = len(self._postings)
+                    self._postings.append(array("i"))
+                self._postings[term_id].append(row)  # rows only grow, so lists stay sorted
+            self._alive.append(1)
+            self.doc_ids.append(doc_id)
+            self._row_of[doc_id] = row
+        return returned
+
+    def delete(self, doc_ids: Iterable[str]) -> int:
+        removed = 0
+        for doc_id in doc_ids:
+            row = self._row_of.pop(doc_id, None)
+            if row is not None:
+                self._alive[row] = 0
+                removed += 1
+        return removed
+
+    def compact(self) -> None:
+        """Drop deleted rows and renumber postings."""
+        if len(self) == len(self.doc_ids):
+            return
+        alive = np.frombuffer(self._alive, dtype=np.int8).astype(bool)
+        new_row = (np.cumsum(alive) - 1).astype(np.int32)
+        for term_id, postings in enumerate(self._postings):
+            rows = np.frombuffer(postings, dtype=np.int32)
+            self._postings[term_id] = array("i", new_row[rows[alive[rows]]].tobytes())
+        self.doc_ids = [doc_id for doc_id, keep in zip(self.doc_ids, alive) if keep]
+        self._alive = array("b", [1] * len(self.doc_ids))
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self.doc_ids)}
+
+    def postings(self, term: str) -> np.ndarray:
+        """Sorted rows (including deleted ones) whose resume mentions ``term``.
+
+        An unknown multi-word term intersects the postings of its words.
+        """
+        term = normalize_skill(term)
+        term_id = self.vocab.get(term)
+        if term_id is not None:
+            return np.frombuffer(self._postings[term_id], dtype=np.int32)
+        words = term.split()
+        if len(words) < 2 or term in SKILL_ALIASES:
+            return np.empty(0, dtype=np.int32)
+        rows = self.postings(words[0])
+        for word in words[1:]:
+            rows = np.intersect1d(rows, self.postings(word), assume_unique=True)
+        return rows
+
+    def _bits(self, terms: Sequence[str]) -> np.ndarray:
+        bits = np.zeros(len(self.doc_ids), dtype=bool)
+        for term in terms:
+            bits[self.postings(term)] = True
+        return bits
+
+    def mask(self, required: Sequence[Sequence[str]] = (), excluded: Sequence[str] = ()) -> np.ndarray:
+        """Rows meeting every group of ``required`` (any term of a group) and no ``excluded`` term."""
+        mask = np.frombuffer(self._alive, dtype=np.int8).astype(bool)
+        for group in required:
+            mask &= self._bits(group)
+        if excluded:
+            mask &= ~self._bits(excluded)
+        return mask
+
+    def unmatched(self, required: Sequence[Sequence[str]] = (), doc_ids: Optional[Sequence[str]] = None) -> List[str]:
+        """Required groups (``"aws|gcp"``) that no indexed resume, or none of ``doc_ids``, mentions.
+
+        Exclusions are not checked: one that nothing mentions is the outcome the user asked for.
+        """
+        scope = np.frombuffer(self._alive, dtype=np.int8).astype(bool)
+        if doc_ids is not None:
+            rows = [row for row in (self._row_of.get(doc_id) for doc_id in doc_ids) if row is not None]
+            scope = np.zeros_like(scope)
+            scope[rows] = True
+        return ["|".join(group) for group in required if not (self._bits(group) & scope).any()]
+
+    def matches(self, doc_ids: Sequence[str], required: Sequence[Sequence[str]] = (),
+                excluded: Sequence[str] = ()) -> np.ndarray:
+        """``mask`` gathered for ``doc_ids``; ids not in the index do not match."""
+        mask = self.mask(required, excluded)
+        rows = [self._row_of.get(doc_id) for doc_id in doc_ids]
+        return np.array([row is not None and bool(mask[row]) for row in rows], dtype=bool)
+
+    def doc_matches(self, doc_id: str, required: Sequence[Sequence[str]] = (),
+                    excluded: Sequence[str] = ()) -> bool:
+        """``mask`` for one resume, by binary search in the posting lists instead of a full pass."""
+        row = self._row_of.get(doc_id)
+        if row is None:
+            return False
+        if not all(any(_contains_sorted(self.postings(term), row) for term in group) for group in required):
+            return False
+        return not any(_contains_sorted(self.postings(term), row) for term in excluded)
+
+    def save(self, path: str = SKILL_INDEX_DIR) -> None:
+        self.compact()
+        ensure_dir(path)
+        offsets = np.zeros(len(self._postings) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings) for postings in self._postings])
+        rows = np.frombuffer(b"".join(postings.tobytes() for postings in self._postings), dtype=np.int32)
+        tmp_arrays = os.path.join(path, "arrays.tmp.npz")
+        np.savez(tmp_arrays, rows=rows, offsets=offsets)
+        os.replace(tmp_arrays, os.path.join(path, ARRAYS_FILE))
+        meta = {"vocab": sorted(self.vocab, key=self.vocab.get), "doc_ids": self.doc_ids}
+        tmp_meta = os.path.join(path, META_FILE + ".tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, os.path.join(path, META_FILE))
+
+    @classmethod
+    def load(cls, path: str = SKILL_INDEX_DIR) -> "SkillIndex":
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(os.path.join(path, ARRAYS_FILE)) as arrays:
+            rows, offsets = arrays["rows"].astype(np.int32), arrays["offsets"]
+        index = cls()
+        index.vocab = {term: term_id for term_id, term in enumerate(meta["vocab"])}
+        index._postings = [array("i", rows[offsets[i]:offsets[i + 1]].tobytes()) for i in range(len(index.vocab))]
+        index.doc_ids = meta["doc_ids"]
+        index._alive = array("b", [1] * len(index.doc_ids))
+        index._row_of = {doc_id: row for row, doc_id in enumerate(index.doc_ids)}
+        return index
+
+
+def _contains_sorted(rows: np.ndarray, row: int) -> bool:
+    i = int(np.searchsorted(rows, row))
+    return i < rows.shape[0] and rows[i] == row
+
+
+def load_or_create(path: str = SKILL_INDEX_DIR) -> SkillIndex:
+    """The saved index at ``path``, or an empty one."""
+    if os.path.exists(os.path.join(path, META_FILE)):
+        try:
+            return SkillIndex.load(path)
+        except Exception as e:
+            print(f"[skill_index] Ignoring unreadable index at {path}: {e}")
+    return SkillIndex()
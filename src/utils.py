@@ -1,6 +1,10 @@
+import asyncio
+import contextvars
 import os
+import queue
+import threading
 import streamlit as st
-from typing import Iterable, List, Optional
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional
 
 
 def ensure_dir(path: str) -> None:
@@ -19,6 +23,12 @@ def clean_text(text: str) -> str:
     return (text or "").replace("\x00", " ").strip()
 
 
+def last_occurrences(keys: Iterable[str]) -> List[int]:
+    """Positions of the last occurrence of each distinct key, in order."""
+    last = {key: i for i, key in enumerate(keys)}
+    return sorted(last.values())
+
+
 def get_env_var(key: str, default: Optional[str] = None) -> Optional[str]:
     """
     Get environment variable from either Streamlit secrets or OS environment.
@@ -42,4 +52,36 @@ def get_env_var(key: str, default: Optional[str] = None) -> Optional[str]:
         pass
     
     # Fallback to standard environment variables (for local development)
-    return os.getenv(key, default) 
\ No newline at end of file
+    return os.getenv(key, default) 
+
+_ASYNC_DONE = object()
+
+
+def iterate_async(make_async_iterable: Callable[[], AsyncIterator]) -> Iterator:
+    """Consume an async iterator from synchronous code, item by item.
+
+    The event loop runs in a background thread, so this works from the
+    Streamlit script and the CLI alike. Exceptions are re-raised in the caller.
+    """
+    results: "queue.Queue" = queue.Queue()
+
+    def worker() -> None:
+        async def drain() -> None:
+            async for item in make_async_iterable():
+                results.put(item)
+        try:
+            asyncio.run(drain())
+        except Exception as e:
+            results.put(e)
+        finally:
+            results.put(_ASYNC_DONE)
+
+    # Carry context variables (e.g. the active instrumentation run) into the loop thread
+    threading.Thread(target=contextvars.copy_context().run, args=(worker,), daemon=True).start()
+    while True:
+        item = results.get()
+        if item is _ASYNC_DONE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
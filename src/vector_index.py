@@ -0,0 +1,349 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import (
+    EMBEDDING_STORAGE_DTYPE,
+    VECTOR_INDEX_DIR,
+    VECTOR_INDEX_N_LISTS,
+    VECTOR_INDEX_N_PROBE,
+)
+from src.embedding_cache import text_key
+from src.quantization import check_mode, quantize, rescore_shortlist, score_codes
+from src.ranking import normalize_rows, select_top_k
+from src.utils import ensure_dir, last_occurrences
+
+META_FILE = "meta.json"
+ARRAYS_FILE = "arrays.npz"
+_ASSIGN_BLOCK = 65536  # rows scored against the centroids at a time
+
+
+class IVFIndex:
+    """Inverted-file (IVF) index over normalized resume embeddings.
+
+    Vectors are clustered into ``n_lists`` cells with spherical k-means; a query
+    only scores the resumes in its ``n_probe`` closest cells. Raising ``n_probe``
+    trades latency for recall (``n_probe == n_lists`` is exact search).
+    Resumes added before the index is trained are searched exhaustively.
+    Vectors are stored as ``storage`` (``float32``, ``float16`` or ``int8``
+    with a per-row scale); pass ``rescore_fn`` to ``search`` to re-score a
+    quantized shortlist in float32.
+    """
+
+    def __init__(self, dim: Optional[int] = None, n_lists: int = VECTOR_INDEX_N_LISTS,
+                 n_probe: int = VECTOR_INDEX_N_PROBE, seed: int = 0, storage: str = EMBEDDING_STORAGE_DTYPE):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.storage = check_mode(storage)
+        self.centroids: Optional[np.ndarray] = None
+        self._vectors = np.empty((0, dim or 0), dtype=self._dtype)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._assign = np.empty(0, dtype=np.int32)  # cell per row, -1 if untrained
+        self._alive = np.empty(0, dtype=bool)
+        self._size = 0
+        self.names: List[str] = []
+        self.texts: List[str] = []
+        self.doc_ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._order: Optional[np.ndarray] = None  # rows sorted by cell
+        self._bounds: Optional[np.ndarray] = None  # cell c spans _order[bounds[c]:bounds[c+1]]
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def _dtype(self):
+        return {"float32": np.float32, "float16": np.float16, "int8": np.int8}[self.storage]
+
+    def _dequantize(self, rows: np.ndarray) -> np.ndarray:
+        return self._vectors[rows].astype(np.float32) * self._scales[rows, None]
+
+    # -- mutation ----------------------------------------------------
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        if needed <= self._vectors.shape[0]:
+            return
+        capacity = max(needed, self._vectors.shape[0] * 2, 1024)
+        vectors = np.empty((capacity, self.dim), dtype=self._dtype)
+        vectors[: self._size] = self._vectors[: self._size]
+        scales = np.ones(capacity, dtype=np.float32)
+        scales[: self._size] = self._scales[: self._size]
+        self._scales = scales
+        assign = np.full(capacity, -1, dtype=np.int32)
+        assign[: self._size] = self._assign[: self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: self._size] = self._alive[: self._size]
+        self._vectors, self._assign, self._alive = vectors, assign, alive
+
+    def _nearest_cells(self, vectors: np.ndarray) -> np.ndarray:
+        cells = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], _ASSIGN_BLOCK):
+            # Per-row scales are positive, so they do not change the nearest cell
+            block = vectors[start:start + _ASSIGN_BLOCK].astype(np.float32, copy=False)
+            cells[start:start + _ASSIGN_BLOCK] = np.argmax(block @ self.centroids.T, axis=1)
+        return cells
+
+    def add(self, embeddings, names: Sequence[str], texts: Sequence[str],
+            doc_ids: Optional[Sequence[str]] = None) -> List[str]:
+        """Add resumes to the pool; an existing ``doc_id`` is replaced. Returns the ids."""
+        if len(texts) == 0:
+            return []
+        vectors = normalize_rows(embeddings)
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            self._vectors = np.empty((0, self.dim), dtype=self._dtype)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+        if doc_ids is None:
+            doc_ids = [text_key(t) for t in texts]
+        returned = list(doc_ids)
+        # A repeated id within the batch would leave an unreachable live row; keep its last copy
+        keep = last_occurrences(doc_ids)
+        if len(keep) < len(doc_ids):
+            vectors = vectors[keep]
+            names = [names[i] for i in keep]
+            texts = [texts[i] for i in keep]
+            doc_ids = [doc_ids[i] for i in keep]
+        self.delete([d for d in doc_ids if d in self._row_of])
+
+        count = vectors.shape[0]
+        self._reserve(count)
+        rows = slice(self._size, self._size + count)
+        self._vectors[rows], self._scales[rows] = quantize(vectors, self.storage)
+        self._assign[rows] = self._nearest_cells(vectors) if self.is_trained else -1
+        self._alive[rows] = True
+        for offset, doc_id in enumerate(doc_ids):
+            self._row_of[doc_id] = self._size + offset
+        self.names.extend(names)
+        self.texts.extend(texts)
+        self.doc_ids.extend(doc_ids)
+        self._size += count
+        self._order = None
+        if not self.is_trained and len(self) >= self.n_lists * 39:
+            self.train()
+        return returned
+
+    def delete(self, doc_ids: Iterable[str]) -> int:
+        """Remove resumes by id; storage is reclaimed on the next ``compact``/``save``."""
+        removed = 0
+        for doc_id in doc_ids:
+            row = self._row_of.pop(doc_id, None)
+            if row is not None:
+                self._alive[row] = False
+                removed += 1
+        return removed
+
+    def compact(self) -> None:
+        """Drop deleted rows from storage."""
+        keep = np.flatnonzero(self._alive[: self._size])
+        if keep.shape[0] == self._size:
+            return
+        self._vectors = self._vectors[keep].copy()
+        self._scales = self._scales[keep].copy()
+        self._assign = self._assign[keep].copy()
+        self._alive = np.ones(keep.shape[0], dtype=bool)
+        self.names = [self.names[i] for i in keep]
+        self.texts = [self.texts[i] for i in keep]
+        self.doc_ids = [self.doc_ids[i] for i in keep]
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self.doc_ids)}
+        self._size = keep.shape[0]
+        self._order = None
+
+    def train(self, iterations: int = 20, sample_size: Optional[int] = None) -> None:
+        """Fit the cell centroids with spherical k-means and reassign every row."""
+        live = np.flatnonzero(self._alive[: self._size])
+        if live.shape[0] == 0:
+            raise ValueError("Cannot train an empty index")
+        rng = np.random.default_rng(self.seed)
+        n_lists = min(self.n_lists, live.shape[0])
+        sample_size = sample_size or n_lists * 256
+        sample = self._dequantize(rng.choice(live, size=min(sample_size, live.shape[0]), replace=False))
+        centroids = sample[rng.choice(sample.shape[0], size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            cells = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, cells, sample)
+            empty = np.bincount(cells, minlength=n_lists) == 0
+            # Re-seed empty cells from random sample points
+            sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+            centroids = normalize_rows(sums)
+        self.centroids = centroids
+        self.n_lists = n_lists
+        self._assign[: self._size] = self._nearest_cells(self._vectors[: self._size])
+        self._order = None
+
+    # -- search ------------------------------------------------------
+
+    def _build_lists(self) -> None:
+        assign = self._assign[: self._size]
+        self._order = np.argsort(assign, kind="stable")
+        self._bounds = np.searchsorted(assign[self._order], np.arange(-1, self.n_lists + 1))
+
+    def _candidate_rows(self, query: np.ndarray, n_probe: int) -> np.ndarray:
+        if self._order is None:
+            self._build_lists()
+        # Untrained rows (cell -1) are always scanned
+        parts = [self._order[self._bounds[0]:self._bounds[1]]]
+        if self.is_trained:
+            n_probe = min(n_probe, self.n_lists)
+            cells = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+            parts.extend(self._order[self._bounds[c + 1]:self._bounds[c + 2]] for c in cells)
+        rows = np.concatenate(parts)
+        return rows[self._alive[rows]]
+
+    def search_indices(self, query_embedding, top_k: Optional[int] = 10, threshold: Optional[float] = None,
+                       n_probe: Optional[int] = None, rescore_fn=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k as ``(rows, scores)``, best first.
+
+        ``rescore_fn`` (rows -> float32 embeddings) re-scores a quantized shortlist exactly.
+        """
+        if len(self) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = normalize_rows(query_embedding)[0]
+        rows = self._candidate_rows(query, n_probe or self.n_probe)
+        scores = score_codes(self._vectors[rows], self._scales[rows], query)
+        if self.storage == "float32":
+            rescore_fn = None
+        picked, picked_scores = rescore_shortlist(
+            query, scores, top_k, threshold,
+            rescore_fn=(lambda positions: rescore_fn(rows[positions])) if rescore_fn else None,
+        )
+        return rows[picked], picked_scores
+
+    def exact_search_indices(self, query_embedding, top_k: Optional[int] = 10,
+                             threshold: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force top-k over every live resume, for recall measurement."""
+        query = normalize_rows(query_embedding)[0]
+        rows = np.flatnonzero(self._alive[: self._size])
+        scores = score_codes(self._vectors[rows], self._scales[rows], query)
+        picked, picked_scores = select_top_k(scores, top_k=top_k, threshold=threshold)
+        return rows[picked], picked_scores
+
+    def search(self, query_embedding, top_k: Optional[int] = 10, threshold: Optional[float] = None,
+               n_probe: Optional[int] = None, rescore_fn=None) -> List[Tuple[str, float, str]]:
+        """Top-k resumes as ``(name, score, text)`` tuples, the same contract as ``rank_candidates``."""
+        rows, scores = self.search_indices(query_embedding, top_k=top_k, threshold=threshold, n_probe=n_probe,
+                                           rescore_fn=rescore_fn)
+        return [(self.names[r], float(s), self.texts[r]) for r, s in zip(rows, scores)]
+
+    # -- persistence -------------------------------------------------
+
+    def save(self, path: str = VECTOR_INDEX_DIR) -> None:
+        self.compact()
+        ensure_dir(path)
+        arrays = {
+            "vectors": self._vectors[: self._size],
+            "scales": self._scales[: self._size],
+            "assign": self._assign[: self._size],
+        }
+        if self.is_trained:
+            arrays["centroids"] = self.centroids
+        tmp_arrays = os.path.join(path, "arrays.tmp.npz")
+        np.savez(tmp_arrays, **arrays)
+        os.replace(tmp_arrays, os.path.join(path, ARRAYS_FILE))
+        meta = {
+            "dim": self.dim, "n_lists": self.n_lists, "n_probe": self.n_probe, "seed": self.seed,
+            "storage": self.storage,
+            "names": self.names, "texts": self.texts, "doc_ids": self.doc_ids,
+        }
+        tmp_meta = os.path.join(path, META_FILE + ".tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, os.path.join(path, META_FILE))
+
+    @classmethod
+    def load(cls, path: str = VECTOR_INDEX_DIR) -> "IVFIndex":
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        # A saved pool keeps the precision it was built with
+        index = cls(dim=meta["dim"], n_lists=meta["n_lists"], n_probe=meta["n_probe"], seed=meta["seed"],
+                    storage=meta.get("storage", "float32"))
+        with np.load(os.path.join(path, ARRAYS_FILE)) as arrays:
+            index._vectors = arrays["vectors"].astype(index._dtype, copy=False)
+            index._scales = (arrays["scales"].astype(np.float32, copy=False) if "scales" in arrays
+                             else np.ones(index._vectors.shape[0], dtype=np.float32))
+            index._assign = arrays["assign"].astype(np.int32, copy=False)
+            if "centroids" in arrays:
+                index.centroids = arrays["centroids"]
+        index._size = index._vectors.shape[0]
+        index._alive = np.ones(index._size, dtype=bool)
+        index.names, index.texts, index.doc_ids = meta["names"], meta["texts"], meta["doc_ids"]
+        index._row_of = {doc_id: row for row, doc_id in enumerate(index.doc_ids)}
+        return index
+
+
+def recall_benchmark(index: IVFIndex, queries, top_k: int = 10,
+                     n_probes: Sequence[int] = (1, 2, 4, 8, 16, 32)) -> List[Dict[str, float]]:
+    """Recall@k and mean latency of IVF search against exact search for each ``n_probe``."""
+    queries = normalize_rows(queries)
+    exact, exact_ms = [], 0.0
+    for query in queries:
+        start_time = time.perf_counter()
+        rows, _ = index.exact_search_indices(query, top_k=top_k)
+        exact_ms += (time.perf_counter() - start_time) * 1000
+        exact.append(set(rows.tolist()))
+    report = [{"n_probe": index.n_lists, "recall": 1.0, "latency_ms": exact_ms / len(queries), "exact": True}]
+    for n_probe in n_probes:
+        hits, total_ms = 0, 0.0
+        for query, truth in zip(queries, exact):
+            start_time = time.perf_counter()
+            rows, _ = index.search_indices(query, top_k=top_k, n_probe=n_probe)
+            total_ms += (time.perf_counter() - start_time) * 1000
+            hits += len(truth.intersection(rows.tolist()))
+        report.append({
+            "n_probe": n_probe,
+            "recall": hits / max(1, sum(len(t) for t in exact)),
+            "latency_ms": total_ms / len(queries),
+            "exact": False,
+        })
+    return report
+
+
+def _synthetic_embeddings(count: int, dim: int, n_topics: int, rng) -> np.ndarray:
+    # Clustered vectors approximate how resumes group by role
+    topics = normalize_rows(rng.standard_normal((n_topics, dim)))
+    labels = rng.integers(0, n_topics, size=count)
+    return normalize_rows(topics[labels] + 1.2 * rng.standard_normal((count, dim)) / np.sqrt(dim))
+
+
+def main():
+    """Run the recall/latency benchmark on a synthetic pool."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="IVF recall benchmark against exact search")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--n-lists", type=int, default=VECTOR_INDEX_N_LISTS)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = _synthetic_embeddings(args.size, args.dim, n_topics=200, rng=rng)
+    index = IVFIndex(dim=args.dim, n_lists=args.n_lists)
+    start_time = time.perf_counter()
+    index.add(vectors, [f"Candidate_{i+1}" for i in range(args.size)], [""] * args.size,
+              doc_ids=[str(i) for i in range(args.size)])
+    if not index.is_trained:
+        index.train()
+    print(f"Built index over {args.size} vectors in {time.perf_counter() - start_time:.1f}s")
+
+    queries = _synthetic_embeddings(args.queries, args.dim, n_topics=200, rng=rng)
+    print(f"{'n_probe':>8} {'recall@' + str(args.top_k):>10} {'latency_ms':>11}")
+    for row in recall_benchmark(index, queries, top_k=args.top_k):
+        label = "exact" if row["exact"] else str(row["n_probe"])
+        print(f"{label:>8} {row['recall']:>10.3f} {row['latency_ms']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import json
+
+from src.batch_rank import Checkpoint, _append_jsonl, _read_jsonl
+
+SETTINGS = {"top_k": 5, "threshold": 0.3}
+
+
+def _row(job_id, path):
+    return {"job_id": job_id, "path": path, "score": 0.5}
+
+
+def test_checkpoint_resumes_finished_work_after_interruption(tmp_path):
+    out = str(tmp_path / "ranked.csv")
+    run = Checkpoint(out, SETTINGS)
+    run.add_resumes([{"path": "a.pdf"}, {"path": "b.pdf"}])
+    run.finish_job("job-1", [_row("job-1", "a.pdf")])
+    # Crash after writing job-2's rows but before recording it as finished
+    _append_jsonl(run.results_path, [_row("job-2", "b.pdf")])
+
+    resumed = Checkpoint(out, SETTINGS)
+
+    assert [row["path"] for row in resumed.resumes()] == ["a.pdf", "b.pdf"]
+    assert resumed.done_jobs == {"job-1"}
+    assert resumed.results() == [_row("job-1", "a.pdf")]
+
+
+def test_changed_settings_start_over(tmp_path):
+    out = str(tmp_path / "ranked.csv")
+    run = Checkpoint(out, SETTINGS)
+    run.add_resumes([{"path": "a.pdf"}])
+    run.finish_job("job-1", [_row("job-1", "a.pdf")])
+
+    resumed = Checkpoint(out, dict(SETTINGS, top_k=10))
+
+    assert resumed.resumes() == []
+    assert resumed.done_jobs == set()
+    assert resumed.results() == []
+
+
+def test_torn_last_line_is_dropped_and_appends_start_fresh(tmp_path):
+    path = str(tmp_path / "rows.jsonl")
+    _append_jsonl(path, [{"n": 1}])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"n": ')
+
+    assert _read_jsonl(path) == [{"n": 1}]
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"n": ')
+    _append_jsonl(path, [{"n": 2}])
+
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert json.loads(lines[-1]) == {"n": 2}
+    assert _read_jsonl(path) == [{"n": 1}, {"n": 2}]
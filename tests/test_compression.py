@@ -0,0 +1,30 @@
+import numpy as np
+
+from src.compression import compress_resume, count_tokens
+
+
+def _encode(texts):
+    # Deterministic stand-in for the embedding model
+    rng = np.random.RandomState(0)
+    return rng.rand(len(texts), 8).astype(np.float32)
+
+
+def test_single_line_resume_is_cut_to_budget_not_dropped():
+    resume = " ".join(f"python sql engineer{i % 50} built pipelines" for i in range(600))
+    job_embedding = np.ones((1, 8), dtype=np.float32)
+
+    compressed = compress_resume(resume, job_embedding, _encode, budget=300)
+
+    assert compressed
+    assert count_tokens(compressed) <= 300
+    assert compressed.split()[0] == "python"
+
+
+def test_oversized_sentence_fills_remaining_budget():
+    resume = "Led the data platform team.\n" + " ".join(["kafka spark airflow"] * 800)
+    job_embedding = np.ones((1, 8), dtype=np.float32)
+
+    compressed = compress_resume(resume, job_embedding, _encode, budget=200)
+
+    assert "kafka" in compressed
+    assert count_tokens(compressed) <= 200
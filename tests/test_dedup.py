@@ -0,0 +1,43 @@
+from src.dedup import DuplicateGroups, MinHashLSH, collision_probability
+
+BASE = ("Jane Doe senior data engineer with ten years of python sql spark airflow and kafka experience "
+        "building batch and streaming pipelines at scale for retail and finance clients")
+OTHER = ("John Roe frontend developer shipping react typescript and graphql applications with design "
+         "systems accessibility audits and end to end testing for healthcare startups")
+
+
+def test_near_duplicate_is_found_and_unrelated_resume_is_not():
+    index = MinHashLSH()
+    index.add("base", BASE)
+    index.add("other", OTHER)
+
+    matches = index.query(index.signature(BASE.upper() + " References available on request."))
+
+    assert [doc_id for doc_id, _similarity in matches] == ["base"]
+    assert matches[0][1] >= index.threshold
+
+
+def test_groups_assign_copies_to_first_representative():
+    groups = DuplicateGroups(MinHashLSH())
+
+    assert groups.assign("base", BASE) == "base"
+    assert groups.assign("copy", BASE + " .") == "base"
+    assert groups.assign("other", OTHER) == "other"
+    assert groups.groups() == {"base": ["copy"]}
+
+
+def test_save_load_round_trip(tmp_path):
+    index = MinHashLSH()
+    index.add("base", BASE)
+    index.add("other", OTHER)
+
+    index.save(str(tmp_path))
+    loaded = MinHashLSH.load(str(tmp_path))
+
+    assert loaded.doc_ids == ["base", "other"]
+    assert loaded.query(loaded.signature(BASE)) == index.query(index.signature(BASE))
+
+
+def test_banding_favours_high_similarity():
+    assert collision_probability(0.9) > 0.99
+    assert collision_probability(0.3) < 0.1
@@ -0,0 +1,77 @@
+import numpy as np
+
+from src.embedding_cache import EmbeddingCache, encode_with_cache
+
+
+def _encode(texts):
+    return np.array([[len(text), 1.0, 0.0, 2.0] for text in texts], dtype=np.float32)
+
+
+def test_empty_texts_return_empty_matrix(tmp_path):
+    cache = EmbeddingCache(cache_dir=str(tmp_path), model_name="fake")
+
+    assert encode_with_cache(cache, _encode, []).shape == (0, 0)
+    encode_with_cache(cache, _encode, ["python engineer"])
+    empty = encode_with_cache(cache, _encode, [])
+
+    assert empty.shape == (0, 4)
+    assert empty.dtype == np.float32
+    assert encode_with_cache(None, _encode, []).shape == (0, 0)
+
+
+def _cache(tmp_path, rows=None):
+    max_mb = rows * 4 * 4 / (1024 * 1024) if rows else 1
+    return EmbeddingCache(cache_dir=str(tmp_path), model_name="fake", max_mb=max_mb, flush_seconds=3600)
+
+
+def test_hits_skip_the_encoder(tmp_path):
+    cache = _cache(tmp_path)
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return _encode(texts)
+
+    first = encode_with_cache(cache, encode, ["a", "bb", "a"])
+    second = encode_with_cache(cache, encode, ["bb", "a"])
+
+    assert calls == [["a", "bb"]]
+    np.testing.assert_array_equal(second, first[[1, 0]])
+    assert cache.stats()["hits"] == 2
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = _cache(tmp_path, rows=2)
+    cache.put_many(["a", "bb"], _encode(["a", "bb"]))
+    cache.get("a")  # "bb" is now the least recently used
+    cache.put("ccc", _encode(["ccc"]))
+
+    assert cache.get("bb") is None
+    np.testing.assert_array_equal(cache.get("a"), _encode(["a"])[0])
+    np.testing.assert_array_equal(cache.get("ccc"), _encode(["ccc"])[0])
+
+
+def test_entries_reload_after_save(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put_many(["a", "bb"], _encode(["a", "bb"]))
+    cache.save()
+
+    reloaded = _cache(tmp_path)
+
+    np.testing.assert_array_equal(reloaded.get("bb"), _encode(["bb"])[0])
+    assert reloaded.stats()["entries"] == 2
+
+
+def test_unsaved_entries_replay_from_log_and_torn_line_is_ignored(tmp_path):
+    cache = _cache(tmp_path, rows=2)
+    cache.put_many(["a", "bb"], _encode(["a", "bb"]))
+    cache.save()
+    cache.put("ccc", _encode(["ccc"]))  # evicts "a"; only the append log knows
+    with open(cache._log_path, "a", encoding="utf-8") as f:
+        f.write("torn-entry\t1")
+
+    reloaded = _cache(tmp_path, rows=2)
+
+    assert reloaded.get("a") is None
+    np.testing.assert_array_equal(reloaded.get("bb"), _encode(["bb"])[0])
+    np.testing.assert_array_equal(reloaded.get("ccc"), _encode(["ccc"])[0])
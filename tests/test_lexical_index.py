@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+
+from src.lexical_index import BM25Index
+
+RESUMES = [
+    "Python developer building Django REST APIs and PostgreSQL schemas",
+    "Java engineer with Spring Boot microservices on Kubernetes",
+    "Data scientist using Python, pandas and scikit-learn for forecasting",
+    "Frontend developer with React and TypeScript",
+]
+
+
+def _index():
+    index = BM25Index()
+    index.add(RESUMES, [f"Candidate_{i}" for i in range(len(RESUMES))], doc_ids=[f"r{i}" for i in range(len(RESUMES))])
+    return index
+
+
+def test_search_ranks_resumes_sharing_query_terms():
+    names = [name for name, _score, _text in _index().search("python pandas forecasting")]
+
+    assert names[0] == "Candidate_2"
+    assert set(names) == {"Candidate_0", "Candidate_2"}
+
+
+def test_save_load_round_trip_after_delete(tmp_path):
+    index = _index()
+    index.delete(["r0"])
+    index.add(["Python and Go backend engineer"], ["Candidate_new"], doc_ids=["r4"])
+
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+
+    assert len(loaded) == 4
+    assert loaded.search("python engineer") == index.search("python engineer")
+    np.testing.assert_allclose(loaded.scores("react spring"), index.scores("react spring"))
+
+
+def test_repeated_doc_id_in_one_batch_is_counted_once():
+    index = BM25Index()
+    index.add(["python sql", "java go", "python rust"], ["a", "b", "c"], doc_ids=["x", "y", "x"])
+
+    assert len(index) == 2
+    assert index.df[index.vocab["python"]] == 1
+    rows, scores = index.search_indices("python")
+    assert [index.texts[r] for r in rows] == ["python rust"]
+    assert scores[0] > 0 and math.isfinite(scores[0])
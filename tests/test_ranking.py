@@ -0,0 +1,56 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from src.ranking import blocked_top_k, normalize_rows, select_top_k
+
+
+def _pool(n_jobs, n_resumes, dim=16):
+    rng = np.random.RandomState(0)
+    return normalize_rows(rng.randn(n_jobs, dim)), normalize_rows(rng.randn(n_resumes, dim))
+
+
+def test_blocked_top_k_matches_brute_force():
+    jobs, resumes = _pool(40, 3000)
+    scores = jobs @ resumes.T
+
+    per_job, per_resume = blocked_top_k(jobs, resumes, top_k_per_job=7, top_k_per_resume=3,
+                                        threshold=0.1, max_block_mb=0.05, normalized=True)
+
+    for j, (indices, job_scores) in enumerate(per_job):
+        expected, expected_scores = select_top_k(scores[j], top_k=7, threshold=0.1)
+        np.testing.assert_array_equal(indices, expected)
+        np.testing.assert_allclose(job_scores, expected_scores, rtol=1e-5)
+    for i, (indices, _resume_scores) in enumerate(per_resume):
+        np.testing.assert_array_equal(indices, select_top_k(scores[:, i], top_k=3, threshold=0.1)[0])
+
+
+def test_blocked_top_k_peak_allocation_stays_under_budget():
+    jobs, resumes = _pool(300, 20000)  # the full score matrix would take ~23 MB
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    blocked_top_k(jobs, resumes, top_k_per_job=10, max_block_mb=1, normalized=True)
+    peak = tracemalloc.get_traced_memory()[1] - start
+    tracemalloc.stop()
+
+    assert peak <= 1024 * 1024
+
+
+def test_blocked_top_k_per_resume_peak_beyond_output_stays_under_budget():
+    jobs, resumes = _pool(200, 5000)
+
+    tracemalloc.start()
+    result = blocked_top_k(jobs, resumes, top_k_per_job=10, top_k_per_resume=5, max_block_mb=1, normalized=True)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert result[1] is not None
+    assert peak - current <= 1024 * 1024
+
+
+def test_blocked_top_k_requires_finite_top_k_per_job():
+    jobs, resumes = _pool(2, 10)
+    with pytest.raises(ValueError):
+        blocked_top_k(jobs, resumes, top_k_per_job=None)
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from groq import APIStatusError
+
+from src.fakes import FakeGroqServer
+from src.reasoning import (
+    REASONING_FAILED,
+    backoff_delay,
+    generate_fit_reasoning_async,
+    is_retryable,
+    make_async_client,
+)
+
+
+@pytest.fixture
+def fake_groq():
+    def start(**options):
+        fake = FakeGroqServer(latency_ms=0, jitter_ms=0, **options).start()
+        servers.append(fake)
+        return fake
+
+    servers = []
+    yield start
+    for fake in servers:
+        fake.stop()
+
+
+def _status_error(status, headers=None):
+    request = httpx.Request("POST", "http://groq.test/openai/v1/chat/completions")
+    response = httpx.Response(status, headers=headers, request=request)
+    return APIStatusError("fake error", response=response, body=None)
+
+
+def _reason(fake, **options):
+    async def run():
+        client = make_async_client(api_key="test", base_url=fake.url)
+        return await generate_fit_reasoning_async("Data engineer", "Python, SQL", "Jane Doe",
+                                                  async_client=client, use_cache=False, **options)
+    return asyncio.run(run())
+
+
+def test_success_takes_one_request(fake_groq):
+    fake = fake_groq()
+
+    reasoning = _reason(fake, max_retries=2, retry_delay=0.01)
+
+    assert reasoning == "The candidate's experience closely matches the role's core requirements."
+    assert fake.requests == 1
+
+
+def test_rate_limits_are_retried_after_the_servers_retry_after(fake_groq):
+    fake = fake_groq(rate_limit_rate=1.0, retry_after=0.3)
+
+    start = time.perf_counter()
+    reasoning = _reason(fake, max_retries=2, retry_delay=0.01)
+    elapsed = time.perf_counter() - start
+
+    assert reasoning == REASONING_FAILED
+    assert fake.requests == 3
+    # Both retries waited the 0.3s the server asked for, not the 0.01s base delay
+    assert elapsed >= 0.6
+
+
+def test_server_errors_are_retried_with_backoff(fake_groq):
+    fake = fake_groq(error_rate=1.0)
+
+    reasoning = _reason(fake, max_retries=3, retry_delay=0.01)
+
+    assert reasoning == REASONING_FAILED
+    assert fake.requests == 4
+
+
+@pytest.mark.parametrize("status, retryable", [
+    (400, False), (401, False), (404, False), (429, True), (500, True), (503, True),
+])
+def test_only_rate_limits_and_server_errors_are_retryable(status, retryable):
+    assert is_retryable(_status_error(status)) is retryable
+
+
+def test_retry_after_overrides_and_is_capped_by_max_delay():
+    assert backoff_delay(0, 1.0, _status_error(429, {"retry-after": "2.5"}), max_delay=10) == 2.5
+    assert backoff_delay(0, 1.0, _status_error(429, {"retry-after": "120"}), max_delay=10) == 10
+    assert 0 <= backoff_delay(5, 1.0, _status_error(503), max_delay=4) <= 4
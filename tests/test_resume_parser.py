@@ -0,0 +1,86 @@
+import asyncio
+
+from src.fakes import FakeLlamaParse
+from src.parse_cache import ParseCache
+from src.resume_parser import parse_resumes_batch, parse_resumes_batch_async
+
+
+class _FlakyParser(FakeLlamaParse):
+    """Fails the first ``failures`` calls for each file listed in ``flaky``."""
+
+    def __init__(self, flaky, failures):
+        super().__init__(latency_ms=0, jitter_ms=0)
+        self.flaky = flaky
+        self.failures = failures
+        self.attempts = {}
+
+    async def aload_data(self, file_path):
+        self.attempts[file_path] = self.attempts.get(file_path, 0) + 1
+        if file_path in self.flaky and self.attempts[file_path] <= self.failures:
+            raise RuntimeError("fake LlamaParse: job failed")
+        return await super().aload_data(file_path)
+
+
+def _resumes(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"resume_{i}.txt"
+        path.write_text(f"Candidate {i}\nPython and SQL", encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def test_second_run_is_served_from_the_cache(tmp_path):
+    paths = _resumes(tmp_path, 3)
+    cache = ParseCache(str(tmp_path / "parsed.sqlite3"))
+
+    parser = FakeLlamaParse(latency_ms=0, jitter_ms=0)
+    first = dict(parse_resumes_batch(paths, parser=parser, use_local=False, cache=cache))
+    assert parser.calls == 3
+
+    parser = FakeLlamaParse(latency_ms=0, jitter_ms=0)
+    second = dict(parse_resumes_batch(paths, parser=parser, use_local=False, cache=cache))
+    assert parser.calls == 0
+    assert second == first
+    assert first[paths[0]].startswith("Candidate 0")
+
+
+def test_failed_attempts_are_retried(tmp_path):
+    paths = _resumes(tmp_path, 2)
+    cache = ParseCache(str(tmp_path / "parsed.sqlite3"))
+    parser = _FlakyParser(flaky={paths[0]}, failures=1)
+
+    texts = dict(parse_resumes_batch(paths, parser=parser, retries=1, retry_delay=0.01,
+                                     use_local=False, cache=cache))
+
+    assert parser.attempts == {paths[0]: 2, paths[1]: 1}
+    assert texts[paths[0]] == "Candidate 0\nPython and SQL"
+
+
+def test_backoff_does_not_hold_the_concurrency_slot(tmp_path):
+    flaky, good = _resumes(tmp_path, 2)
+    cache = ParseCache(str(tmp_path / "parsed.sqlite3"))
+    parser = _FlakyParser(flaky={flaky}, failures=1)
+
+    async def order():
+        batch = parse_resumes_batch_async([flaky, good], parser=parser, concurrency=1, retries=1,
+                                          retry_delay=0.2, use_local=False, cache=cache)
+        return [path async for path, _text in batch]
+
+    assert asyncio.run(order()) == [good, flaky]
+
+
+def test_exhausted_retries_yield_an_error_text_that_is_not_cached(tmp_path):
+    (path,) = _resumes(tmp_path, 1)
+    cache = ParseCache(str(tmp_path / "parsed.sqlite3"))
+    parser = _FlakyParser(flaky={path}, failures=10)
+
+    texts = dict(parse_resumes_batch([path], parser=parser, retries=2, retry_delay=0.01,
+                                     use_local=False, cache=cache))
+    assert parser.attempts[path] == 3
+    assert texts[path].startswith("Error:")
+
+    parser = FakeLlamaParse(latency_ms=0, jitter_ms=0)
+    texts = dict(parse_resumes_batch([path], parser=parser, use_local=False, cache=cache))
+    assert parser.calls == 1
+    assert texts[path] == "Candidate 0\nPython and SQL"
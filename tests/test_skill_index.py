@@ -0,0 +1,69 @@
+from src.skill_index import SkillIndex, parse_skill_filter
+
+RESUMES = {
+    "a": "Python 3 and SQL with k8s on AWS",
+    "b": "Python, MySQL and machine learning ops",
+    "c": "C++ and T-SQL on Google Cloud",
+    "d": "PHP developer",
+}
+
+
+def _index():
+    index = SkillIndex()
+    index.add(list(RESUMES.values()), list(RESUMES))
+    return index
+
+
+def _matching(index, must_have="", exclude=""):
+    required, excluded = parse_skill_filter(must_have, exclude)
+    return [doc_id for doc_id, keep in zip(RESUMES, index.matches(list(RESUMES), required, excluded)) if keep]
+
+
+def test_filter_terms_are_normalized_like_resume_text():
+    assert parse_skill_filter("SQL., K8s | Google Cloud", "PHP!") == ([["sql"], ["kubernetes", "gcp"]], ["php"])
+
+
+def test_must_have_groups_aliases_and_exclusions():
+    index = _index()
+
+    assert _matching(index, "sql") == ["a", "c"]
+    assert _matching(index, "sql, aws|gcp") == ["a", "c"]
+    assert _matching(index, "python", "kubernetes") == ["b"]
+    assert _matching(index, "", "php") == ["a", "b", "c"]
+
+
+def test_unknown_multi_word_term_requires_all_its_words():
+    index = _index()
+
+    assert _matching(index, "Python 3") == ["a"]
+    assert _matching(index, "ops learning") == ["b"]
+    assert all(index.doc_matches(doc_id, [["python 3"]]) == (doc_id == "a") for doc_id in RESUMES)
+
+
+def test_unmatched_reports_only_required_groups():
+    index = _index()
+    required, _excluded = parse_skill_filter("python, rust|kotlin", "cobol")
+
+    assert index.unmatched(required) == ["rust|kotlin"]
+    assert index.unmatched([["python"]], doc_ids=["c", "d"]) == ["python"]
+
+
+def test_save_load_round_trip_after_delete(tmp_path):
+    index = _index()
+    index.delete(["b"])
+
+    index.save(str(tmp_path))
+    loaded = SkillIndex.load(str(tmp_path))
+
+    assert len(loaded) == 3
+    assert _matching(loaded, "python") == ["a"]
+    assert _matching(loaded, "sql", "php") == ["a", "c"]
+
+
+def test_repeated_doc_id_in_one_batch_keeps_last_copy():
+    index = SkillIndex()
+    index.add(["python sql", "java", "rust"], doc_ids=["x", "y", "x"])
+
+    assert len(index) == 2
+    assert not index.mask([["python"]]).any()
+    assert index.doc_matches("x", [["rust"]])
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from src.ranking import rank_embeddings
+from src.vector_index import IVFIndex
+
+
+def _pool(count=600, dim=16):
+    rng = np.random.RandomState(0)
+    vectors = rng.randn(count, dim).astype(np.float32)
+    names = [f"Candidate_{i}" for i in range(count)]
+    return vectors, names, [f"resume {i}" for i in range(count)]
+
+
+@pytest.mark.parametrize("storage", ["float32", "float16", "int8"])
+def test_save_load_round_trip(tmp_path, storage):
+    vectors, names, texts = _pool()
+    index = IVFIndex(n_lists=8, n_probe=8, storage=storage)
+    index.add(vectors, names, texts, doc_ids=names)
+    index.train()
+    index.delete(["Candidate_3"])
+    query = vectors[3] + vectors[10]
+
+    index.save(str(tmp_path))
+    loaded = IVFIndex.load(str(tmp_path))
+
+    assert loaded.storage == storage
+    assert len(loaded) == len(vectors) - 1
+    assert loaded.search(query, top_k=5) == index.search(query, top_k=5)
+
+
+def test_probing_every_cell_matches_brute_force():
+    vectors, names, texts = _pool()
+    index = IVFIndex(n_lists=8, n_probe=8)
+    index.add(vectors, names, texts)
+    index.train()
+    query = vectors[42]
+
+    rows, scores = index.search_indices(query, top_k=10)
+    expected, expected_scores = rank_embeddings(query, vectors, top_k=10)
+
+    np.testing.assert_array_equal(rows, expected)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+
+def test_quantized_search_with_rescore_returns_exact_scores():
+    vectors, names, texts = _pool()
+    index = IVFIndex(n_lists=8, n_probe=8, storage="int8")
+    index.add(vectors, names, texts)
+    index.train()
+    query = vectors[7]
+
+    rows, scores = index.search_indices(query, top_k=10, rescore_fn=lambda rows: vectors[rows])
+    expected, expected_scores = rank_embeddings(query, vectors, top_k=10)
+
+    np.testing.assert_array_equal(rows, expected)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+
+
+def test_repeated_doc_id_in_one_batch_keeps_last_copy():
+    vectors, names, texts = _pool(3)
+    index = IVFIndex(n_lists=1)
+
+    index.add(vectors, ["a", "b", "a"], texts, doc_ids=["a", "b", "a"])
+
+    assert len(index) == 2
+    assert index.search(vectors[2], top_k=1)[0][2] == "resume 2"